@@ -0,0 +1,80 @@
+"""app.py - punto de entrada de Health Fair.
+
+Sólo importa lo necesario para la interfaz elegida (pygame o consola) y
+reporta el tiempo de arranque con --startup-time.
+
+    python app.py                   # interfaz gráfica (pygame)
+    python app.py --console         # interfaz de consola
+    python app.py --startup-time    # tiempo de cada fase del arranque en stderr
+    python app.py --metrics m.json  # latencias por operación, escritas al salir
+    python app.py --record s.jsonl  # graba la entrada y la semilla de la sesión
+    python app.py --replay s.jsonl  # la reproduce sin ventana y reporta tiempos
+"""
+import time
+_IMPORT_START = time.perf_counter()
+import argparse
+import atexit
+import os
+from logic.metrics import METRICS
+from logic.utils import StartupTimer
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_PATH = os.path.join(BASE_DIR, 'data', 'diseases.json')
+SYMPTOM_MAP_PATH = os.path.join(BASE_DIR, 'data', 'symptom_map.json')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Health Fair - simulador de diagnóstico")
+    parser.add_argument('--console', action='store_true', help="usar la interfaz de consola")
+    parser.add_argument('--debug', action='store_true', help="mostrar información de depuración (consola)")
+    parser.add_argument('--startup-time', action='store_true',
+                        help="reportar en stderr el tiempo de cada fase del arranque")
+    parser.add_argument('--metrics', metavar='PATH',
+                        help="activar la instrumentación y escribirla en JSON al salir (F3 en pygame la muestra)")
+    parser.add_argument('--record', metavar='PATH',
+                        help="grabar eventos/teclas y la semilla del motor (ui/input_record.py)")
+    parser.add_argument('--replay', metavar='PATH',
+                        help="reproducir una grabación sin ventana y reportar tiempos por cuadro y acción")
+    parser.add_argument('--realtime', action='store_true',
+                        help="con --replay, respetar el límite de FPS de pygame")
+    args = parser.parse_args(argv)
+    if args.metrics:
+        METRICS.enabled = True
+        atexit.register(METRICS.dump, args.metrics)
+    if args.replay:
+        from ui.input_record import replay
+        result = replay(args.replay, DATA_PATH, SYMPTOM_MAP_PATH, realtime=args.realtime)
+        info = result['replay']
+        print(f"replay {info['ui']} (semilla {info['seed']}): {info['steps']} pasos en {info['seconds']:.2f} s")
+        for line in METRICS.summary_lines():
+            print('  ' + line)
+        return
+    recorder = None
+    if args.record:
+        from ui.input_record import InputRecorder
+        recorder = InputRecorder(args.record, 'console' if args.console else 'pygame', DATA_PATH)
+        atexit.register(recorder.close)
+    startup = StartupTimer(enabled=args.startup_time, start=_IMPORT_START)
+    if args.console:
+        from ui.console_ui import ConsoleUI
+        startup.mark('imports')
+        if recorder is not None:
+            ui = ConsoleUI(DATA_PATH, SYMPTOM_MAP_PATH, debug=args.debug, seed=recorder.seed,
+                           input_fn=recorder.wrap_input())
+        else:
+            ui = ConsoleUI(DATA_PATH, SYMPTOM_MAP_PATH, debug=args.debug)
+        startup.mark('dataset + motor')
+        startup.report()
+        ui.run()
+    else:
+        import main as gui
+        startup.mark('imports (pygame)')
+        if recorder is not None:
+            from ui.input_record import RecordingInput
+            gui.SEED = recorder.seed
+            gui.INPUT = RecordingInput(gui.INPUT, recorder)
+        gui.run(startup)
+
+
+if __name__ == '__main__':
+    main()
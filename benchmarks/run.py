@@ -0,0 +1,214 @@
+"""run.py
+Suite de benchmarks del motor sobre catálogos sintéticos de distintos tamaños.
+Escribe los resultados en JSON para comparar corridas.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.run --sizes 10,100,1000,10000,100000 --output bench.json
+    python -m benchmarks.run --compare bench_antes.json bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional
+
+from logic.dataset import Dataset
+from logic.game_engine import GameEngine
+from logic.probability_engine import update_with_symptom
+from .synthetic import make_catalog, write_json, write_csv
+
+# límite de celdas enfermedad×síntoma para las operaciones con matriz densa
+MAX_DENSE_CELLS = 50_000_000
+
+
+def _time(fn: Callable[[], None], repeat: int,
+          setup: Optional[Callable[[], None]] = None) -> List[float]:
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+class Bench:
+    def __init__(self, repeat: int):
+        self.repeat = repeat
+        self.results: List[Dict] = []
+
+    def record(self, op: str, params: Dict, times: List[float]):
+        row = dict(op=op, **params, repeat=len(times), min=min(times),
+                   median=statistics.median(times), mean=statistics.fmean(times))
+        self.results.append(row)
+        print(f"{op:<32} {json.dumps(params):<52} median {row['median'] * 1e3:10.3f} ms",
+              file=sys.stderr)
+
+    def run(self, fn, op: str, params: Dict, repeat: Optional[int] = None, setup=None):
+        self.record(op, params, _time(fn, repeat or self.repeat, setup))
+
+
+def bench_catalog(bench: Bench, n: int, n_symptoms: int, workdir: str, frames: int):
+    params = {'diseases': n, 'symptoms': n_symptoms}
+    catalog = make_catalog(n, n_symptoms)
+    path = os.path.join(workdir, f'catalog_{n}_{n_symptoms}.json')
+    write_json(catalog, path)
+    load_repeat = 3
+
+    bench.run(lambda: Dataset(path), 'dataset_load', params, load_repeat)
+    dataset = Dataset(path)
+    dense = n * len(dataset.symptoms) <= MAX_DENSE_CELLS
+    if dense:
+        def compile_matrix():
+            dataset._likelihood_matrix = None
+            dataset.likelihood_matrix()
+        bench.run(compile_matrix, 'likelihood_matrix_compile', params, load_repeat)
+
+    # update_with_symptom a nivel de función
+    disease_map = {d.id: d.symptom_likelihood for d in dataset.diseases}
+    priors = dataset.priors()
+    symptom = dataset.symptoms[0]
+    bench.run(lambda: update_with_symptom(priors, symptom, True, disease_map),
+              'update_with_symptom', params)
+
+    backends = ['dict'] + (['matrix', 'log'] if dense else [])
+    for backend in backends:
+        p = dict(params, backend=backend)
+        engine = GameEngine(dataset, backend=backend, rng=random.Random(0))
+        bench.run(engine.reset_case, 'reset_case', p)
+        bench.run(lambda: engine.ask_symptom(engine.patient.symptom_bank[0]),
+                  'ask_symptom', p, setup=engine.reset_case)
+        bench.run(lambda: engine.discard_disease(dataset.diseases[0].id),
+                  'discard_disease', p, setup=engine.reset_case)
+
+    recommenders = ['heuristic'] + (['information_gain'] if dense else [])
+    for recommender in recommenders:
+        p = dict(params, recommender=recommender)
+        engine = GameEngine(dataset, recommender=recommender, rng=random.Random(0))
+        # caso nuevo antes de cada medición: ranking y recomendador sin calcular
+        bench.run(lambda: engine.suggest_symptoms(3), 'suggest_symptoms', p, setup=engine.reset_case)
+
+    bench_diagnosis_engine(bench, catalog, params, workdir)
+    if frames:
+        bench_play_frame(bench, dataset, params, frames)
+
+
+def bench_diagnosis_engine(bench: Bench, catalog: Dict, params: Dict, workdir: str):
+    from core.engine import DiagnosisEngine
+    d_path = os.path.join(workdir, 'enfermedades.csv')
+    s_path = os.path.join(workdir, 'sintomas.csv')
+    write_csv(catalog, d_path, s_path)
+    bench.run(lambda: DiagnosisEngine(d_path, s_path), 'diagnosis_engine_load', params, 3)
+    engine = DiagnosisEngine(d_path, s_path)
+    symptom = engine.all_symptoms[0]
+    bench.run(lambda: engine.update_probabilities(symptom, True),
+              'diagnosis_engine_update', params)
+    bench.run(engine.choose_symptom, 'diagnosis_engine_choose', params)
+
+
+class _StopFrames(Exception):
+    pass
+
+
+def bench_play_frame(bench: Bench, dataset: Dataset, params: Dict, frames: int):
+    """Tiempo por cuadro (repintado completo) de main.play() con el driver de
+    video 'dummy' de SDL."""
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+    try:
+        import pygame
+    except ImportError:
+        print("pygame no disponible: se omite play_frame", file=sys.stderr)
+        return
+    import main
+    main.init_display()
+    main.dataset = dataset
+    main.engine = GameEngine(dataset, rng=random.Random(0))
+    # sin límite de cuadros; cada cuadro se fuerza como repintado completo
+    main.FPS = 0
+    times: List[float] = []
+    original_update = pygame.display.update
+    last = [time.perf_counter()]
+
+    def timed_update(*args):
+        original_update(*args)
+        now = time.perf_counter()
+        times.append(now - last[0])
+        last[0] = now
+        if len(times) >= frames:
+            raise _StopFrames
+        pygame.event.post(pygame.event.Event(pygame.VIDEOEXPOSE))
+
+    pygame.display.update = timed_update
+    try:
+        main.play()
+    except _StopFrames:
+        pass
+    finally:
+        pygame.display.update = original_update
+    # el primer cuadro incluye la preparación del caso
+    bench.record('play_frame', params, times[1:] or times)
+
+
+def compare(baseline_path: str, current_path: str):
+    """Imprime la razón current/baseline de la mediana para cada operación común."""
+    def key(row):
+        return tuple((k, row[k]) for k in sorted(row)
+                     if k not in ('repeat', 'min', 'median', 'mean'))
+    with open(baseline_path, encoding='utf-8') as f:
+        base = {key(r): r for r in json.load(f)['results']}
+    with open(current_path, encoding='utf-8') as f:
+        current = json.load(f)['results']
+    for row in current:
+        old = base.get(key(row))
+        if old is None:
+            continue
+        ratio = row['median'] / old['median'] if old['median'] > 0 else float('inf')
+        label = ' '.join(f"{k}={v}" for k, v in key(row))
+        print(f"{ratio:8.2f}x  {label}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de Health Fair")
+    parser.add_argument('--sizes', default='10,100,1000,10000,100000',
+                        help="número de enfermedades por catálogo, separados por coma")
+    parser.add_argument('--symptoms', type=int, default=None,
+                        help="tamaño del vocabulario (por defecto igual al de enfermedades)")
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--frames', type=int, default=0,
+                        help="cuadros de main.play() a medir (0 = no medir)")
+    parser.add_argument('--output', default=None, help="archivo JSON (por defecto stdout)")
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CURRENT'))
+    args = parser.parse_args(argv)
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    bench = Bench(args.repeat)
+    with tempfile.TemporaryDirectory() as workdir:
+        for n in (int(x) for x in args.sizes.split(',')):
+            bench_catalog(bench, n, args.symptoms or n, workdir, args.frames)
+    out = {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'results': bench.results,
+    }
+    text = json.dumps(out, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,329 @@
+"""selfcheck.py
+Comprobaciones de equivalencia rápidas para los caminos que guardan o
+comparten estado: cada una juega casos al azar y compara contra el motor que
+los calculó en vivo (o contra una referencia directa). Sale con código 1 si
+alguna falla.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.selfcheck
+    python -m benchmarks.selfcheck --cases 500 replay
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from collections import Counter
+from typing import Callable, Dict, List
+
+from logic.dataset import Dataset
+from logic import event_log
+from logic.event_log import EventLog, read_events, replay
+from logic.game_engine import GameEngine
+from logic.posterior_cache import PosteriorCache
+from logic.simulation import play_case, suggest_policy
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_PATH = os.path.join(ROOT, 'data', 'diseases.json')
+# diferencia máxima aceptada entre creencias (sumas en otro orden)
+TOLERANCE = 1e-9
+
+
+class CheckFailed(AssertionError):
+    pass
+
+
+def _max_diff(a: Dict[str, float], b: Dict[str, float]) -> float:
+    if a.keys() != b.keys():
+        return float('inf')
+    return max((abs(a[k] - b[k]) for k in a), default=0.0)
+
+
+def _play(engine: GameEngine, rng: random.Random, actions: int):
+    """Preguntas y descartes al azar, como una sesión del servidor."""
+    for _ in range(actions):
+        if rng.random() < 0.25:
+            engine.discard_disease(rng.choice(sorted(engine.priors)))
+            continue
+        options = engine.suggest_symptoms(3)
+        if not options:
+            break
+        engine.ask_symptom(rng.choice(options))
+
+
+# -----------------------------
+# event_log: snapshot + cola == motor en vivo
+# -----------------------------
+REPLAY_CONFIGS = [
+    {'backend': 'dict'},
+    {'backend': 'matrix'},
+    {'backend': 'log'},
+    {'backend': 'dict', 'prune': 1e-3},
+    {'backend': 'dict', 'posterior_cache': True},
+    {'backend': 'matrix', 'posterior_cache': True},
+    {'backend': 'matrix', 'recommender': 'information_gain'},
+]
+
+
+def check_replay(dataset: Dataset, cases: int, seed: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'events.jsonl')
+        for config in REPLAY_CONFIGS:
+            for case in range(cases):
+                rng = random.Random(seed * 100003 + case)
+                kwargs = dict(config)
+                shared = PosteriorCache() if kwargs.pop('posterior_cache', False) else None
+                if os.path.exists(path):
+                    os.remove(path)
+                with EventLog(path, snapshot_every=rng.choice([1, 3, 100])) as log:
+                    live = GameEngine(dataset, rng=random.Random(case), log=log,
+                                      posterior_cache=shared, **kwargs)
+                    _play(live, rng, rng.randint(0, 8))
+                # caché nuevo (servidor reiniciado) y el mismo caché de los motores vivos
+                for cache in ((PosteriorCache(), shared) if shared is not None else (None,)):
+                    probe = random.Random(case)
+                    state = probe.getstate()
+                    restored = replay(path, dataset, posterior_cache=cache, rng=probe, **kwargs)
+                    # retomar no sortea un paciente nuevo
+                    if probe.getstate() != state:
+                        raise CheckFailed(f"replay {config} case {case}: consumed the engine rng")
+                    diff = _max_diff(live.belief, restored.belief)
+                    if diff > TOLERANCE:
+                        raise CheckFailed(f"replay {config} case {case}: belief differs by {diff:.3g}")
+                    if abs(live.pruned_mass() - restored.pruned_mass()) > TOLERANCE:
+                        raise CheckFailed(f"replay {config} case {case}: pruned mass differs")
+                    if restored.patient.symptom_bank != live.patient.symptom_bank:
+                        raise CheckFailed(f"replay {config} case {case}: symptom bank differs")
+                    # la sugerencia heurística usa el rng; la de ganancia de información no
+                    if (config.get('recommender') == 'information_gain'
+                            and restored.suggest_symptoms(3) != live.suggest_symptoms(3)):
+                        raise CheckFailed(f"replay {config} case {case}: suggestions differ")
+
+
+# -----------------------------
+# event_log: lectura hacia atrás del último caso == lectura completa del archivo
+# -----------------------------
+def _naive_last_case(path: str):
+    events = read_events(path)
+    starts = [i for i, e in enumerate(events) if e['t'] == 'case']
+    if not starts:
+        return None, None, []
+    case = events[starts[-1]:]
+    snaps = [i for i, e in enumerate(case) if e['t'] == 'snap']
+    if not snaps:
+        return case[0], None, case[1:]
+    return case[0], case[snaps[-1]], case[snaps[-1] + 1:]
+
+
+def check_log(dataset: Dataset, cases: int, seed: int):
+    block = event_log.READ_BLOCK
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'events.jsonl')
+        for case in range(cases):
+            rng = random.Random(seed * 100003 + case)
+            if os.path.exists(path) and rng.random() < 0.5:
+                os.remove(path)
+            if os.path.exists(path) and rng.random() < 0.5:
+                # servidor reiniciado: retoma el último caso y lo sigue registrando
+                with EventLog(path, snapshot_every=rng.choice([1, 3, 100])) as log:
+                    restored = replay(path, dataset, log=log, rng=random.Random(case))
+                    if restored is not None:
+                        _play(restored, rng, rng.randint(0, 4))
+            with EventLog(path, snapshot_every=rng.choice([1, 3, 100])) as log:
+                engine = GameEngine(dataset, rng=random.Random(case), log=log)
+                for _ in range(rng.randint(0, 3)):
+                    _play(engine, rng, rng.randint(0, 8))
+                    if rng.random() < 0.5:
+                        engine.make_diagnosis(rng.choice(sorted(engine.priors)))
+                    engine.reset_case()
+                _play(engine, rng, rng.randint(0, 8))
+            if rng.random() < 0.3:
+                # corte a mitad de una escritura: la última línea queda incompleta
+                with open(path, 'rb') as f:
+                    line = f.read().splitlines()[-1]
+                with open(path, 'ab') as f:
+                    f.write(line[:rng.randint(1, len(line) - 1)])
+            expected = _naive_last_case(path)
+            try:
+                for event_log.READ_BLOCK in (1, 7, 64, block):
+                    if event_log.last_case(path) != expected:
+                        raise CheckFailed(f"last_case case {case} (READ_BLOCK={event_log.READ_BLOCK}) "
+                                          f"differs from reading the whole file")
+            finally:
+                event_log.READ_BLOCK = block
+
+
+# -----------------------------
+# posterior_cache: la misma evidencia en cualquier orden da la misma posterior
+# -----------------------------
+def check_cache(dataset: Dataset, cases: int, seed: int):
+    for backend in ('dict', 'matrix'):
+        shared = PosteriorCache()
+        for case in range(cases):
+            rng = random.Random(seed * 100003 + case)
+            # pocos pacientes (perfil y priors) para que las claves se repitan
+            patient_seed = rng.randrange(4)
+            evidence = [(s, rng.random() < 0.5) for s in rng.sample(dataset.symptoms, rng.randint(1, 6))]
+            discarded = rng.sample(sorted(dataset.priors()), rng.randint(0, 2))
+            actions = [('ask', e) for e in evidence] + [('discard', d) for d in discarded]
+            first = GameEngine(dataset, backend=backend, rng=random.Random(patient_seed), posterior_cache=shared)
+            second = GameEngine(dataset, backend=backend, rng=random.Random(patient_seed), posterior_cache=shared)
+            reference = GameEngine(dataset, backend=backend, rng=random.Random(patient_seed))
+            reordered = rng.sample(actions, len(actions))
+            for engine, order in ((first, actions), (second, reordered), (reference, reordered)):
+                for i, (kind, arg) in enumerate(order):
+                    hits = shared.hits
+                    if kind == 'ask':
+                        engine.observe([arg])
+                    else:
+                        engine.discard_disease(arg)
+                    # la segunda vez el conjunto final ya está en el caché
+                    if engine is second and i == len(order) - 1 and shared.hits == hits:
+                        raise CheckFailed(f"cache {backend} case {case}: reordered evidence missed the cache")
+            for engine in (first, second):
+                diff = _max_diff(engine.belief, reference.belief)
+                if diff > TOLERANCE:
+                    raise CheckFailed(f"cache {backend} case {case}: cached posterior differs by {diff:.3g}")
+            # el ranking que viene con la entrada corresponde a esa misma creencia
+            if second.ranking.top(5) != sorted(second.belief.items(), key=lambda x: -x[1])[:5]:
+                raise CheckFailed(f"cache {backend} case {case}: cached ranking does not match the belief")
+
+
+# -----------------------------
+# fitting: conteos == json.loads y estimación sin el sesgo del banco de síntomas
+# -----------------------------
+# P(sí | el paciente no tiene el síntoma) de Patient.answer_question con la
+# confianza uniforme en [0.6, 0.95]: miente con 1 - c y entonces dice "sí" con 0.9
+FALSE_YES = 0.9 * (1 - (0.6 + 0.95) / 2)
+
+
+def _reference_counts(path: str):
+    cases, reported, asked, yes = Counter(), Counter(), Counter(), Counter()
+    current = None
+    with open(path, 'rb') as f:
+        for line in f:
+            event = json.loads(line)
+            if event['t'] == 'case':
+                current = event['d']
+                cases[current] += 1
+                reported.update((current, s) for s in event['s'])
+            elif event['t'] == 'ask':
+                asked[current, event['s']] += 1
+                yes[current, event['s']] += event['a']
+    return cases, reported, asked, yes
+
+
+def check_fitting(dataset: Dataset, cases: int, seed: int):
+    from logic import fitting
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'events.jsonl')
+        with EventLog(path, snapshot_every=4) as log:
+            engine = GameEngine(dataset, rng=random.Random(seed), log=log)
+            for _ in range(cases * 20):
+                play_case(engine, suggest_policy)
+        ref_cases, ref_reported, ref_asked, ref_yes = _reference_counts(path)
+        ids = [d.id for d in dataset.diseases]
+        expected = {k: (ref_reported[k], ref_asked[k], ref_yes[k]) for k in set(ref_reported) | set(ref_asked)}
+        for workers in (None, 2):
+            counts = fitting.count_logs(dataset, [path], workers=workers, chunk_lines=97)
+            got = {(ids[d], dataset.symptoms[s]): (r, a, y) for d, s, r, a, y in counts.pairs()}
+            if got != expected or counts.cases.tolist() != [ref_cases[i] for i in ids]:
+                raise CheckFailed(f"fitting counts (workers={workers}) differ from json.loads")
+    catalog = fitting.fitted_catalog(dataset, counts, alpha=0.0, min_count=1)
+    for disease in catalog['diseases']:
+        n = ref_cases[disease['id']]
+        for symptom, p in disease['symptom_likelihood'].items():
+            key = (disease['id'], symptom)
+            if n < 200 or ref_asked[key] < 100:
+                continue
+            # sólo se pregunta a quien no lo reportó: reportes + resto a la tasa de "sí" falsos
+            share = ref_reported[key] / n
+            truth = share + (1 - share) * FALSE_YES
+            # 4 desvíos del muestreo de las respuestas
+            tolerance = 4 * (1 - share) * (FALSE_YES * (1 - FALSE_YES) / ref_asked[key]) ** 0.5
+            if abs(p - truth) > tolerance:
+                raise CheckFailed(f"fitted P({symptom}|{disease['id']}) = {p:.3f}, expected about {truth:.3f}")
+
+
+# -----------------------------
+# catálogo en arreglos (streaming y caché compilada) == JSON, sin crear los Disease
+# -----------------------------
+def _built(dataset: Dataset) -> int:
+    # CompiledDiseases crea cada Disease al leerlo
+    return sum(d is not None for d in dataset.diseases._items)
+
+
+def check_catalog(dataset: Dataset, cases: int, seed: int):
+    from logic.catalog_cache import compile_catalog
+    with tempfile.TemporaryDirectory() as tmp:
+        streamed = os.path.join(tmp, 'diseases.jsonl')
+        with open(streamed, 'w', encoding='utf-8') as f:
+            for d in dataset.diseases:
+                f.write(json.dumps({'id': d.id, 'name': d.name, 'prior': d.prior,
+                                    'symptom_likelihood': d.symptom_likelihood,
+                                    'risk_factors': d.risk_factors}) + '\n')
+        compiled = os.path.join(tmp, 'diseases.json')
+        shutil.copyfile(dataset.path, compiled)
+        compile_catalog(compiled)
+        for path in (streamed, compiled):
+            for config in ({'backend': 'dict'}, {'backend': 'dict', 'prune': 1e-3}):
+                other = Dataset(path)
+                if other.compiled is None:
+                    raise CheckFailed(f"catalog {os.path.basename(path)}: not loaded into arrays")
+                for case in range(cases):
+                    rng = random.Random(seed * 100003 + case)
+                    engine = GameEngine(other, rng=random.Random(case), **config)
+                    # sólo la enfermedad del paciente
+                    if case == 0 and _built(other) > 1:
+                        raise CheckFailed(f"catalog {os.path.basename(path)} {config}: "
+                                          f"engine built {_built(other)} Disease objects")
+                    reference = GameEngine(dataset, rng=random.Random(case), **config)
+                    # mismas acciones en los dos motores
+                    actions, play_seed = rng.randint(0, 8), rng.random()
+                    _play(engine, random.Random(play_seed), actions)
+                    _play(reference, random.Random(play_seed), actions)
+                    diff = _max_diff(engine.belief, reference.belief)
+                    if diff > TOLERANCE:
+                        raise CheckFailed(f"catalog {os.path.basename(path)} {config} case {case}: "
+                                          f"belief differs by {diff:.3g}")
+
+
+CHECKS: Dict[str, Callable[[Dataset, int, int], None]] = {
+    'replay': check_replay,
+    'log': check_log,
+    'cache': check_cache,
+    'fitting': check_fitting,
+    'catalog': check_catalog,
+}
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('checks', nargs='*', metavar='check',
+                        help=f"comprobaciones a correr: {', '.join(CHECKS)} (por defecto todas)")
+    parser.add_argument('--data', default=DATA_PATH)
+    parser.add_argument('--cases', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.checks if name not in CHECKS]
+    if unknown:
+        parser.error(f"unknown check(s): {', '.join(unknown)}")
+    dataset = Dataset(args.data)
+    failed = 0
+    for name in args.checks or list(CHECKS):
+        t0 = time.perf_counter()
+        try:
+            CHECKS[name](dataset, args.cases, args.seed)
+        except CheckFailed as exc:
+            failed += 1
+            print(f"FAIL {name}: {exc}", file=sys.stderr)
+        else:
+            print(f"ok   {name} ({time.perf_counter() - t0:.1f} s)", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,57 @@
+"""synthetic.py
+Catálogos sintéticos con la misma forma que data/diseases.json (y el CSV de
+core/engine.py) para medir el motor a distintas escalas.
+"""
+import csv
+import json
+import random
+from typing import Dict, List
+
+FACTORS = ["fuma", "dieta", "padre", "madre"]
+
+
+def make_catalog(n_diseases: int, n_symptoms: int, per_disease: int = 6,
+                 seed: int = 0) -> Dict[str, List[Dict]]:
+    """Catálogo {'diseases': [...]} con n_diseases enfermedades sobre un
+    vocabulario de n_symptoms síntomas; cada enfermedad lista hasta
+    per_disease síntomas con P(s|d) en [0.05, 0.95]."""
+    rng = random.Random(seed)
+    symptoms = [f"s{j:06d}" for j in range(n_symptoms)]
+    weights = [rng.random() for _ in range(n_diseases)]
+    total = sum(weights)
+    diseases = []
+    for i in range(n_diseases):
+        k = min(per_disease, n_symptoms)
+        listed = rng.sample(symptoms, rng.randint(1, k))
+        diseases.append({
+            "id": f"D{i:06d}",
+            "name": f"Enfermedad {i}",
+            "prior": weights[i] / total,
+            "symptom_likelihood": {s: round(rng.uniform(0.05, 0.95), 3) for s in listed},
+            "risk_factors": {"fuma": round(rng.uniform(0.0, 0.3), 3)} if rng.random() < 0.3 else {},
+        })
+    # cada síntoma del vocabulario aparece al menos una vez
+    for j, s in enumerate(symptoms):
+        d = diseases[j % n_diseases]
+        d["symptom_likelihood"].setdefault(s, round(rng.uniform(0.05, 0.95), 3))
+    return {"diseases": diseases}
+
+
+def write_json(catalog: Dict, path: str):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(catalog, f, ensure_ascii=False)
+
+
+def write_csv(catalog: Dict, diseases_path: str, symptoms_path: str):
+    """Escribe el catálogo en el formato de core/engine.py (enfermedades.csv, sintomas.csv)."""
+    symptoms = set()
+    with open(diseases_path, 'w', encoding='utf-8', newline='') as f:
+        w = csv.writer(f)
+        w.writerow(["codigo", "nombre", "prior", "sintomas"])
+        for d in catalog["diseases"]:
+            listed = list(d["symptom_likelihood"])
+            symptoms.update(listed)
+            w.writerow([d["id"], d["name"], d["prior"], ",".join(listed)])
+    with open(symptoms_path, 'w', encoding='utf-8') as f:
+        for s in sorted(symptoms):
+            f.write(s + "\n")
@@ -1,44 +1,145 @@
-import random, csv
+import csv, itertools, random
+from collections.abc import Mapping
+
+# P(síntoma | enfermedad): 1 si la enfermedad lo lista, ABSENT si no
+ABSENT = 0.1
+
+class DiseaseTable(Mapping):
+    """codigo -> {'nombre', 'sintomas', 'prior'}, armado desde los arreglos del motor al leerlo."""
+    def __init__(self, engine):
+        self.engine = engine
+    def __getitem__(self, code):
+        e = self.engine
+        i = e.code_index[code]
+        a, b = int(e.indptr[i]), int(e.indptr[i + 1])
+        return {'nombre': e.names[i], 'sintomas': [e.all_symptoms[j] for j in e.indices[a:b]],
+                'prior': float(e.priors[i])}
+    def __iter__(self): return iter(self.engine.codes)
+    def __len__(self): return len(self.engine.codes)
 
 class DiagnosisEngine:
-    def __init__(self, diseases_path, symptoms_path):
+    def __init__(self, diseases_path, symptoms_path, stream=None):
+        """`stream` (por defecto: si NumPy está instalado) lee el CSV con
+        logic/catalog_stream.py a arreglos NumPy; si no, a listas de Python."""
+        self.np = self._numpy() if stream is None or stream else None
+        if stream and self.np is None:
+            raise ImportError("stream=True requires NumPy")
         self.diseases = self.load_diseases(diseases_path)
         self.symptoms = self.load_symptoms(symptoms_path)
-        self.all_symptoms = sorted(set(s for d in self.diseases.values() for s in d['sintomas']))
-        self.real_disease = random.choice(list(self.diseases.keys()))
+        self.build_index()
+        self.real_disease = random.choice(self.codes)
         self.known = set()
-        self.probs = {k: v['prior'] for k, v in self.diseases.items()}
+        # síntomas aún no preguntados (quitar = intercambiar con el último)
+        self.remaining = list(self.all_symptoms)
+        self.remaining_pos = {s: j for j, s in enumerate(self.remaining)}
+        self.belief = self.priors.copy()
         self.normalize()
+    @staticmethod
+    def _numpy():
+        try:
+            import numpy
+        except ImportError:
+            return None
+        return numpy
     def load_diseases(self, path):
-        diseases = {}
-        with open(path, encoding='utf-8') as f:
-            r = csv.DictReader(f)
+        # forma indexada del catálogo (CSR por enfermedad); diseases es una vista sobre ella
+        if self.np is not None:
+            # lectura en streaming a arreglos compactos
+            from logic.catalog_stream import read_catalog
+            c = read_catalog(path, 'csv')
+            self.codes, self.names = c.ids.tolist(), c.names
+            self.priors = self.np.array(c.priors, dtype=self.np.float64)
+            self.indptr, self.indices = c.indptr, c.indices
+            self.all_symptoms = c.symptoms.tolist()
+        else:
+            self.load_csv(path)
+        self.code_index = {code: i for i, code in enumerate(self.codes)}
+        return DiseaseTable(self)
+    def load_csv(self, path):
+        # mismo formato que logic/catalog_stream.py (importa NumPy), en listas de Python
+        rows = []
+        with open(path, encoding='utf-8', newline='') as f:
+            r = csv.reader(f)
+            header = next(r)
+            c_code, c_name, c_prior, c_sint = (header.index(k) for k in ('codigo', 'nombre', 'prior', 'sintomas'))
             for row in r:
-                code = row['codigo']
-                sintomas = [s.strip() for s in row['sintomas'].split(',')]
-                diseases[code] = {'nombre': row['nombre'], 'sintomas': sintomas, 'prior': float(row['prior'])}
-        return diseases
+                if not row:
+                    continue
+                # sin comillas, los síntomas después del primero quedan en columnas extra;
+                # "nombre:P" vale como "nombre" (aquí sólo importa si la enfermedad lo lista)
+                items = (item.partition(':')[0].strip() for field in row[c_sint:] for item in field.split(','))
+                rows.append((row[c_code], row[c_name], float(row[c_prior]), list(dict.fromkeys(filter(None, items)))))
+        self.all_symptoms = sorted({s for *_, sintomas in rows for s in sintomas})
+        index = {s: j for j, s in enumerate(self.all_symptoms)}
+        self.codes = [code for code, *_ in rows]
+        self.names = [name for _, name, *_ in rows]
+        self.priors = [prior for _, _, prior, _ in rows]
+        self.indptr = list(itertools.accumulate((len(sintomas) for *_, sintomas in rows), initial=0))
+        self.indices = [index[s] for *_, sintomas in rows for s in sintomas]
     def load_symptoms(self, path):
         with open(path, encoding='utf-8') as f:
             return [line.strip() for line in f if line.strip()]
+    def build_index(self):
+        # índices calculados una vez al cargar
+        self.symptom_index = {s: j for j, s in enumerate(self.all_symptoms)}
+        # por síntoma (CSC): enfermedades que lo listan en carrier_rows[carrier_ptr[j]:carrier_ptr[j + 1]]
+        if self.np is not None:
+            np = self.np
+            order = np.argsort(self.indices, kind='stable')
+            self.carrier_rows = np.repeat(np.arange(len(self.codes), dtype=np.intp), np.diff(self.indptr))[order]
+            self.carrier_ptr = np.zeros(len(self.all_symptoms) + 1, dtype=np.intp)
+            np.cumsum(np.bincount(self.indices, minlength=len(self.all_symptoms)), out=self.carrier_ptr[1:])
+        else:
+            rows = [[] for _ in self.all_symptoms]
+            for i in range(len(self.codes)):
+                for j in self.indices[self.indptr[i]:self.indptr[i + 1]]:
+                    rows[j].append(i)
+            self.carrier_rows = [i for r in rows for i in r]
+            self.carrier_ptr = list(itertools.accumulate(map(len, rows), initial=0))
+    def carriers(self, j):
+        return self.carrier_rows[self.carrier_ptr[j]:self.carrier_ptr[j + 1]]
+    @property
+    def probs(self): return dict(zip(self.codes, self.belief if self.np is None else self.belief.tolist()))
     def normalize(self):
-        s = sum(self.probs.values())
-        for k in self.probs:
-            self.probs[k] /= s
-    def get_probabilities(self): return dict(sorted(self.probs.items(), key=lambda x: -x[1]))
+        if self.np is None:
+            s = sum(self.belief)
+            if s > 0:
+                self.belief = [p / s for p in self.belief]
+            return
+        s = self.belief.sum()
+        if s > 0:
+            self.belief /= s
+    def get_probabilities(self):
+        if self.np is None:
+            order = sorted(range(len(self.belief)), key=lambda i: -self.belief[i])
+        else:
+            order = self.np.argsort(-self.belief, kind='stable').tolist()
+        return {self.codes[i]: float(self.belief[i]) for i in order}
     def choose_symptom(self):
-        remaining = [s for s in self.all_symptoms if s not in self.known]
-        return random.choice(remaining) if remaining else None
+        return random.choice(self.remaining) if self.remaining else None
     def patient_has(self, symptom):
         self.known.add(symptom)
-        return symptom in self.diseases[self.real_disease]['sintomas']
+        j = self.remaining_pos.pop(symptom, None)
+        if j is not None:
+            last = self.remaining.pop()
+            if last != symptom:
+                self.remaining[j] = last
+                self.remaining_pos[last] = j
+        j = self.symptom_index.get(symptom)
+        i = self.code_index[self.real_disease]
+        return j is not None and bool(j in self.indices[self.indptr[i]:self.indptr[i + 1]])
     def update_probabilities(self, symptom, has):
-        for code, info in self.diseases.items():
-            p_symptom_given_disease = 1 if symptom in info['sintomas'] else 0.1
-            if has:
-                self.probs[code] *= p_symptom_given_disease
-            else:
-                self.probs[code] *= (1 - p_symptom_given_disease)
+        j = self.symptom_index.get(symptom)
+        if j is None:
+            # ninguna enfermedad lo lista: el factor es igual para todas
+            return
+        # el factor común de las que no lo listan (ABSENT o 1 - ABSENT) se va al normalizar
+        factor = 1 / ABSENT if has else 0.0
+        if self.np is None:
+            for i in self.carriers(j):
+                self.belief[i] *= factor
+        else:
+            self.belief[self.carriers(j)] *= factor
         self.normalize()
     def diagnose(self):
         print("\nEnfermedades no descartadas:")
@@ -0,0 +1,183 @@
+"""catalog_cache.py
+Compila el catálogo (JSON, JSONL o CSV) a un formato binario compacto junto al archivo fuente
+(``diseases.json`` -> ``diseases.json.cache/``): arreglos .npy que se abren con
+memory-map (priors y P(symptom|disease) en formato CSR) y tablas de cadenas.
+La caché guarda el sha256 del archivo fuente y sólo se usa si coincide.
+
+Uso:
+    python -m logic.catalog_cache data/diseases.json
+"""
+import json
+import os
+import shutil
+import sys
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .dataset import Disease
+from .utils import source_matches, source_stamp
+
+CACHE_VERSION = 1
+_STRING_TABLES = ('ids', 'names', 'symptoms', 'factors')
+# un .npy por arreglo
+ARRAYS = tuple(n for t in _STRING_TABLES for n in (t, f'{t}_offsets')) + (
+    'priors', 'indptr', 'indices', 'values', 'rf_indptr', 'rf_indices', 'rf_values')
+
+
+def cache_dir_for(path: Path) -> Path:
+    return path.with_name(path.name + '.cache')
+
+
+class StringTable(Sequence):
+    """Cadenas UTF-8 concatenadas en un blob + offsets; se decodifican al leerlas."""
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray):
+        self._blob = blob
+        self._offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        a, b = int(self._offsets[i]), int(self._offsets[i + 1])
+        return self._blob[a:b].tobytes().decode('utf-8')
+
+    def tolist(self) -> List[str]:
+        """Decodifica toda la tabla de una vez (más rápido que leer una por una)."""
+        data = self._blob.tobytes()
+        offsets = self._offsets.tolist()
+        return [data[a:b].decode('utf-8') for a, b in zip(offsets, offsets[1:])]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.tolist())
+
+    @staticmethod
+    def encode(strings: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """(blob, offsets) de una lista de cadenas."""
+        encoded = [s.encode('utf-8') for s in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(e) for e in encoded], out=offsets[1:])
+        return np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets
+
+
+class CompiledCatalog:
+    """Vista de sólo lectura sobre el catálogo en arreglos: memory-mapped desde una
+    caché (open) o en memoria (catalog_stream.read_catalog)."""
+    def __init__(self, arrays: Dict[str, np.ndarray], meta: Dict[str, Any],
+                 directory: Optional[Path] = None):
+        self.arrays = arrays
+        self.meta = meta
+        self.directory = directory
+        for name in _STRING_TABLES:
+            setattr(self, name, StringTable(arrays[name], arrays[f'{name}_offsets']))
+        self.priors = arrays['priors']
+        # P(symptom | disease) en CSR: fila = enfermedad, columna = índice en symptoms
+        self.indptr = arrays['indptr']
+        self.indices = arrays['indices']
+        self.values = arrays['values']
+        # risk_factors en CSR: columna = índice en factors
+        self.rf_indptr = arrays['rf_indptr']
+        self.rf_indices = arrays['rf_indices']
+        self.rf_values = arrays['rf_values']
+
+    @classmethod
+    def open(cls, directory: Path, meta: Dict[str, Any]) -> 'CompiledCatalog':
+        return cls({name: np.load(directory / f'{name}.npy', mmap_mode='r') for name in ARRAYS},
+                   meta, directory)
+
+    def __len__(self) -> int:
+        return len(self.priors)
+
+    def disease(self, i: int) -> Disease:
+        a, b = int(self.indptr[i]), int(self.indptr[i + 1])
+        ra, rb = int(self.rf_indptr[i]), int(self.rf_indptr[i + 1])
+        symptoms, factors = self.symptoms, self.factors
+        return Disease({
+            'id': self.ids[i],
+            'name': self.names[i],
+            'prior': float(self.priors[i]),
+            'symptom_likelihood': {symptoms[j]: v for j, v in
+                                   zip(self.indices[a:b].tolist(), self.values[a:b].tolist())},
+            'risk_factors': {factors[j]: v for j, v in
+                             zip(self.rf_indices[ra:rb].tolist(), self.rf_values[ra:rb].tolist())},
+        })
+
+    def diseases(self) -> 'CompiledDiseases':
+        return CompiledDiseases(self)
+
+
+class CompiledDiseases(Sequence):
+    """Lista de Disease que crea cada objeto sólo la primera vez que se lee."""
+    def __init__(self, catalog: CompiledCatalog):
+        self._catalog = catalog
+        self._items: List[Optional[Disease]] = [None] * len(catalog)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        d = self._items[i]
+        if d is None:
+            d = self._items[i] = self._catalog.disease(i % len(self._items))
+        return d
+
+    def __iter__(self) -> Iterator[Disease]:
+        for i in range(len(self._items)):
+            yield self[i]
+
+
+def compile_catalog(path, out_dir=None) -> Path:
+    """Compila el catálogo en `path` (JSON, JSONL o CSV, leído en streaming por
+    catalog_stream) a la caché binaria y devuelve su directorio."""
+    from .catalog_stream import read_catalog
+    path = Path(path)
+    out = Path(out_dir) if out_dir is not None else cache_dir_for(path)
+    stamp = source_stamp(path)
+    catalog = read_catalog(path)
+
+    # se escribe en un directorio temporal y se reemplaza al final
+    tmp = out.with_name(out.name + '.tmp')
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    for name in ARRAYS:
+        np.save(tmp / f'{name}.npy', catalog.arrays[name])
+    meta = {
+        'version': CACHE_VERSION,
+        **stamp,
+        'n_diseases': len(catalog),
+        'n_symptoms': len(catalog.symptoms),
+    }
+    with open(tmp / 'meta.json', 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+    shutil.rmtree(out, ignore_errors=True)
+    os.replace(tmp, out)
+    return out
+
+
+def open_compiled(path) -> Optional[CompiledCatalog]:
+    """Abre la caché de `path` si existe y corresponde al JSON actual; si no, None."""
+    path = Path(path)
+    directory = cache_dir_for(path)
+    try:
+        with open(directory / 'meta.json', 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get('version') != CACHE_VERSION or not source_matches(path, meta):
+        return None
+    try:
+        return CompiledCatalog.open(directory, meta)
+    except (OSError, ValueError):
+        return None
+
+
+if __name__ == '__main__':
+    for p in sys.argv[1:] or [os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'diseases.json')]:
+        print(compile_catalog(p))
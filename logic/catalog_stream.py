@@ -0,0 +1,244 @@
+"""catalog_stream.py
+Lectura en streaming de catálogos grandes, registro por registro, a los mismos
+arreglos compactos que usa la caché binaria (catalog_cache.CompiledCatalog):
+
+    .json         {"diseases": [...]} (se decodifica una enfermedad a la vez)
+    .jsonl        una enfermedad JSON por línea
+    .csv          codigo,nombre,prior,sintomas como data/enfermedades.csv;
+                  cada síntoma es "nombre" o "nombre:P(s|d)"
+
+La primera pasada cuenta enfermedades, síntomas, entradas y bytes de texto; la
+segunda llena arreglos ya reservados con su tamaño final, así que la memoria
+máxima queda cerca del tamaño de la representación final.
+Dataset y el backend 'dict' de GameEngine leen de esos arreglos sin armar
+un Disease por enfermedad (Dataset.symptom_likelihoods); 'matrix' y 'log'
+necesitan la matriz densa enfermedad×síntoma.
+
+Uso:
+    python -m logic.catalog_stream catalogo.jsonl
+"""
+import csv
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import numpy as np
+
+from .catalog_cache import CompiledCatalog, StringTable
+
+# P(symptom | disease) de un síntoma del CSV sin probabilidad (como core/engine.py)
+CSV_LIKELIHOOD = 1.0
+FORMATS = ('json', 'jsonl', 'csv')
+_CHUNK = 1 << 20
+
+# (id, nombre, prior, symptom_likelihood, risk_factors)
+Record = Tuple[str, str, float, Dict[str, float], Dict[str, float]]
+
+
+def format_of(path: Path) -> str:
+    suffix = path.suffix.lower()
+    if suffix in ('.jsonl', '.ndjson'):
+        return 'jsonl'
+    if suffix == '.csv':
+        return 'csv'
+    return 'json'
+
+
+def _record(raw: Dict[str, Any]) -> Record:
+    # mismos valores por defecto que dataset.Disease
+    id_ = raw['id']
+    return (id_, raw.get('name', id_), float(raw.get('prior', 0.0)),
+            raw.get('symptom_likelihood', {}), raw.get('risk_factors', {}))
+
+
+def _iter_json(path: Path) -> Iterator[Record]:
+    """Enfermedades del arreglo "diseases" (o de un arreglo en la raíz), de a una."""
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buf = f.read(_CHUNK)
+        # inicio del arreglo: después de la clave "diseases" si existe
+        while True:
+            key = buf.find('"diseases"')
+            start = buf.find('[', key + 1 if key >= 0 else 0)
+            if start >= 0 and (key >= 0 or buf.lstrip().startswith('[')):
+                break
+            more = f.read(_CHUNK)
+            if not more:
+                return
+            buf += more
+        pos = start + 1
+        while True:
+            # separadores entre elementos
+            while True:
+                while pos < len(buf) and buf[pos] in ' \t\r\n,':
+                    pos += 1
+                if pos < len(buf):
+                    break
+                more = f.read(_CHUNK)
+                if not more:
+                    raise ValueError(f"{path}: arreglo sin cerrar")
+                buf, pos = more, 0
+            if buf[pos] == ']':
+                return
+            try:
+                raw, end = decoder.raw_decode(buf, pos)
+            except ValueError:
+                # objeto cortado al final del bloque: se lee más
+                more = f.read(_CHUNK)
+                if not more:
+                    raise
+                buf, pos = buf[pos:] + more, 0
+                continue
+            yield _record(raw)
+            pos = end
+            if pos > _CHUNK:
+                buf, pos = buf[pos:], 0
+
+
+def _iter_jsonl(path: Path) -> Iterator[Record]:
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield _record(json.loads(line))
+
+
+def _iter_csv(path: Path) -> Iterator[Record]:
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        r = csv.reader(f)
+        header = next(r)
+        c_code, c_name, c_prior, c_sint = (header.index(k) for k in ('codigo', 'nombre', 'prior', 'sintomas'))
+        for row in r:
+            if not row:
+                continue
+            # sin comillas, los síntomas después del primero quedan en columnas extra
+            items = [item.strip() for field in row[c_sint:] for item in field.split(',')]
+            if not any(':' in item for item in items):
+                likelihood = dict.fromkeys(filter(None, items), CSV_LIKELIHOOD)
+            else:
+                likelihood = {}
+                for item in items:
+                    name, _, p = item.partition(':')
+                    if name.strip():
+                        likelihood[name.strip()] = float(p) if p.strip() else CSV_LIKELIHOOD
+            yield row[c_code], row[c_name], float(row[c_prior]), likelihood, {}
+
+
+def iter_records(path, fmt: Optional[str] = None) -> Iterator[Record]:
+    path = Path(path)
+    fmt = fmt or format_of(path)
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown catalog format {fmt!r}, expected one of {FORMATS}")
+    return {'json': _iter_json, 'jsonl': _iter_jsonl, 'csv': _iter_csv}[fmt](path)
+
+
+class _Filler:
+    """Copia los registros a los arreglos reservados por bloques de BLOCK filas
+    (pocas operaciones NumPy por bloque en lugar de varias por registro)."""
+    BLOCK = 4096
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        self.a = arrays
+        self.n = self.k = self.rk = self.id_pos = self.name_pos = 0
+        self._start = 0
+        self._reset()
+
+    def _reset(self):
+        self._ids, self._names, self._priors = [], [], []
+        self._indices, self._values, self._counts = [], [], []
+        self._rf_indices, self._rf_values, self._rf_counts = [], [], []
+
+    def add(self, id_, name, prior, indices, values, rf_indices, rf_values):
+        self._ids.append(id_.encode('utf-8'))
+        self._names.append(name.encode('utf-8'))
+        self._priors.append(prior)
+        self._indices.extend(indices)
+        self._values.extend(values)
+        self._counts.append(len(indices))
+        self._rf_indices.extend(rf_indices)
+        self._rf_values.extend(rf_values)
+        self._rf_counts.append(len(rf_indices))
+        self.n += 1
+        if len(self._priors) >= self.BLOCK:
+            self.flush()
+
+    def _strings(self, name: str, pos: int, items) -> int:
+        blob = b''.join(items)
+        self.a[name][pos:pos + len(blob)] = memoryview(blob)
+        offsets = self.a[f'{name}_offsets'][self._start + 1:self.n + 1]
+        np.cumsum([len(b) for b in items], out=offsets)
+        offsets += pos
+        return pos + len(blob)
+
+    def _csr(self, prefix: str, pos: int, indices, values, counts) -> int:
+        end = pos + len(indices)
+        self.a[f'{prefix}indices'][pos:end] = indices
+        self.a[f'{prefix}values'][pos:end] = values
+        indptr = self.a[f'{prefix}indptr'][self._start + 1:self.n + 1]
+        np.cumsum(counts, out=indptr)
+        indptr += pos
+        return end
+
+    def flush(self):
+        if not self._priors:
+            return
+        self.id_pos = self._strings('ids', self.id_pos, self._ids)
+        self.name_pos = self._strings('names', self.name_pos, self._names)
+        self.a['priors'][self._start:self.n] = self._priors
+        self.k = self._csr('', self.k, self._indices, self._values, self._counts)
+        self.rk = self._csr('rf_', self.rk, self._rf_indices, self._rf_values, self._rf_counts)
+        self._start = self.n
+        self._reset()
+
+
+def read_catalog(path, fmt: Optional[str] = None) -> CompiledCatalog:
+    """Lee el catálogo en dos pasadas y lo devuelve como CompiledCatalog en memoria."""
+    path = Path(path)
+    # 1ª pasada: tamaños
+    n = nnz = rf_nnz = id_bytes = name_bytes = 0
+    symptoms, factors = set(), set()
+    for id_, name, _, likelihood, risk in iter_records(path, fmt):
+        n += 1
+        nnz += len(likelihood)
+        rf_nnz += len(risk)
+        id_bytes += len(id_.encode('utf-8'))
+        name_bytes += len(name.encode('utf-8'))
+        symptoms.update(likelihood)
+        factors.update(risk)
+    symptoms, factors = sorted(symptoms), sorted(factors)
+    s_index = {s: j for j, s in enumerate(symptoms)}
+    f_index = {k: j for j, k in enumerate(factors)}
+
+    # 2ª pasada: arreglos con su tamaño final
+    a = {
+        'ids': np.empty(id_bytes, dtype=np.uint8), 'ids_offsets': np.zeros(n + 1, dtype=np.int64),
+        'names': np.empty(name_bytes, dtype=np.uint8), 'names_offsets': np.zeros(n + 1, dtype=np.int64),
+        'priors': np.empty(n, dtype=np.float64),
+        'indptr': np.zeros(n + 1, dtype=np.int64),
+        'indices': np.empty(nnz, dtype=np.int32), 'values': np.empty(nnz, dtype=np.float64),
+        'rf_indptr': np.zeros(n + 1, dtype=np.int64),
+        'rf_indices': np.empty(rf_nnz, dtype=np.int32), 'rf_values': np.empty(rf_nnz, dtype=np.float64),
+    }
+    filled = _Filler(a)
+    for id_, name, prior, likelihood, risk in iter_records(path, fmt):
+        if filled.n >= n:
+            raise ValueError(f"{path} cambió durante la lectura")
+        # se conserva el orden del catálogo dentro de cada fila
+        filled.add(id_, name, prior, [s_index[s] for s in likelihood], likelihood.values(),
+                   [f_index[f] for f in risk], risk.values())
+    filled.flush()
+    if filled.n != n or filled.k != nnz or filled.rk != rf_nnz:
+        raise ValueError(f"{path} cambió durante la lectura")
+    a['symptoms'], a['symptoms_offsets'] = StringTable.encode(symptoms)
+    a['factors'], a['factors_offsets'] = StringTable.encode(factors)
+    return CompiledCatalog(a, {'n_diseases': n, 'n_symptoms': len(symptoms)})
+
+
+if __name__ == '__main__':
+    for p in sys.argv[1:]:
+        t0 = time.perf_counter()
+        catalog = read_catalog(p)
+        size = sum(arr.nbytes for arr in catalog.arrays.values())
+        print(f"{p}: {len(catalog)} enfermedades, {len(catalog.symptoms)} síntomas, "
+              f"{size / 1e6:.1f} MB en {time.perf_counter() - t0:.2f} s")
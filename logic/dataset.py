@@ -1,9 +1,32 @@
 """dataset.py
 Carga y representación del banco de enfermedades.
 """
+import itertools
 import json
 from pathlib import Path
-from typing import Dict, Any, List
+from types import MappingProxyType
+from typing import Dict, Any, List, Mapping, Optional, Sequence, Tuple
+
+from .metrics import METRICS
+
+# P(symptom | disease) asumida cuando el catálogo no lista el síntoma
+DEFAULT_LIKELIHOOD = 0.01
+# a partir de este tamaño un .json se lee en streaming (logic/catalog_stream.py)
+STREAM_MIN_BYTES = 32 << 20
+
+# valores posibles del perfil del paciente (historia familiar y hábitos)
+PROFILE_OPTIONS: Dict[str, List[str]] = {
+    "padre": ["Ninguna", "Cáncer de pulmón", "Asma", "Anemia"],
+    "madre": ["Ninguna", "Alergia", "Anemia", "Bronquitis"],
+    "dieta": ["omnivoro", "vegetariano", "vegano"],
+    "fuma": ["sí", "no"],
+}
+# campos con historia familiar: el valor es el nombre de una enfermedad
+FAMILY_HISTORY_KEYS = ("padre", "madre")
+# valor del perfil que activa un risk_factor del catálogo con el mismo nombre (p.ej. "fuma": "sí")
+RISK_FACTOR_PRESENT = "sí"
+# peso de un padre/madre con la enfermedad (misma escala que risk_factors)
+FAMILY_HISTORY_WEIGHT = 1.0
 
 class Disease:
     def __init__(self, raw: Dict[str, Any]):
@@ -12,32 +35,283 @@ class Disease:
         self.prior = float(raw.get('prior', 0.0))
         self.symptom_likelihood = raw.get('symptom_likelihood', {})
         self.risk_factors = raw.get('risk_factors', {})
+        # síntoma más probable de la enfermedad (None si no tiene síntomas)
+        self.top_symptom: Optional[str] = (
+            max(self.symptom_likelihood.items(), key=lambda x: x[1])[0]
+            if self.symptom_likelihood else None
+        )
 
     def likelihood(self, symptom: str) -> float:
         # P(symptom | disease)
-        return float(self.symptom_likelihood.get(symptom, 0.01))
+        return float(self.symptom_likelihood.get(symptom, DEFAULT_LIKELIHOOD))
+
+class SymptomBits(Mapping):
+    """síntoma -> 1 << posición, calculado al leerlo (guardar todos los enteros
+    ocuparía memoria cuadrática en el tamaño del vocabulario)."""
+    __slots__ = ('_position',)
+
+    def __init__(self, symptoms: Sequence[str]):
+        self._position = {s: j for j, s in enumerate(symptoms)}
+
+    def __getitem__(self, symptom: str) -> int:
+        return 1 << self._position[symptom]
+
+    def get(self, symptom: str, default=None):
+        j = self._position.get(symptom)
+        return default if j is None else 1 << j
+
+    def __contains__(self, symptom) -> bool:
+        return symptom in self._position
+
+    def __iter__(self):
+        return iter(self._position)
+
+    def __len__(self) -> int:
+        return len(self._position)
+
+class DiseaseMap(Mapping):
+    """id -> symptom_likelihood que lee cada enfermedad sólo al pedirla (con la
+    caché compilada no se crean todos los Disease)."""
+    __slots__ = ('_dataset',)
+
+    def __init__(self, dataset: 'Dataset'):
+        self._dataset = dataset
+
+    def __getitem__(self, id_: str) -> Mapping[str, float]:
+        return self._dataset.get_by_id(id_).symptom_likelihood
+
+    def __contains__(self, id_) -> bool:
+        return id_ in self._dataset._index_of
+
+    def __iter__(self):
+        return iter(self._dataset._index_of)
+
+    def __len__(self) -> int:
+        return len(self._dataset._index_of)
 
 class Dataset:
-    def __init__(self, path: str):
+    @METRICS.timed('dataset_load')
+    def __init__(self, path: str, use_cache: bool = True, stream: Optional[bool] = None):
+        """Si existe una caché compilada vigente (logic/catalog_cache.py) se abre
+        sin copiar; si no, se lee el catálogo. Con `stream` (por defecto: .jsonl,
+        .csv o .json de STREAM_MIN_BYTES o más) se lee registro por registro a
+        arreglos compactos (logic/catalog_stream.py) en lugar de json.load."""
         self.path = Path(path)
-        self.diseases = self._load()
+        self.compiled = self._open_compiled() if use_cache else None
+        if self.compiled is None and self._should_stream(stream):
+            from .catalog_stream import read_catalog
+            self.compiled = read_catalog(self.path)
+        if self.compiled is not None:
+            self.diseases = self.compiled.diseases()
+            self._build_indexes(self.compiled.ids.tolist(), self.compiled.priors.tolist(),
+                                tuple(self.compiled.symptoms.tolist()))
+            self._symptom_index = None
+        else:
+            self.diseases = self._load()
+            self._build_indexes([d.id for d in self.diseases], [d.prior for d in self.diseases],
+                                tuple(sorted({s for d in self.diseases for s in d.symptom_likelihood})))
+            self._symptom_index = self._invert()
+        self._likelihood_matrix = None
+        self._disease_map = DiseaseMap(self)
+        # síntoma -> {id: P(symptom | disease)}, se llena al preguntar
+        self._columns: Dict[str, Mapping[str, float]] = {}
+        self._csc = None
+        self._question_tree = False  # sin cargar
+        self._build_profile_priors()
+
+    def _open_compiled(self):
+        # sin directorio de caché no hace falta importar NumPy
+        if not self.path.with_name(self.path.name + '.cache').is_dir():
+            return None
+        try:
+            from .catalog_cache import open_compiled
+        except ImportError:
+            # sin NumPy no hay caché binaria
+            return None
+        return open_compiled(self.path)
+
+    def _should_stream(self, stream: Optional[bool]) -> bool:
+        if stream is not None:
+            return stream
+        if self.path.suffix.lower() in ('.jsonl', '.ndjson', '.csv'):
+            return True
+        if self.path.stat().st_size < STREAM_MIN_BYTES:
+            return False
+        try:
+            import numpy  # noqa: F401
+        except ImportError:
+            return False
+        return True
 
     def _load(self) -> List[Disease]:
         with open(self.path, 'r', encoding='utf-8') as f:
             raw = json.load(f)
         return [Disease(d) for d in raw.get('diseases', [])]
 
-    def priors(self) -> Dict[str, float]:
-        return {d.id: d.prior for d in self.diseases}
+    def _build_indexes(self, ids: List[str], priors: List[float], symptoms: Tuple[str, ...]):
+        # todo lo derivado del catálogo se calcula una vez al cargar
+        self._ids = ids
+        self._index_of: Dict[str, int] = {id_: i for i, id_ in enumerate(ids)}
+        self._priors: Dict[str, float] = dict(zip(ids, priors))
+        # vocabulario de síntomas ordenado e inmutable
+        self.symptoms: Tuple[str, ...] = symptoms
+        # bit de cada síntoma para representar conjuntos como máscaras enteras
+        self.symptom_bits: Mapping[str, int] = SymptomBits(self.symptoms)
 
-    def get_by_id(self, id_: str) -> Disease:
+    def _invert(self) -> Mapping[str, Tuple[Disease, ...]]:
+        inverted: Dict[str, List[Disease]] = {s: [] for s in self.symptoms}
         for d in self.diseases:
-            if d.id == id_:
-                return d
-        raise KeyError(f"Disease {id_} not found")
+            for symptom in d.symptom_likelihood:
+                inverted[symptom].append(d)
+        return MappingProxyType({s: tuple(ds) for s, ds in inverted.items()})
+
+    @property
+    def symptom_index(self) -> Mapping[str, Tuple[Disease, ...]]:
+        """Índice invertido síntoma -> enfermedades que lo listan."""
+        if self._symptom_index is None:
+            # con la caché compilada se construye la primera vez que se usa
+            self._symptom_index = self._invert()
+        return self._symptom_index
+
+    def _profile_weights(self) -> Dict[Tuple[str, str], List[Tuple[int, float]]]:
+        """(campo, valor) del perfil -> [(índice de enfermedad, peso)] que activa."""
+        weights: Dict[Tuple[str, str], List[Tuple[int, float]]] = {}
+        keys = [k for k in PROFILE_OPTIONS if k not in FAMILY_HISTORY_KEYS]
+        if self.compiled is not None:
+            # desde los arreglos CSR, sin crear los objetos Disease
+            c = self.compiled
+            column = {k: j for j, k in enumerate(c.factors.tolist())}
+            wanted = {column[k]: k for k in keys if k in column}
+            # fila de cada entrada CSR (NumPy ya está cargado con la caché)
+            rows = c.rf_indptr.searchsorted(range(len(c.rf_indices)), side='right') - 1
+            for j, k in wanted.items():
+                hit = c.rf_indices == j
+                weights[(k, RISK_FACTOR_PRESENT)] = list(zip(rows[hit].tolist(), c.rf_values[hit].tolist()))
+            names = c.names.tolist()
+        else:
+            for i, d in enumerate(self.diseases):
+                for k in keys:
+                    if k in d.risk_factors:
+                        weights.setdefault((k, RISK_FACTOR_PRESENT), []).append((i, float(d.risk_factors[k])))
+            names = [d.name for d in self.diseases]
+        family = {v for k in FAMILY_HISTORY_KEYS for v in PROFILE_OPTIONS.get(k, ())}
+        for i, name in enumerate(names):
+            if name in family:
+                for k in FAMILY_HISTORY_KEYS:
+                    weights.setdefault((k, name), []).append((i, FAMILY_HISTORY_WEIGHT))
+        return weights
+
+    def _build_profile_priors(self):
+        """Precalcula las priors de cada combinación de PROFILE_OPTIONS: cada factor
+        activo multiplica la prior por (1 + peso) y se reescala a la suma original.
+        Las combinaciones con los mismos factores activos comparten la tabla."""
+        self._weights = self._profile_weights()
+        ids = list(self._priors)
+        base = list(self._priors.values())
+        total = sum(base)
+        shared: Dict[Tuple[Tuple[str, str], ...], Mapping[str, float]] = {(): MappingProxyType(self._priors)}
+        table: Dict[Tuple[str, ...], Mapping[str, float]] = {}
+        for values in itertools.product(*PROFILE_OPTIONS.values()):
+            active = tuple(f for f in zip(PROFILE_OPTIONS, values) if f in self._weights)
+            if active not in shared:
+                shared[active] = MappingProxyType(self._adjusted(ids, base, total, active))
+            table[values] = shared[active]
+        self.profile_priors: Mapping[Tuple[str, ...], Mapping[str, float]] = MappingProxyType(table)
+
+    def _adjusted(self, ids: List[str], base: List[float], total: float,
+                  active: Tuple[Tuple[str, str], ...]) -> Dict[str, float]:
+        adjusted = list(base)
+        for factor in active:
+            for i, w in self._weights[factor]:
+                adjusted[i] *= 1.0 + w
+        scale = total / sum(adjusted) if sum(adjusted) > 0 else 1.0
+        return {id_: p * scale for id_, p in zip(ids, adjusted)}
+
+    def priors(self, profile: Optional[Mapping[str, Any]] = None) -> Dict[str, float]:
+        """Priors del catálogo o, con `profile`, ajustadas por los factores de riesgo
+        e historia familiar del paciente (búsqueda en la tabla precalculada)."""
+        if profile is None:
+            return dict(self._priors)
+        key = tuple(profile.get(k) for k in PROFILE_OPTIONS)
+        table = self.profile_priors.get(key)
+        if table is None:
+            # perfil fuera de PROFILE_OPTIONS: se calcula en el momento
+            active = tuple(f for f in zip(PROFILE_OPTIONS, key) if f in self._weights)
+            return self._adjusted(list(self._priors), list(self._priors.values()),
+                                  sum(self._priors.values()), active)
+        return dict(table)
+
+    def priors_key(self, profile: Optional[Mapping[str, Any]] = None) -> Tuple[Tuple[str, str], ...]:
+        """Factores del perfil que ajustan las priors: perfiles con la misma clave
+        empiezan desde las mismas priors (() = priors del catálogo)."""
+        if profile is None:
+            return ()
+        return tuple(f for f in ((k, profile.get(k)) for k in PROFILE_OPTIONS) if f in self._weights)
+
+    def get_by_id(self, id_: str) -> Disease:
+        try:
+            return self.diseases[self._index_of[id_]]
+        except KeyError:
+            raise KeyError(f"Disease {id_} not found") from None
+
+    def diseases_with(self, symptom: str) -> Tuple[Disease, ...]:
+        """Enfermedades cuyo catálogo incluye el síntoma."""
+        if self._symptom_index is None:
+            # con la caché compilada sólo se crean las de la columna
+            return tuple(self.get_by_id(h) for h in self.symptom_likelihoods(symptom))
+        return self._symptom_index.get(symptom, ())
+
+    def symptom_likelihoods(self, symptom: str) -> Mapping[str, float]:
+        """Columna del síntoma: id -> P(symptom | disease) de las enfermedades que
+        lo listan (las demás usan DEFAULT_LIKELIHOOD). Se arma la primera vez que
+        se pide; con la caché compilada sale de los arreglos CSR sin crear los Disease."""
+        column = self._columns.get(symptom)
+        if column is None:
+            if self.compiled is not None:
+                column = self._compiled_column(symptom)
+            else:
+                column = {d.id: d.symptom_likelihood[symptom] for d in self._symptom_index.get(symptom, ())}
+            column = self._columns[symptom] = MappingProxyType(column)
+        return column
+
+    def _compiled_column(self, symptom: str) -> Dict[str, float]:
+        if self._csc is None:
+            # CSR -> CSC una sola vez (NumPy ya está cargado con la caché)
+            import numpy as np
+            c = self.compiled
+            order = np.argsort(c.indices, kind='stable')
+            rows = np.repeat(np.arange(len(c), dtype=np.int64), np.diff(c.indptr))[order]
+            starts = np.searchsorted(c.indices[order], np.arange(len(self.symptoms) + 1))
+            position = {s: j for j, s in enumerate(self.symptoms)}
+            self._csc = (position, starts, rows, np.asarray(c.values)[order])
+        position, starts, rows, values = self._csc
+        j = position.get(symptom)
+        if j is None:
+            return {}
+        a, b = int(starts[j]), int(starts[j + 1])
+        ids = self._ids
+        return {ids[i]: v for i, v in zip(rows[a:b].tolist(), values[a:b].tolist())}
 
     def all_symptoms(self) -> List[str]:
-        s = set()
-        for d in self.diseases:
-            s.update(d.symptom_likelihood.keys())
-        return sorted(list(s))
+        # copia: algunos llamadores la modifican (p.ej. random.shuffle)
+        return list(self.symptoms)
+
+    def disease_map(self) -> Mapping[str, Mapping[str, float]]:
+        """id -> symptom_likelihood (no modificar); cada enfermedad se lee al pedirla."""
+        return self._disease_map
+
+    def question_tree(self):
+        """Árbol de preguntas compilado junto al catálogo (logic/question_tree.py),
+        o None si no hay uno vigente."""
+        if self._question_tree is False:
+            from .question_tree import load_tree
+            self._question_tree = load_tree(self.path)
+        return self._question_tree
+
+    def likelihood_matrix(self):
+        """Matriz densa enfermedad×síntoma (NumPy), compilada una sola vez."""
+        if self._likelihood_matrix is None:
+            # import diferido: NumPy sólo es necesario para el backend 'matrix'
+            from .likelihood_matrix import LikelihoodMatrix
+            self._likelihood_matrix = LikelihoodMatrix(self)
+        return self._likelihood_matrix
@@ -0,0 +1,231 @@
+"""event_log.py
+Registro append-only de las acciones de un GameEngine (una línea JSON compacta
+por evento) con snapshots periódicos de la creencia, y reproducción rápida:
+`replay` retoma el último caso desde su último snapshot aplicando sólo los
+eventos posteriores, sin repetir cada paso de Bayes.
+
+Eventos (el campo "t" va siempre primero):
+    {"t":"case","d":id,"p":perfil,"s":síntomas_verdaderos,"c":confianza}
+    {"t":"ask","s":síntoma,"a":0|1}
+    {"t":"discard","d":id}
+    {"t":"diagnose","d":id,"ok":0|1}
+    {"t":"snap","b":{id: prob != 0},"y":confirmados,"n":negados,"x":descartados}
+
+Con poda (GameEngine(prune=...)) "b" es la creencia activa y el snapshot
+agrega la reserva: "r" {id: log-peso}, "k" desplazamiento y "l" escala
+(pruning.ActiveSet.state()), así que la reproducción no pierde las podadas.
+"""
+import json
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from .dataset import Dataset
+from .game_engine import GameEngine, Patient
+
+# acciones (preguntas + descartes) entre dos snapshots
+SNAPSHOT_EVERY = 8
+
+_CASE_PREFIX = b'{"t":"case"'
+# bloque de lectura hacia atrás al buscar el último caso
+READ_BLOCK = 1 << 16
+
+
+def _ends_with_newline(path: str) -> bool:
+    with open(path, 'rb') as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b'\n'
+
+
+class EventLog:
+    def __init__(self, path: str, snapshot_every: int = SNAPSHOT_EVERY, sync: bool = False):
+        """`sync=True` hace fsync después de cada evento (más lento, sobrevive a cortes de luz)."""
+        self.path = path
+        self.snapshot_every = snapshot_every
+        self.sync = sync
+        self._file = open(path, 'ab')
+        if self._file.tell() and not _ends_with_newline(path):
+            # última línea cortada por una escritura interrumpida: el próximo evento va en otra
+            self._file.write(b'\n')
+        self._pending = 0
+        self._discarded: List[str] = []
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _write(self, event: Dict[str, Any]):
+        self._file.write(json.dumps(event, ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b'\n')
+        self._file.flush()
+        if self.sync:
+            os.fsync(self._file.fileno())
+
+    # -----------------------------
+    # Llamados por GameEngine
+    # -----------------------------
+    def case(self, patient: Patient):
+        self._pending = 0
+        self._discarded = []
+        self._write({'t': 'case', 'd': patient.true_disease.id, 'p': patient.profile,
+                     's': list(patient.true_symptoms), 'c': patient.confidence})
+
+    def ask(self, symptom: str, reported: bool, engine: GameEngine):
+        self._write({'t': 'ask', 's': symptom, 'a': int(reported)})
+        self._action(engine)
+
+    def discard(self, disease_id: str, engine: GameEngine):
+        self._discarded.append(disease_id)
+        self._write({'t': 'discard', 'd': disease_id})
+        self._action(engine)
+
+    def resume(self, discarded: List[str], pending: int = 0):
+        """Continúa un caso reproducido con `replay` (ya registrado en este archivo)."""
+        self._discarded = list(discarded)
+        self._pending = pending
+
+    def diagnose(self, disease_id: str, correct: bool):
+        self._write({'t': 'diagnose', 'd': disease_id, 'ok': int(correct)})
+
+    def _action(self, engine: GameEngine):
+        self._pending += 1
+        if self._pending >= self.snapshot_every:
+            self.snapshot(engine)
+
+    def snapshot(self, engine: GameEngine):
+        patient = engine.patient
+        self._pending = 0
+        event = {'t': 'snap', 'b': {k: v for k, v in engine.belief.items() if v},
+                 'y': patient.confirmed_symptoms, 'n': patient.denied_symptoms,
+                 'x': list(self._discarded)}
+        pruned = engine.pruned_state()
+        if pruned is not None:
+            event.update(pruned)
+        self._write(event)
+
+
+# -----------------------------
+# Lectura y reproducción
+# -----------------------------
+def read_events(path: str) -> List[Dict[str, Any]]:
+    """Todos los eventos del archivo (se ignora una última línea cortada a medias)."""
+    events = []
+    with open(path, 'rb') as f:
+        for line in f:
+            try:
+                events.append(json.loads(line))
+            except ValueError:
+                continue
+    return events
+
+
+def _last_case_lines(f, end: Optional[int] = None) -> Tuple[int, List[bytes]]:
+    """(posición, líneas) desde el último evento 'case' anterior a `end` (por
+    defecto el final del archivo), leyendo de atrás hacia adelante en bloques
+    de READ_BLOCK bytes."""
+    if end is None:
+        end = f.seek(0, os.SEEK_END)
+    pos = end
+    buf = b''
+    marker = b'\n' + _CASE_PREFIX
+    while pos > 0:
+        step = min(READ_BLOCK, pos)
+        pos -= step
+        f.seek(pos)
+        buf = f.read(step) + buf
+        # sólo el bloque nuevo (más el solape con el anterior) puede tener el marcador
+        i = buf.rfind(marker, 0, step + len(marker))
+        if i >= 0:
+            return pos + i + 1, buf[i + 1:].splitlines()
+    return 0, (buf.splitlines() if buf.startswith(_CASE_PREFIX) else [])
+
+
+def last_case(path: str) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]], List[Dict[str, Any]]]:
+    """(evento 'case', último 'snap' de ese caso, eventos posteriores al snapshot).
+    Se lee el archivo de atrás hacia adelante sólo hasta el inicio del último
+    caso y se decodifica sólo la cola posterior al snapshot."""
+    with open(path, 'rb') as f:
+        start, lines = _last_case_lines(f)
+        while True:
+            if not lines:
+                return None, None, []
+            try:
+                case = json.loads(lines[0])
+                break
+            except ValueError:
+                # 'case' cortado por una escritura interrumpida: lo que sigue
+                # (p.ej. el caso anterior retomado con replay) es del caso anterior
+                start, before = _last_case_lines(f, start)
+                lines = before + lines[1:] if before else []
+    tail: List[Dict[str, Any]] = []
+    snap = None
+    for line in reversed(lines[1:]):
+        try:
+            event = json.loads(line)
+        except ValueError:
+            continue
+        if event['t'] == 'snap':
+            snap = event
+            break
+        tail.append(event)
+    tail.reverse()
+    return case, snap, tail
+
+
+def replay(path: str, dataset: Dataset, log: Optional[EventLog] = None,
+           **engine_kwargs) -> Optional[GameEngine]:
+    """Reconstruye el motor del último caso de `path` (None si no hay ninguno).
+    Con `log` (normalmente abierto sobre el mismo archivo) se sigue registrando."""
+    case, snap, tail = last_case(path)
+    if case is None:
+        return None
+    # sin reset_case: el caso sale del registro, no de sortear un paciente nuevo
+    engine = GameEngine(dataset, start_case=False, **engine_kwargs)
+    patient = Patient(dataset.get_by_id(case['d']), engine.rng, profile=case['p'],
+                      true_symptoms=case['s'], confidence=case['c'])
+    patient.prepare_symptom_bank(dataset.symptoms, dataset.symptom_bits)
+    discarded: List[str] = []
+    belief: Optional[Dict[str, float]] = None
+    pruned: Optional[Dict[str, Any]] = None
+    if snap is not None:
+        # mismo orden que answer_question: un 'sí' posterior a un 'no' deja ambos
+        for s in snap['n']:
+            patient.record_answer(s, False)
+        for s in snap['y']:
+            patient.record_answer(s, True)
+        discarded = snap['x']
+        if 'r' in snap:
+            # creencia activa: las podadas siguen en la reserva
+            pruned = {'r': snap['r'], 'k': snap['k'], 'l': snap['l']}
+            belief = {k: float(snap['b'][k]) for k in dataset.priors() if k in snap['b']}
+        else:
+            belief = {k: float(snap['b'].get(k, 0.0)) for k in dataset.priors()}
+    # evidencia ya incluida en la creencia del snapshot (clave del caché de posteriors)
+    evidence = ([(s, True) for s in patient.confirmed_symptoms]
+                + [(s, False) for s in patient.denied_symptoms])
+    # todas las respuestas quedan registradas antes de retomar, así el
+    # recomendador arranca con el banco de síntomas final
+    for event in tail:
+        if event['t'] == 'ask':
+            patient.record_answer(event['s'], bool(event['a']))
+    engine.resume(patient, belief, discarded, pruned, evidence)
+    # la cola se aplica en lote: preguntas consecutivas = una sola actualización
+    pending: List[Tuple[str, bool]] = []
+    for event in tail:
+        if event['t'] == 'ask':
+            pending.append((event['s'], bool(event['a'])))
+        elif event['t'] == 'discard':
+            if pending:
+                engine.observe(pending)
+                pending = []
+            engine.discard_disease(event['d'])
+    if pending:
+        engine.observe(pending)
+    if log is not None:
+        log.resume(discarded + [e['d'] for e in tail if e['t'] == 'discard'],
+                   sum(e['t'] != 'diagnose' for e in tail))
+        engine.log = log
+    return engine
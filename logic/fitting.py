@@ -0,0 +1,373 @@
+"""fitting.py
+Ajuste de las verosimilitudes P(síntoma|enfermedad) y de las priors a partir
+de registros de casos (logic/event_log.py): para cada caso, la enfermedad
+verdadera y los síntomas reportados (evento "case") y las respuestas
+observadas (eventos "ask").
+
+Los registros se leen en trozos de `chunk_lines` líneas; los snapshots se
+saltan sin parsear y de las líneas "case" y "ask" sólo se recorta el id o el
+síntoma (el JSON compacto de EventLog tiene posiciones fijas) y se busca como
+bytes en los índices del catálogo; json.loads queda para lo que no calza. Los
+conteos se acumulan con np.bincount sobre índices planos
+enfermedad * n_síntomas + síntoma, guardando sólo los pares observados.
+Con `workers` los archivos se parten en rangos de bytes alineados al inicio de
+un caso, cada proceso cuenta su rango y los conteos parciales se suman.
+
+Las preguntas no son una muestra de todos los casos: Patient.prepare_symptom_bank
+saca del banco los síntomas que el paciente reportó, así que un síntoma sólo se
+pregunta a quien no lo reportó y las respuestas solas llevan P(s|d) hacia la
+tasa de "sí" de esos pacientes. Por probabilidad total el reporte cuenta como
+positivo y las respuestas estiman sólo el resto:
+
+    P(s|d) = r + (1 - r) q,   r = reportes(d, s) / casos(d),   q = sí(d, s) / preguntas(d, s)
+
+Con suavizado de Laplace hacia el catálogo: `alpha` pseudo-conteos por
+resultado (por enfermedad en las priors) repartidos según el valor actual del
+catálogo, así que con pocos datos el resultado queda cerca del catálogo y con
+alpha y valores uniformes es la regla de Laplace clásica (ver
+probability_engine.frequentist):
+
+    q      = (sí(d, s) + 2 alpha p0(s|d)) / (preguntas(d, s) + 2 alpha)
+    P(s|d) = (reportes(d, s) + (casos(d) - reportes(d, s)) q + 2 alpha p0(s|d)) / (casos(d) + 2 alpha)
+    P(d)   = (casos(d) + alpha D p0(d)) / (casos + alpha D)
+
+donde p0 es el valor del catálogo (DEFAULT_LIKELIHOOD si la enfermedad no lista
+el síntoma; las priors normalizadas) y D el número de enfermedades. Sólo se
+reemplazan los pares reportados o preguntados de enfermedades con al menos
+`min_count` casos y las priors sólo se ajustan con al menos `min_count` casos
+en total; el resto conserva el valor del catálogo. Las priors ajustadas se
+reescalan a la suma de las del catálogo (el resto de la masa sigue siendo
+"otra enfermedad").
+
+Uso (requiere NumPy):
+    python -m logic.fitting data/diseases.json logs/*.log -o data/diseases.fitted.json --workers 4
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .dataset import Dataset
+from .event_log import _CASE_PREFIX
+
+_ASK_PREFIX = b'{"t":"ask"'
+# {"t":"ask","s":"tos","a":1}  /  {"t":"case","d":"CC","p":{...},"s":["tos"],"c":0.8}
+_ASK_HEAD = len(b'{"t":"ask","s":')
+_ASK_TAIL = len(b',"a":1}')
+_CASE_HEAD = len(b'{"t":"case","d":')
+_CASE_SYMPTOMS = b',"s":['
+_CASE_SYMPTOMS_END = b'],"c":'
+
+DEFAULT_CHUNK_LINES = 100_000
+DEFAULT_ALPHA = 1.0
+# observaciones mínimas (preguntas de un par, casos para las priors) para ajustar
+DEFAULT_MIN_COUNT = 5
+# tamaño mínimo de un rango de bytes al repartir un archivo entre procesos
+MIN_SHARD_BYTES = 1 << 20
+
+
+class FitCounts:
+    """Conteos de un conjunto de casos: casos por enfermedad y, para cada par
+    (enfermedad, síntoma) observado, reportes en el evento "case", preguntas y
+    respuestas 'sí'. Los pares van como índices planos ordenados (`keys`) para
+    sumar conteos sin matriz densa."""
+    def __init__(self, n_diseases: int, n_symptoms: int):
+        self.n_symptoms = n_symptoms
+        self.cases = np.zeros(n_diseases, dtype=np.int64)
+        self.keys = np.empty(0, dtype=np.int64)
+        self.asked = np.empty(0, dtype=np.int64)
+        self.yes = np.empty(0, dtype=np.int64)
+        self.reported = np.empty(0, dtype=np.int64)
+        # eventos con una enfermedad o un síntoma fuera del catálogo
+        self.skipped = 0
+
+    @property
+    def n_cases(self) -> int:
+        return int(self.cases.sum())
+
+    def add(self, case_diseases, ask_diseases, ask_symptoms, answers,
+            report_diseases=(), report_symptoms=()):
+        """Suma un trozo: índices de enfermedad de cada caso; por respuesta,
+        (enfermedad del caso, síntoma, 0|1); por síntoma reportado en un caso,
+        (enfermedad del caso, síntoma)."""
+        self.cases += np.bincount(np.asarray(case_diseases, dtype=np.int64), minlength=len(self.cases))
+        n_ask, n_report = len(ask_diseases), len(report_diseases)
+        if n_ask or n_report:
+            keys = np.concatenate([self._keys(ask_diseases, ask_symptoms), self._keys(report_diseases, report_symptoms)])
+            asked = np.concatenate([np.ones(n_ask, dtype=np.int64), np.zeros(n_report, dtype=np.int64)])
+            yes = np.concatenate([np.asarray(answers, dtype=np.int64), np.zeros(n_report, dtype=np.int64)])
+            self._accumulate(keys, asked, yes, 1 - asked)
+
+    def _keys(self, diseases, symptoms) -> np.ndarray:
+        return np.asarray(diseases, dtype=np.int64) * self.n_symptoms + np.asarray(symptoms, dtype=np.int64)
+
+    def merge(self, other: 'FitCounts') -> 'FitCounts':
+        """Suma los conteos parciales de otro proceso (mismo catálogo)."""
+        self.cases += other.cases
+        self.skipped += other.skipped
+        if len(other.keys):
+            self._accumulate(other.keys, other.asked, other.yes, other.reported)
+        return self
+
+    def _accumulate(self, keys, asked, yes, reported):
+        keys = np.concatenate([self.keys, keys])
+        uniq, inverse = np.unique(keys, return_inverse=True)
+        n = len(uniq)
+        # los pesos de bincount son float64: exactos hasta 2**53 conteos
+        def total(old, new):
+            return np.bincount(inverse, weights=np.concatenate([old, new]), minlength=n).astype(np.int64)
+        self.asked = total(self.asked, asked)
+        self.yes = total(self.yes, yes)
+        self.reported = total(self.reported, reported)
+        self.keys = uniq
+
+    def pairs(self) -> Iterator[Tuple[int, int, int, int, int]]:
+        """(enfermedad, síntoma, reportes, preguntas, sí) de cada par observado."""
+        d, s = np.divmod(self.keys, self.n_symptoms)
+        return zip(d.tolist(), s.tolist(), self.reported.tolist(), self.asked.tolist(), self.yes.tolist())
+
+
+# -----------------------------
+# lectura de registros
+# -----------------------------
+_INDEXES: Dict[str, Any] = {}
+
+
+def _token(value: str) -> bytes:
+    # cada clave tal como EventLog la escribe (cadena JSON en UTF-8)
+    return json.dumps(value, ensure_ascii=False).encode('utf-8')
+
+
+def _set_indexes(ids: Sequence[str], symptoms: Sequence[str]):
+    """Inicializador de cada proceso: los índices se construyen una sola vez."""
+    _INDEXES['ids'] = {_token(id_): i for i, id_ in enumerate(ids)}
+    _INDEXES['symptoms'] = {_token(s): j for j, s in enumerate(symptoms)}
+
+
+def _ask(line: bytes, symptoms: Dict[bytes, int]) -> Tuple[Optional[int], int]:
+    """(índice del síntoma o None, respuesta) de una línea "ask"."""
+    body = line.rstrip()
+    if body.endswith(b',"a":1}') or body.endswith(b',"a":0}'):
+        j = symptoms.get(body[_ASK_HEAD:-_ASK_TAIL])
+        if j is not None:
+            return j, body[-2] - 48
+    event = json.loads(line)
+    return symptoms.get(_token(event['s'])), int(event['a'])
+
+
+def _case(line: bytes, ids: Dict[bytes, int], symptoms: Dict[bytes, int]) -> Tuple[int, List[int]]:
+    """(índice de la enfermedad verdadera o -1 si no está, índices de los
+    síntomas reportados que están en el catálogo) de una línea "case"."""
+    # dentro de una cadena JSON las comillas van escapadas: el primer ,"p": cierra el id
+    end = line.find(b',"p":', _CASE_HEAD)
+    i = ids.get(line[_CASE_HEAD:end]) if end > 0 else None
+    start = line.rfind(_CASE_SYMPTOMS)
+    stop = line.rfind(_CASE_SYMPTOMS_END)
+    reported = None
+    if i is not None and 0 < start < stop:
+        body = line[start + len(_CASE_SYMPTOMS):stop]
+        tokens = body.split(b',') if body else []
+        reported = [symptoms.get(t) for t in tokens]
+        if None in reported:
+            reported = None  # síntoma fuera del catálogo o con comas: se decodifica
+    if reported is None:
+        event = json.loads(line)
+        i = ids.get(_token(event['d']), -1)
+        reported = [j for j in (symptoms.get(_token(s)) for s in event.get('s', ())) if j is not None]
+    return i, reported
+
+
+def _lines(path: str, start: int, end: Optional[int]) -> Iterator[bytes]:
+    """Líneas de los casos que empiezan en [start, end): se salta la cola del
+    caso anterior y se sigue más allá de `end` hasta el próximo caso."""
+    with open(path, 'rb') as f:
+        pos = start
+        if start > 0:
+            # si start cae justo después de un salto de línea, esto consume sólo ese byte
+            f.seek(start - 1)
+            pos = start - 1 + len(f.readline())
+        in_case = False
+        for line in f:
+            if line.startswith(_CASE_PREFIX):
+                if end is not None and pos >= end:
+                    return
+                in_case = True
+            pos += len(line)
+            if in_case:
+                yield line
+
+
+def _count_range(job: Tuple[str, int, Optional[int], int]) -> FitCounts:
+    path, start, end, chunk_lines = job
+    ids, symptoms = _INDEXES['ids'], _INDEXES['symptoms']
+    counts = FitCounts(len(ids), len(symptoms))
+    case_d: List[int] = []
+    ask_d: List[int] = []
+    ask_s: List[int] = []
+    ask_a: List[int] = []
+    report_d: List[int] = []
+    report_s: List[int] = []
+    current = -1
+    pending = 0
+    for line in _lines(path, start, end):
+        if line.startswith(_ASK_PREFIX):
+            if current < 0:
+                continue
+            try:
+                j, answer = _ask(line, symptoms)
+            except ValueError:
+                continue  # línea cortada a medias
+            if j is None:
+                counts.skipped += 1
+                continue
+            ask_d.append(current)
+            ask_s.append(j)
+            ask_a.append(answer)
+        elif line.startswith(_CASE_PREFIX):
+            try:
+                current, reported = _case(line, ids, symptoms)
+            except ValueError:
+                current = -1
+            if current < 0:
+                counts.skipped += 1
+                continue
+            case_d.append(current)
+            report_d.extend([current] * len(reported))
+            report_s.extend(reported)
+        pending += 1
+        if pending >= chunk_lines:
+            counts.add(case_d, ask_d, ask_s, ask_a, report_d, report_s)
+            case_d, ask_d, ask_s, ask_a, report_d, report_s = [], [], [], [], [], []
+            pending = 0
+    counts.add(case_d, ask_d, ask_s, ask_a, report_d, report_s)
+    return counts
+
+
+def _jobs(paths: Sequence[str], workers: int, chunk_lines: int) -> List[Tuple[str, int, Optional[int], int]]:
+    """Rangos de bytes de todos los archivos, unos 4 por proceso en total."""
+    sizes = [os.path.getsize(p) for p in paths]
+    shard = max(MIN_SHARD_BYTES, sum(sizes) // max(1, workers * 4))
+    jobs = []
+    for path, size in zip(paths, sizes):
+        starts = list(range(0, size, shard)) or [0]
+        for i, start in enumerate(starts):
+            end = starts[i + 1] if i + 1 < len(starts) else None
+            jobs.append((path, start, end, chunk_lines))
+    return jobs
+
+
+def count_logs(dataset: Dataset, paths: Sequence[str], workers: Optional[int] = None,
+               chunk_lines: int = DEFAULT_CHUNK_LINES) -> FitCounts:
+    """Conteos de todos los casos de `paths` (1 proceso si workers es None o 1)."""
+    ids = [d.id for d in dataset.diseases]
+    jobs = _jobs([str(p) for p in paths], workers or 1, chunk_lines)
+    total = FitCounts(len(ids), len(dataset.symptoms))
+    if not workers or workers <= 1:
+        _set_indexes(ids, dataset.symptoms)
+        for job in jobs:
+            total.merge(_count_range(job))
+        return total
+    with ProcessPoolExecutor(max_workers=workers, initializer=_set_indexes,
+                             initargs=(ids, dataset.symptoms)) as pool:
+        for part in pool.map(_count_range, jobs):
+            total.merge(part)
+    return total
+
+
+# -----------------------------
+# catálogo ajustado
+# -----------------------------
+def fitted_catalog(dataset: Dataset, counts: FitCounts, alpha: float = DEFAULT_ALPHA,
+                   min_count: int = DEFAULT_MIN_COUNT) -> Dict[str, Any]:
+    """Catálogo (formato de data/diseases.json) con las estimaciones suavizadas
+    hacia los valores actuales del catálogo."""
+    if alpha < 0:
+        raise ValueError(f"alpha must be non-negative, got {alpha!r}")
+    diseases = dataset.diseases
+    symptoms = dataset.symptoms
+    fitted: Dict[int, Dict[str, float]] = {}
+    d, s = np.divmod(counts.keys, counts.n_symptoms)
+    cases = counts.cases[d]
+    mask = cases >= max(1, min_count)
+    if mask.any():
+        d, s, cases = d[mask], s[mask], cases[mask]
+        reported, asked, yes = counts.reported[mask], counts.asked[mask], counts.yes[mask]
+        d, s = d.tolist(), s.tolist()
+        base = np.fromiter((diseases[i].likelihood(symptoms[j]) for i, j in zip(d, s)),
+                           dtype=np.float64, count=len(d))
+        # sólo se pregunta a quien no reportó el síntoma: q es P(sí | no lo reportó)
+        q = (yes + 2 * alpha * base) / (asked + 2 * alpha) if alpha > 0 else yes / np.maximum(asked, 1)
+        probs = (reported + (cases - reported) * q + 2 * alpha * base) / (cases + 2 * alpha)
+        for i, j, p in zip(d, s, probs.tolist()):
+            fitted.setdefault(i, {})[symptoms[j]] = round(p, 6)
+    n = counts.n_cases
+    priors = [d.prior for d in diseases]
+    total = sum(priors)
+    if n >= max(1, min_count) and total > 0:
+        base = np.asarray(priors, dtype=np.float64) / total
+        pseudo = alpha * len(priors)
+        smoothed = (counts.cases + pseudo * base) / (n + pseudo)
+        priors = (smoothed * total).tolist()
+    out = []
+    for i, d in enumerate(diseases):
+        likelihood = {s: float(p) for s, p in d.symptom_likelihood.items()}
+        likelihood.update(fitted.get(i, {}))
+        out.append({'id': d.id, 'name': d.name, 'prior': round(priors[i], 8),
+                    'symptom_likelihood': likelihood,
+                    'risk_factors': {k: float(v) for k, v in d.risk_factors.items()}})
+    return {'diseases': out}
+
+
+def write_catalog(catalog: Dict[str, Any], path):
+    """JSON con sangría como data/diseases.json; .jsonl = una enfermedad por línea
+    (se lee en streaming, ver logic/catalog_stream.py)."""
+    path = Path(path)
+    tmp = path.with_name(path.name + '.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        if path.suffix.lower() in ('.jsonl', '.ndjson'):
+            for disease in catalog['diseases']:
+                f.write(json.dumps(disease, ensure_ascii=False, separators=(',', ':')) + '\n')
+        else:
+            json.dump(catalog, f, ensure_ascii=False, indent=2)
+            f.write('\n')
+    os.replace(tmp, path)
+
+
+def fit(catalog_path, log_paths: Sequence[str], out_path, alpha: float = DEFAULT_ALPHA,
+        min_count: int = DEFAULT_MIN_COUNT,
+        workers: Optional[int] = None, chunk_lines: int = DEFAULT_CHUNK_LINES) -> FitCounts:
+    """Cuenta los registros, ajusta el catálogo y lo escribe en `out_path`."""
+    dataset = Dataset(str(catalog_path))
+    counts = count_logs(dataset, log_paths, workers=workers, chunk_lines=chunk_lines)
+    write_catalog(fitted_catalog(dataset, counts, alpha=alpha, min_count=min_count), out_path)
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ajusta el catálogo con registros de casos (logic/event_log.py)")
+    parser.add_argument('catalog')
+    parser.add_argument('logs', nargs='+', help="archivos de registro (EventLog)")
+    parser.add_argument('-o', '--out', required=True, help="catálogo ajustado (.json o .jsonl)")
+    parser.add_argument('--alpha', type=float, default=DEFAULT_ALPHA,
+                        help="pseudo-conteos de Laplace, repartidos según el catálogo")
+    parser.add_argument('--min-count', type=int, default=DEFAULT_MIN_COUNT,
+                        help="preguntas de un par (o casos, para las priors) para cambiar el valor del catálogo")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--chunk-lines', type=int, default=DEFAULT_CHUNK_LINES)
+    args = parser.parse_args(argv)
+    t0 = time.perf_counter()
+    counts = fit(args.catalog, args.logs, args.out, alpha=args.alpha, min_count=args.min_count,
+                 workers=args.workers, chunk_lines=args.chunk_lines)
+    print(f"{args.out}: {counts.n_cases} casos, {int(counts.reported.sum())} síntomas reportados, "
+          f"{int(counts.asked.sum())} respuestas, "
+          f"{len(counts.keys)} pares ajustados, {counts.skipped} eventos ignorados "
+          f"en {time.perf_counter() - t0:.1f} s")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,29 +1,51 @@
 """game_engine.py
 Motor del juego: genera pacientes, mantiene listas de síntomas, llama al probability_engine
 """
+import math
 import random
-from typing import Dict, Any, List, Tuple
-from .dataset import Dataset, Disease
-from .probability_engine import update_with_symptom
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Callable, Dict, Any, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple, Union
+from .dataset import Dataset, Disease, PROFILE_OPTIONS
+from .probability_engine import update_with_likelihoods
+from .pruning import ActiveSet
+from .ranking import BeliefRanking
+from .metrics import METRICS
+
+if TYPE_CHECKING:
+    from .event_log import EventLog
+    from .posterior_cache import PosteriorCache
+    from .question_tree import QuestionTree
+
+def random_profile(rng=random) -> Dict[str, Any]:
+    """Perfil al azar: un valor de cada campo de PROFILE_OPTIONS."""
+    return {k: rng.choice(options) for k, options in PROFILE_OPTIONS.items()}
 
 class Patient:
-    def __init__(self, true_disease: Disease):
+    def __init__(self, true_disease: Disease, rng: Optional[random.Random] = None,
+                 profile: Optional[Dict[str, Any]] = None,
+                 true_symptoms: Optional[List[str]] = None,
+                 confidence: Optional[float] = None):
+        """profile, true_symptoms y confidence se sortean si no se dan
+        (p.ej. cuando vienen de un lote de patient_batch.PatientGenerator)."""
+        # generador aleatorio; por defecto el módulo global random
+        self.rng = rng if rng is not None else random
         self.true_disease = true_disease
-        self.profile = self._generate_profile()
+        self.profile = profile if profile is not None else self._generate_profile()
         # sintomas que el paciente efectivamente tiene (usado para respuestas verdaderas)
-        self.true_symptoms = self._sample_true_symptoms()
-        # symptoms confirmed by asking (observed yes)
-        self.confirmed_symptoms: List[str] = []
-        # symptom bank available to ask (initially all symptoms)
-        self.symptom_bank: List[str] = []
-        self.confidence = round(random.uniform(0.6, 0.95), 2)
+        self.true_symptoms = true_symptoms if true_symptoms is not None else self._sample_true_symptoms()
+        # estado de síntomas como máscaras de bits sobre el vocabulario del dataset
+        # (se fijan en prepare_symptom_bank): verdaderos, confirmados (sí),
+        # negados (no) y aún preguntables
+        self._symptoms: Sequence[str] = ()
+        self._bits: Mapping[str, int] = {}
+        self.true_mask = 0
+        self.confirmed_mask = 0
+        self.denied_mask = 0
+        self.bank_mask = 0
+        self.confidence = confidence if confidence is not None else round(self.rng.uniform(0.6, 0.95), 2)
 
     def _generate_profile(self) -> Dict[str, Any]:
-        father = random.choice(["Ninguna", "Cáncer de pulmón", "Asma", "Anemia"])
-        mother = random.choice(["Ninguna", "Alergia", "Anemia", "Bronquitis"])
-        dieta = random.choice(["omnivoro", "vegetariano", "vegano"])
-        fuma = random.choice(["sí", "no"])
-        return {"padre": father, "madre": mother, "dieta": dieta, "fuma": fuma}
+        return random_profile(self.rng)
 
     def _sample_true_symptoms(self) -> List[str]:
         # sample symptoms from the disease likelihoods (stochastic)
@@ -34,97 +56,510 @@ class Patient:
             return []
         total = sum(weights)
         probs = [w/total for w in weights] if total > 0 else [1/len(names)]*len(names)
-        k = 1 if random.random() < 0.7 else random.randint(1, min(3, len(names)))
-        chosen = random.choices(names, probs, k=k)
+        k = 1 if self.rng.random() < 0.7 else self.rng.randint(1, min(3, len(names)))
+        chosen = self.rng.choices(names, probs, k=k)
         return list(set(chosen))
 
-    def prepare_symptom_bank(self, all_symptoms: List[str]):
+    def prepare_symptom_bank(self, all_symptoms: Sequence[str],
+                             symptom_bits: Optional[Mapping[str, int]] = None):
+        """Fija el vocabulario (symptom_bits[s] == 1 << posición de s en all_symptoms)."""
+        self._symptoms = all_symptoms
+        self._bits = symptom_bits if symptom_bits is not None else {
+            s: 1 << j for j, s in enumerate(all_symptoms)}
+        self.true_mask = self.mask_of(self.true_symptoms)
+        self.confirmed_mask = 0
+        self.denied_mask = 0
         # bank starts as all symptoms minus those already in true_symptoms
-        self.symptom_bank = [s for s in all_symptoms if s not in self.true_symptoms]
+        self.bank_mask = ((1 << len(all_symptoms)) - 1) & ~self.true_mask
+
+    def mask_of(self, symptoms: Iterable[str]) -> int:
+        mask = 0
+        for s in symptoms:
+            mask |= self._bits.get(s, 0)
+        return mask
+
+    def symptoms_of(self, mask: int) -> List[str]:
+        """Síntomas de una máscara, en el orden del vocabulario."""
+        out = []
+        while mask:
+            low = mask & -mask
+            out.append(self._symptoms[low.bit_length() - 1])
+            mask ^= low
+        return out
+
+    def can_ask(self, symptom: str) -> bool:
+        return bool(self.bank_mask & self._bits.get(symptom, 0))
+
+    @property
+    def symptom_bank(self) -> List[str]:
+        """Síntomas que todavía se pueden preguntar."""
+        return self.symptoms_of(self.bank_mask)
+
+    @property
+    def confirmed_symptoms(self) -> List[str]:
+        """Síntomas a los que el paciente respondió que sí."""
+        return self.symptoms_of(self.confirmed_mask)
+
+    @property
+    def denied_symptoms(self) -> List[str]:
+        """Síntomas a los que el paciente respondió que no."""
+        return self.symptoms_of(self.denied_mask)
 
     def answer_question(self, symptom: str) -> Tuple[str, bool]:
         """Return ('sí'/'no', reported_bool). Report may be noisy depending on confidence."""
+        bit = self._bits.get(symptom, 0)
         # determine ground truth
-        has = symptom in self.true_symptoms
+        has = bool(self.true_mask & bit) if bit else symptom in self.true_symptoms
         # truthfulness sampling
-        truthful = random.random() < self.confidence
+        truthful = self.rng.random() < self.confidence
         if truthful:
             reported = has
         else:
             # lies occasionally, or mistakes
-            reported = not has if random.random() < 0.9 else has
-        # if reported yes and it's new, add to confirmed symptoms
-        if reported and symptom not in self.confirmed_symptoms:
-            self.confirmed_symptoms.append(symptom)
-        # remove symptom from bank so it cannot be asked again
-        if symptom in self.symptom_bank:
-            self.symptom_bank.remove(symptom)
+            reported = not has if self.rng.random() < 0.9 else has
+        self.record_answer(symptom, reported)
         return ("sí" if reported else "no"), reported
 
+    def record_answer(self, symptom: str, reported: bool):
+        """Registra una respuesta ya conocida (p.ej. al reproducir un event_log)."""
+        bit = self._bits.get(symptom, 0)
+        # record the answer as confirmed (yes) or denied (no)
+        if reported:
+            self.confirmed_mask |= bit
+        elif not self.confirmed_mask & bit:
+            self.denied_mask |= bit
+        # remove symptom from bank so it cannot be asked again
+        self.bank_mask &= ~bit
+
+# backends disponibles para la actualización de la creencia:
+#   'dict'   -> probability_engine.update_with_likelihoods sobre diccionarios
+#   'matrix' -> LikelihoodMatrix (NumPy), una multiplicación de columna por pregunta
+#   'log'    -> LikelihoodMatrix en log-probabilidades (NumPy), evidencia en lote sin underflow
+BACKENDS = ('dict', 'matrix', 'log')
+
+# modos de suggest_symptoms:
+#   'heuristic'        -> síntoma principal de la enfermedad más/media/menos probable
+#   'information_gain' -> recommender.InformationGainRecommender (requiere NumPy)
+RECOMMENDERS = ('heuristic', 'information_gain')
+
+
+def _expand_pruned(belief: Mapping[str, float], pruned: Mapping[str, Any]) -> Dict[str, float]:
+    """Posterior completa a partir de la creencia activa y la reserva de
+    pruning.ActiveSet.state() (para retomar sin poda un caso guardado con poda)."""
+    full = dict(belief)
+    for h, w in pruned['r'].items():
+        full[h] = math.exp(w + pruned['k'] - pruned['l'])
+    total = sum(full.values())
+    return {h: p / total for h, p in full.items()} if total > 0 else full
+
+class BeliefView(Mapping):
+    """Creencia de un momento dado (id -> probabilidad) que recién se convierte a
+    diccionario cuando alguien la lee: ask_symptom la devuelve en cada respuesta
+    y con los backends vectoriales casi nadie la mira."""
+    def __init__(self, convert: Callable[[], Dict[str, float]]):
+        self._convert: Optional[Callable[[], Dict[str, float]]] = convert
+        self._dict: Optional[Dict[str, float]] = None
+
+    def _data(self) -> Dict[str, float]:
+        if self._dict is None:
+            self._dict = self._convert()
+            self._convert = None
+        return self._dict
+
+    def __getitem__(self, key: str) -> float:
+        return self._data()[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._data())
+
+    def __len__(self) -> int:
+        return len(self._data())
+
+    def __repr__(self) -> str:
+        return repr(self._data())
+
 class GameEngine:
-    def __init__(self, dataset: Dataset):
+    def __init__(self, dataset: Dataset, backend: str = 'dict', recommender: str = 'heuristic',
+                 rng: Optional[random.Random] = None, log: Optional['EventLog'] = None,
+                 profile_priors: bool = True, prune: Optional[float] = None,
+                 question_tree: Union['QuestionTree', bool, None] = None,
+                 posterior_cache: Optional['PosteriorCache'] = None, start_case: bool = True):
+        """Con `log` (logic/event_log.EventLog) cada acción del caso queda registrada.
+        Con `profile_priors` cada caso empieza desde las priors ajustadas al perfil
+        del paciente (Dataset.profile_priors); si no, desde las priors del catálogo.
+        Con `prune` (sólo backend 'dict') las enfermedades con menos de esa fracción
+        de la masa salen de la creencia hasta que la evidencia las reactive
+        (logic/pruning.ActiveSet).
+        Con `question_tree` (un QuestionTree, o True para el compilado junto al
+        catálogo) suggest_symptoms sigue el árbol mientras el caso esté en él.
+        Con `posterior_cache` (logic/posterior_cache.PosteriorCache, backends 'dict'
+        y 'matrix', sin `prune`) las posteriors se comparten entre los motores del
+        mismo Dataset según las priors y el conjunto de evidencia.
+        Con `start_case=False` no se sortea un paciente (ni se usa `rng` ni se
+        registra un caso): el motor queda listo para resume() (logic/event_log.replay)
+        o reset_case()."""
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend {backend!r}, expected one of {BACKENDS}")
+        if prune and backend != 'dict':
+            raise ValueError(f"prune requires backend 'dict', got {backend!r}")
+        if recommender not in RECOMMENDERS:
+            raise ValueError(f"Unknown recommender {recommender!r}, expected one of {RECOMMENDERS}")
+        if posterior_cache is not None and (backend == 'log' or prune):
+            raise ValueError("posterior_cache requires backend 'dict' or 'matrix' without prune")
         self.dataset = dataset
-        self.reset_case()
+        # generador aleatorio propio (simulaciones reproducibles); por defecto el global
+        self.rng = rng if rng is not None else random
+        self.backend = backend
+        self.recommender = recommender
+        self.profile_priors = profile_priors
+        self._recommender = None
+        self._ranking: Optional[BeliefRanking] = None
+        self.log = log
+        if backend in ('matrix', 'log'):
+            self._matrix = dataset.likelihood_matrix()
+        else:
+            # columnas P(symptom | disease) del síntoma preguntado, compartidas por
+            # todos los motores del dataset (no se lee el catálogo entero)
+            self._likelihoods = dataset.symptom_likelihoods
+        self._active = ActiveSet(prune, self._likelihoods) if prune else None
+        if question_tree is True:
+            question_tree = dataset.question_tree()
+            if question_tree is None:
+                raise FileNotFoundError(f"No compiled question tree for {dataset.path}; "
+                                        f"run python -m logic.question_tree {dataset.path}")
+        self.question_tree = question_tree or None
+        self._tree_node: Optional[int] = None
+        self.posterior_cache = posterior_cache
+        # entrada del caché con la creencia actual; la creencia 'dict' de una
+        # entrada es compartida y se copia antes de modificarla
+        self._cache_entry: Optional[List[Any]] = None
+        self._belief_shared = False
+        if start_case:
+            self.reset_case()
 
-    def reset_case(self):
-        self.priors = self.dataset.priors()
-        self.patient = self._generate_patient()
+    @property
+    def belief(self) -> Dict[str, float]:
+        """Distribución actual P(enfermedad | evidencia) como diccionario."""
+        if self._belief is None:
+            self._belief = self._matrix.to_dict(self.belief_vector())
+        return self._belief
+
+    @belief.setter
+    def belief(self, dist: Dict[str, float]):
+        if self.backend == 'matrix':
+            self._belief_vec = self._matrix.from_dict(dist)
+            self._belief = None
+        elif self.backend == 'log':
+            self._log_vec = self._matrix.log_from_dict(dist)
+            self._belief = None
+        elif self._active is not None:
+            self._belief = self._active.start(dist)
+        else:
+            self._belief = dist
+            self._belief_shared = False
+        self._belief_changed()
+
+    def _belief_changed(self):
+        # todo lo que se calcula a partir de la creencia queda obsoleto
+        self._ranking = None
+        self._cache_entry = None
+        # evidencia fuera del camino del árbol (ask_symptom lo vuelve a fijar)
+        self._tree_node = None
+        if self._recommender is not None:
+            self._recommender.invalidate()
+
+    @property
+    def ranking(self) -> BeliefRanking:
+        """Creencia ordenada de mayor a menor (top-k, posición, mediana); se
+        recalcula sólo cuando la creencia cambia."""
+        if self._ranking is None:
+            vector = self.belief_vector() if self.backend != 'dict' else None
+            self._ranking = BeliefRanking(self.belief, vector)
+            if self._cache_entry is not None and self._cache_entry[1] is None:
+                # los motores que encuentren esta posterior reciben el ranking hecho
+                self._cache_entry[1] = self._ranking
+        return self._ranking
+
+    def belief_vector(self):
+        """Creencia como vector NumPy en el orden de dataset.likelihood_matrix().ids."""
+        if self.backend == 'matrix':
+            return self._belief_vec
+        if self.backend == 'log':
+            return self._matrix.from_log(self._log_vec)
+        return self.dataset.likelihood_matrix().from_dict(self.belief)
+
+    @METRICS.timed('reset_case')
+    def reset_case(self, patient: Optional[Patient] = None):
+        """Empieza un caso nuevo; con `patient` se usa ese paciente en lugar de sortear uno."""
+        self.patient = patient if patient is not None else self._generate_patient()
+        self.priors = self._case_priors(self.patient.profile)
         # initialize belief distribution as priors
         self.belief = dict(self.priors)
+        self._start_evidence()
         # prepare symptom bank for the patient
-        all_symptoms = self.dataset.all_symptoms()
-        self.patient.prepare_symptom_bank(all_symptoms)
+        self.patient.prepare_symptom_bank(self.dataset.symptoms, self.dataset.symptom_bits)
+        if self.recommender == 'information_gain':
+            from .recommender import InformationGainRecommender
+            self._recommender = InformationGainRecommender(
+                self.dataset.likelihood_matrix(), self.patient.symptom_bank)
+        if self.question_tree is not None:
+            self._tree_node = self.question_tree.root(self.patient.profile if self.profile_priors else None)
+        if self.log is not None:
+            self.log.case(self.patient)
+
+    def resume(self, patient: Patient, belief: Optional[Dict[str, float]] = None,
+               discarded: Iterable[str] = (), pruned: Optional[Mapping[str, Any]] = None,
+               evidence: Optional[Iterable[Tuple[str, bool]]] = None):
+        """Retoma un caso guardado (logic/event_log.replay) sin repetir las actualizaciones:
+        `patient` ya tiene sus respuestas registradas y `belief` es la creencia de ese
+        momento (None = las priors del caso). `pruned` es pruned_state() del motor que
+        guardó el caso: `belief` es entonces sólo la creencia activa. `evidence` son
+        las respuestas ya incluidas en `belief` (None = todas las de `patient`); las
+        demás se aplican después con observe()."""
+        discarded = tuple(discarded)
+        self.priors = self._case_priors(patient.profile)
+        self.patient = patient
+        if belief is None:
+            self.belief = dict(self.priors)
+        elif pruned is None:
+            self.belief = belief
+        elif self._active is not None:
+            self._belief = self._active.restore(belief, pruned)
+            self._belief_changed()
+        else:
+            self.belief = _expand_pruned(belief, pruned)
+        self._start_evidence(discarded, evidence)
+        if self.recommender == 'information_gain':
+            from .recommender import InformationGainRecommender
+            self._recommender = InformationGainRecommender(
+                self.dataset.likelihood_matrix(), self.patient.symptom_bank)
+            for disease_id in discarded:
+                self._recommender.remove_disease(disease_id)
+
+    def _case_priors(self, profile: Dict[str, Any]) -> Dict[str, float]:
+        return self.dataset.priors(profile if self.profile_priors else None)
+
+    # -----------------------------
+    # caché de posteriors
+    # -----------------------------
+    def _start_evidence(self, discarded: Sequence[str] = (),
+                        evidence: Optional[Iterable[Tuple[str, bool]]] = None):
+        # la clave describe sólo la evidencia que ya está en la creencia
+        if self.posterior_cache is None:
+            return
+        profile = self.patient.profile if self.profile_priors else None
+        self._priors_key = self.dataset.priors_key(profile)
+        if evidence is None:
+            evidence = ([(s, True) for s in self.patient.confirmed_symptoms]
+                        + [(s, False) for s in self.patient.denied_symptoms])
+        self._evidence = frozenset((s, bool(has)) for s, has in evidence)
+        self._discarded = frozenset(discarded)
+
+    def _cache_lookup(self, observations: Iterable[Tuple[str, bool]] = (),
+                      discarded: Optional[str] = None) -> Optional[List[Any]]:
+        """Agrega la evidencia a la clave del caso y busca la posterior resultante."""
+        if self.posterior_cache is None:
+            return None
+        self._evidence = self._evidence.union(observations)
+        if discarded is not None:
+            self._discarded = self._discarded | {discarded}
+        self._cache_key = (self.backend, self._priors_key, self._evidence, self._discarded)
+        entry = self.posterior_cache.get(self._cache_key)
+        if entry is not None:
+            if self.backend == 'matrix':
+                self._belief_vec = entry[0]
+                self._belief = entry[1].belief if entry[1] is not None else None
+            else:
+                self._belief = entry[0]
+                self._belief_shared = True
+        return entry
+
+    def _cache_settle(self, entry: Optional[List[Any]]):
+        """Después de _belief_changed: reusa el ranking de la entrada encontrada
+        o guarda la posterior recién calculada."""
+        if self.posterior_cache is None:
+            return
+        if entry is None:
+            if self.backend == 'matrix':
+                self._belief_vec.flags.writeable = False
+                entry = self.posterior_cache.put(self._cache_key, self._belief_vec)
+            else:
+                entry = self.posterior_cache.put(self._cache_key, self._belief)
+                self._belief_shared = True
+        self._cache_entry = entry
+        self._ranking = entry[1]
 
     def _generate_patient(self) -> Patient:
-        ids = list(self.priors.keys())
-        probs = [self.priors[i] for i in ids]
-        true_id = random.choices(ids, probs, k=1)[0]
+        # primero el perfil y luego la enfermedad según las priors de ese perfil
+        profile = random_profile(self.rng)
+        priors = self._case_priors(profile)
+        ids = list(priors.keys())
+        probs = [priors[i] for i in ids]
+        true_id = self.rng.choices(ids, probs, k=1)[0]
         true_disease = self.dataset.get_by_id(true_id)
-        return Patient(true_disease)
+        return Patient(true_disease, self.rng, profile=profile)
 
+    @METRICS.timed('ask_symptom')
     def ask_symptom(self, symptom: str) -> Dict[str, Any]:
         # patient answers
         ans, reported = self.patient.answer_question(symptom)
+        node = self._tree_node
+        entry = self._cache_lookup([(symptom, bool(reported))])
         # recompute probabilities for ALL diseases after this observation
-        # Here: probability_engine.update_with_symptom implements Bayes + prob. total + condicionada
-        disease_map = {d.id: d.symptom_likelihood for d in self.dataset.diseases}
-        self.belief = update_with_symptom(self.belief, symptom, bool(reported), disease_map)
-        return {'question': symptom, 'answer': ans, 'reported_bool': reported, 'belief': dict(self.belief)}
+        # Here: probability_engine.update_with_likelihoods implements Bayes + prob. total + condicionada
+        if entry is not None:
+            pass  # posterior tomada del caché
+        elif self.backend == 'matrix':
+            self._belief_vec = self._matrix.update(self._belief_vec, symptom, bool(reported))
+            self._belief = None
+        elif self.backend == 'log':
+            self._log_vec = self._matrix.log_update_many(self._log_vec, [(symptom, bool(reported))])
+            self._belief = None
+        elif self._active is not None:
+            self._belief = self._active.update(self._belief, symptom, bool(reported))
+        else:
+            self._belief = update_with_likelihoods(self._belief, self._likelihoods(symptom), bool(reported))
+        if self._recommender is not None:
+            self._recommender.remove_symptom(symptom)
+        self._belief_changed()
+        self._cache_settle(entry)
+        if node is not None:
+            self._tree_node = self.question_tree.child(node, symptom, bool(reported))
+        if self.log is not None:
+            self.log.ask(symptom, bool(reported), self)
+        return {'question': symptom, 'answer': ans, 'reported_bool': reported, 'belief': self._belief_snapshot()}
+
+    def _belief_snapshot(self) -> Mapping[str, float]:
+        """Creencia actual como mapeo de sólo lectura que no cambia con las
+        acciones siguientes, sin recorrer las enfermedades si se puede."""
+        if self._active is not None:
+            # ActiveSet modifica la creencia activa en su lugar
+            return MappingProxyType(dict(self._belief))
+        if self.backend == 'dict':
+            # copia al escribir: discard_disease copia antes de modificar
+            self._belief_shared = True
+            return MappingProxyType(self._belief)
+        if self._belief is None and self.backend == 'matrix':
+            # los vectores se reemplazan en cada actualización, nunca se modifican
+            vector, matrix = self._belief_vec, self._matrix
+            return BeliefView(lambda: matrix.to_dict(vector))
+        if self._belief is None and self.backend == 'log':
+            log_vector, matrix = self._log_vec, self._matrix
+            return BeliefView(lambda: matrix.to_dict(matrix.from_log(log_vector)))
+        # los diccionarios de 'matrix' y 'log' se crean al leer belief y no se modifican
+        return MappingProxyType(self.belief)
+
+    @METRICS.timed('observe')
+    def observe(self, observations: List[Tuple[str, bool]]):
+        """Aplica varias observaciones (síntoma, presente) sin preguntar al paciente,
+        p.ej. para precargar el reporte inicial o reproducir respuestas guardadas.
+        Con los backends 'log' y 'matrix' cuesta una sola actualización."""
+        observations = [(s, bool(has)) for s, has in observations]
+        entry = self._cache_lookup(observations)
+        if entry is not None:
+            pass  # posterior tomada del caché
+        elif self.backend == 'matrix':
+            self._belief_vec = self._matrix.update_many(self._belief_vec, observations)
+            self._belief = None
+        elif self.backend == 'log':
+            self._log_vec = self._matrix.log_update_many(self._log_vec, observations)
+            self._belief = None
+        elif self._active is not None:
+            for symptom, has in observations:
+                self._belief = self._active.update(self._belief, symptom, has)
+        else:
+            for symptom, has in observations:
+                self._belief = update_with_likelihoods(self._belief, self._likelihoods(symptom), has)
+        self._belief_changed()
+        self._cache_settle(entry)
 
+    @METRICS.timed('suggest_symptoms')
     def suggest_symptoms(self, n: int = 3) -> List[str]:
-        """Return up to n symptoms: one likely, one medium, one unlikely (based on current belief)."""
-        ranked = sorted(self.belief.items(), key=lambda x: -x[1])
-        if not ranked:
+        """Return up to n symptoms: one likely, one medium, one unlikely (based on current belief).
+        With recommender='information_gain', the n symptoms with highest expected information gain.
+        With a question tree, its precomputed questions while the case stays on the tree."""
+        if self._tree_node is not None:
+            planned = [s for s in self.question_tree.questions(self._tree_node) if self.patient.can_ask(s)]
+            if len(planned) >= n:
+                return planned[:n]
+            return planned + [s for s in self._live_suggestions(n) if s not in planned][:n - len(planned)]
+        return self._live_suggestions(n)
+
+    def _live_suggestions(self, n: int) -> List[str]:
+        if self._recommender is not None:
+            return self._recommender.top(self.belief_vector(), n)
+        ranking = self.ranking
+        if not len(ranking):
             return []
-        ids = [r[0] for r in ranked]
-        likely = self.dataset.get_by_id(ids[0])
-        mid = self.dataset.get_by_id(ids[min(len(ids)//2, len(ids)-1)])
-        unlikely = self.dataset.get_by_id(ids[-1])
+        likely = self.dataset.get_by_id(ranking.at(0)[0])
+        mid = self.dataset.get_by_id(ranking.median()[0])
+        unlikely = self.dataset.get_by_id(ranking.at(-1)[0])
         # choose top symptom from each disease
         options = []
         for d in [likely, mid, unlikely]:
-            if d.symptom_likelihood:
-                top = max(d.symptom_likelihood.items(), key=lambda x: x[1])[0]
-                options.append(top)
+            if d.top_symptom is not None:
+                options.append(d.top_symptom)
         # ensure options are available in symptom_bank; if not, add other symptoms
-        available = [s for s in options if s in self.patient.symptom_bank]
+        available = [s for s in options if self.patient.can_ask(s)]
         # fill with random symptoms if needed
         all_symptoms = self.dataset.all_symptoms()
-        random.shuffle(all_symptoms)
+        self.rng.shuffle(all_symptoms)
         for s in all_symptoms:
             if len(available) >= n:
                 break
-            if s not in available and s in self.patient.symptom_bank:
+            if s not in available and self.patient.can_ask(s):
                 available.append(s)
         return available[:n]
 
+    @METRICS.timed('discard_disease')
     def discard_disease(self, disease_id: str):
-        if disease_id in self.belief:
-            self.belief[disease_id] = 0.0
-            total = sum(self.belief.values())
+        if disease_id not in self.priors:
+            return
+        entry = self._cache_lookup(discarded=disease_id)
+        if entry is not None:
+            pass  # posterior tomada del caché
+        elif self.backend == 'matrix':
+            self._belief_vec = self._matrix.discard(self._belief_vec, disease_id)
+            self._belief = None
+        elif self.backend == 'log':
+            self._log_vec = self._matrix.log_discard(self._log_vec, disease_id)
+            self._belief = None
+        elif self._active is not None:
+            self._belief = self._active.discard(self._belief, disease_id)
+        else:
+            if self._belief_shared:
+                self._belief = dict(self._belief)
+                self._belief_shared = False
+            self._belief[disease_id] = 0.0
+            total = sum(self._belief.values())
             if total > 0:
-                for k in self.belief:
-                    self.belief[k] /= total
+                for k in self._belief:
+                    self._belief[k] /= total
+        if self._recommender is not None:
+            self._recommender.remove_disease(disease_id)
+        self._belief_changed()
+        self._cache_settle(entry)
+        if self.log is not None:
+            self.log.discard(disease_id, self)
+
+    def pruned_mass(self) -> float:
+        """Probabilidad total de las enfermedades podadas (0 sin poda)."""
+        return self._active.pruned_mass() if self._active is not None else 0.0
+
+    def pruned_state(self) -> Optional[Dict[str, Any]]:
+        """Reserva de la poda para guardar el caso (None sin poda o sin podadas)."""
+        if self._active is None or not self._active.reserve:
+            return None
+        return self._active.state()
+
+    def open_family_history(self) -> Dict[str, Any]:
+        """Perfil del paciente (historia familiar y hábitos)."""
+        return dict(self.patient.profile)
 
     def make_diagnosis(self, disease_id: str) -> bool:
-        return disease_id == self.patient.true_disease.id
+        correct = disease_id == self.patient.true_disease.id
+        METRICS.count('diagnoses')
+        METRICS.count('diagnoses_correct', int(correct))
+        if self.log is not None:
+            self.log.diagnose(disease_id, correct)
+        return correct
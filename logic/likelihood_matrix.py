@@ -0,0 +1,118 @@
+"""likelihood_matrix.py
+Banco de enfermedades compilado en una matriz densa (NumPy) enfermedad×síntoma,
+para que la actualización de Bayes sea una sola operación vectorizada.
+"""
+from typing import Dict, List, Iterable, Tuple
+import numpy as np
+from .dataset import DEFAULT_LIKELIHOOD
+
+
+class LikelihoodMatrix:
+    """P(symptom | disease) para todo el catálogo.
+
+    Fila i = enfermedad ``ids[i]``, columna j = síntoma ``symptoms[j]``. Las
+    entradas que el catálogo no define valen DEFAULT_LIKELIHOOD (0.01), igual
+    que en Disease.likelihood y update_with_symptom.
+    """
+    def __init__(self, dataset):
+        compiled = dataset.compiled
+        self.ids: List[str] = list(compiled.ids) if compiled is not None else [d.id for d in dataset.diseases]
+        self.symptoms: List[str] = list(dataset.symptoms)
+        self.disease_index: Dict[str, int] = {id_: i for i, id_ in enumerate(self.ids)}
+        self.symptom_index: Dict[str, int] = {s: j for j, s in enumerate(self.symptoms)}
+        self.priors = (np.array(compiled.priors, dtype=np.float64) if compiled is not None
+                       else np.array([d.prior for d in dataset.diseases], dtype=np.float64))
+        self.matrix = np.full((len(self.ids), len(self.symptoms)), DEFAULT_LIKELIHOOD, dtype=np.float64)
+        if compiled is not None:
+            # desde la caché CSR, sin crear objetos Disease
+            rows = np.repeat(np.arange(len(self.ids)), np.diff(compiled.indptr))
+            self.matrix[rows, compiled.indices] = compiled.values
+        else:
+            for i, d in enumerate(dataset.diseases):
+                for s, p in d.symptom_likelihood.items():
+                    self.matrix[i, self.symptom_index[s]] = float(p)
+        # síntomas fuera del vocabulario: todas las enfermedades con el valor por defecto
+        self._default_column = np.full(len(self.ids), DEFAULT_LIKELIHOOD, dtype=np.float64)
+
+    def column(self, symptom: str) -> np.ndarray:
+        """Vector P(symptom | disease) para todas las enfermedades."""
+        j = self.symptom_index.get(symptom)
+        return self._default_column if j is None else self.matrix[:, j]
+
+    def update(self, belief: np.ndarray, symptom: str, has_symptom: bool) -> np.ndarray:
+        """Bayes vectorizado: posterior ∝ P(E|H) * P(H), normalizado por P(E)."""
+        col = self.column(symptom)
+        post = belief * (col if has_symptom else 1.0 - col)
+        # P(E) (probabilidad total)
+        p_e = post.sum()
+        if p_e > 0:
+            post /= p_e
+        else:
+            post[:] = 0.0
+        return post
+
+    def update_many(self, belief: np.ndarray, observations: Iterable[Tuple[str, bool]]) -> np.ndarray:
+        """Aplica varias observaciones de una vez: suma de log-likelihoods y una
+        sola normalización con log-sum-exp."""
+        observations = list(observations)
+        if not observations:
+            return belief
+        with np.errstate(divide='ignore'):
+            log_post = np.log(belief)
+            for symptom, has_symptom in observations:
+                col = self.column(symptom)
+                log_post = log_post + np.log(col if has_symptom else 1.0 - col)
+        m = log_post.max()
+        if not np.isfinite(m):
+            return np.zeros_like(belief)
+        post = np.exp(log_post - m)
+        return post / post.sum()
+
+    def discard(self, belief: np.ndarray, disease_id: str) -> np.ndarray:
+        """Pone a cero una enfermedad y renormaliza el resto."""
+        post = belief.copy()
+        post[self.disease_index[disease_id]] = 0.0
+        total = post.sum()
+        if total > 0:
+            post /= total
+        return post
+
+    # -----------------------------
+    # creencia en log-probabilidades (backend 'log')
+    # -----------------------------
+    def log_from_dict(self, dist: Dict[str, float]) -> np.ndarray:
+        with np.errstate(divide='ignore'):
+            return self._log_normalize(np.log(self.from_dict(dist)))
+
+    def log_update_many(self, log_belief: np.ndarray, observations: Iterable[Tuple[str, bool]]) -> np.ndarray:
+        """Teorema de Bayes con evidencia independiente dado H, en logaritmos:
+        log P(H|E1..En) = log P(H) + Σ log P(Ei|H) - log P(E1..En), con la
+        normalización por log-sum-exp (sin underflow en entrevistas largas)."""
+        log_post = log_belief
+        with np.errstate(divide='ignore'):
+            for symptom, has_symptom in observations:
+                col = self.column(symptom)
+                log_post = log_post + np.log(col if has_symptom else 1.0 - col)
+        return self._log_normalize(log_post) if log_post is not log_belief else log_belief
+
+    def log_discard(self, log_belief: np.ndarray, disease_id: str) -> np.ndarray:
+        log_post = log_belief.copy()
+        log_post[self.disease_index[disease_id]] = -np.inf
+        return self._log_normalize(log_post)
+
+    @staticmethod
+    def _log_normalize(log_post: np.ndarray) -> np.ndarray:
+        # log P(E) por probabilidad total; sin masa (evidencia imposible) queda todo en -inf
+        m = log_post.max() if len(log_post) else -np.inf
+        if not np.isfinite(m):
+            return log_post
+        return log_post - (m + np.log(np.exp(log_post - m).sum()))
+
+    def from_log(self, log_belief: np.ndarray) -> np.ndarray:
+        return np.exp(log_belief)
+
+    def to_dict(self, belief: np.ndarray) -> Dict[str, float]:
+        return dict(zip(self.ids, belief.tolist()))
+
+    def from_dict(self, dist: Dict[str, float]) -> np.ndarray:
+        return np.array([dist.get(id_, 0.0) for id_ in self.ids], dtype=np.float64)
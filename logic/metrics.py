@@ -0,0 +1,145 @@
+"""metrics.py
+Instrumentación de bajo costo: contadores e histogramas de latencia por
+operación (ask_symptom, suggest_symptoms, carga del Dataset, cuadros de
+main.play(), ...). Está desactivada por defecto; se activa en tiempo de
+ejecución con METRICS.enabled = True y se exporta a JSON.
+
+    from logic.metrics import METRICS
+    METRICS.enabled = True
+    ...
+    METRICS.dump('metrics.json')
+"""
+import json
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Dict, List, Optional
+
+# cubeta i: latencias en [2^(i-1), 2^i) microsegundos (la última acumula el resto)
+N_BUCKETS = 32
+
+
+class Histogram:
+    __slots__ = ('count', 'total', 'min', 'max', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = float('inf')
+        self.max = 0.0
+        self.buckets = [0] * N_BUCKETS
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        if seconds < self.min:
+            self.min = seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.buckets[min(int(seconds * 1e6).bit_length(), N_BUCKETS - 1)] += 1
+
+    def percentile(self, q: float) -> float:
+        """Cota superior (en segundos) de la cubeta que contiene el percentil q."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank:
+                return min((1 << i) * 1e-6, self.max)
+        return self.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'total_ms': self.total * 1e3,
+            'mean_ms': self.total / self.count * 1e3 if self.count else 0.0,
+            'min_ms': self.min * 1e3 if self.count else 0.0,
+            'max_ms': self.max * 1e3,
+            'p50_ms': self.percentile(0.50) * 1e3,
+            'p95_ms': self.percentile(0.95) * 1e3,
+            'p99_ms': self.percentile(0.99) * 1e3,
+            # límite superior de cada cubeta en µs -> cantidad (sólo las no vacías)
+            'buckets_us': {1 << i: n for i, n in enumerate(self.buckets) if n},
+        }
+
+
+class Metrics:
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.counters: Dict[str, int] = {}
+        self.latency: Dict[str, Histogram] = {}
+
+    def count(self, name: str, n: int = 1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def observe(self, name: str, seconds: float):
+        if self.enabled:
+            h = self.latency.get(name)
+            if h is None:
+                h = self.latency[name] = Histogram()
+            h.add(seconds)
+
+    @contextmanager
+    def timer(self, name: str):
+        """Mide el bloque (si está activado)."""
+        if not self.enabled:
+            yield
+            return
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - t0)
+
+    def timed(self, name: str):
+        """Decorador: registra la latencia de cada llamada; desactivado cuesta un if."""
+        def decorator(fn):
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                t0 = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.observe(name, time.perf_counter() - t0)
+            return wrapper
+        return decorator
+
+    def reset(self):
+        self.counters.clear()
+        self.latency.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'enabled': self.enabled,
+            'counters': dict(self.counters),
+            'latency': {name: h.to_dict() for name, h in sorted(self.latency.items())},
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot(), indent=2)
+
+    def dump(self, path: str):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.to_json())
+
+    def summary_lines(self, names: Optional[List[str]] = None) -> List[str]:
+        """Una línea por operación, para overlays y paneles de depuración."""
+        lines = []
+        for name in names if names is not None else sorted(self.latency):
+            h = self.latency.get(name)
+            if h is None:
+                continue
+            lines.append(f"{name:<18} n={h.count:<6} p50={h.percentile(0.5) * 1e3:7.2f} ms  "
+                         f"p95={h.percentile(0.95) * 1e3:7.2f} ms  max={h.max * 1e3:7.2f} ms")
+        for name, n in sorted(self.counters.items()):
+            lines.append(f"{name:<18} {n}")
+        return lines
+
+
+# instancia global que usan logic, main.py, ui/ y server/
+METRICS = Metrics()
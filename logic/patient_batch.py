@@ -0,0 +1,155 @@
+"""patient_batch.py
+Generación vectorizada de pacientes: N pacientes en un solo paso (perfil,
+enfermedad según la prior de ese perfil, síntomas verdaderos y confianza) guardados en arreglos
+por columna. Los objetos Patient se crean sólo cuando se piden.
+"""
+import itertools
+import random
+from typing import Dict, List, Optional
+import numpy as np
+from .dataset import Dataset
+from .game_engine import Patient, PROFILE_OPTIONS
+
+# como Patient._sample_true_symptoms: 1 síntoma con prob. 0.7, si no entre 1 y 3
+MAX_TRUE_SYMPTOMS = 3
+P_SINGLE_SYMPTOM = 0.7
+
+
+class PatientBatch:
+    """Lote de pacientes por columnas.
+
+    disease:       (N,) índice de la enfermedad real en dataset.diseases
+    profile:       (N, len(PROFILE_OPTIONS)) índice del valor elegido por campo
+    true_symptoms: (N, MAX_TRUE_SYMPTOMS) índices en dataset.symptoms (-1 = sin
+                   síntoma; un índice puede repetirse)
+    confidence:    (N,) confianza de las respuestas
+    """
+    def __init__(self, dataset: Dataset, disease: np.ndarray, profile: np.ndarray,
+                 true_symptoms: np.ndarray, confidence: np.ndarray):
+        self.dataset = dataset
+        self.disease = disease
+        self.profile = profile
+        self.true_symptoms = true_symptoms
+        self.confidence = confidence
+
+    def __len__(self) -> int:
+        return len(self.disease)
+
+    def profile_of(self, i: int) -> Dict[str, str]:
+        return {k: options[c] for (k, options), c in zip(PROFILE_OPTIONS.items(), self.profile[i].tolist())}
+
+    def true_symptoms_of(self, i: int) -> List[str]:
+        """Síntomas verdaderos del paciente i, sin repetir y en el orden del vocabulario."""
+        symptoms = self.dataset.symptoms
+        row = self.true_symptoms[i]
+        return [symptoms[j] for j in np.unique(row[row >= 0]).tolist()]
+
+    def patient(self, i: int, rng: Optional[random.Random] = None) -> Patient:
+        """Crea el Patient i del lote (rng se usa para sus respuestas)."""
+        return Patient(self.dataset.diseases[int(self.disease[i])], rng,
+                       profile=self.profile_of(i),
+                       true_symptoms=self.true_symptoms_of(i),
+                       confidence=float(self.confidence[i]))
+
+    def __iter__(self):
+        return (self.patient(i) for i in range(len(self)))
+
+
+class PatientGenerator:
+    """Precalcula, una vez por Dataset, las distribuciones de muestreo."""
+    def __init__(self, dataset: Dataset):
+        self.dataset = dataset
+        n_d = len(dataset.diseases)
+        priors = np.array([d.prior for d in dataset.diseases], dtype=np.float64)
+        self.priors = priors / priors.sum() if priors.sum() > 0 else np.full(n_d, 1.0 / n_d)
+        # pesos sólo de los síntomas que lista cada enfermedad (sin el 0.01 por
+        # defecto), en CSR: no hay matrices D×S aunque el catálogo sea grande
+        owner, cols, weights = self._listed(dataset)
+        order = np.lexsort((cols, owner))
+        owner, cols, weights = owner[order], cols[order], weights[order]
+        self.n_listed = np.bincount(owner, minlength=n_d)
+        self.indptr = np.concatenate([[0], np.cumsum(self.n_listed)])
+        self.indices = cols
+        totals = np.bincount(owner, weights=weights, minlength=n_d)
+        # pesos nulos: uniforme entre los síntomas listados, como en Patient
+        zero = totals <= 0
+        weights = np.where(zero[owner], 1.0, weights)
+        totals = np.where(zero, self.n_listed, totals)
+        # CDF de cada fila desplazada por su número de fila: un solo arreglo
+        # creciente donde la fila d ocupa (d, d + 1] y termina en d + 1 exacto
+        cdf = np.cumsum(weights / totals[owner])
+        starts = self.indptr[:-1][owner]
+        cdf -= np.where(starts > 0, cdf[np.maximum(starts - 1, 0)], 0.0)
+        cdf[self.indptr[1:][self.n_listed > 0] - 1] = 1.0
+        # el redondeo de la suma acumulada no debe romper el orden para searchsorted
+        self.cdf = np.maximum.accumulate(cdf + owner)
+        self.n_options = np.array([len(v) for v in PROFILE_OPTIONS.values()])
+        # priors por perfil: combinación (índice plano sobre n_options) -> fila de
+        # profile_table; las combinaciones que comparten tabla en el Dataset comparten fila
+        rows: Dict[int, int] = {}
+        tables = []
+        self.profile_row = np.empty(int(np.prod(self.n_options)), dtype=np.intp)
+        for c, values in enumerate(itertools.product(*PROFILE_OPTIONS.values())):
+            table = dataset.profile_priors[values]
+            if id(table) not in rows:
+                rows[id(table)] = len(tables)
+                p = np.fromiter(table.values(), dtype=np.float64, count=n_d)
+                tables.append(p / p.sum() if p.sum() > 0 else np.full(n_d, 1.0 / n_d))
+            self.profile_row[c] = rows[id(table)]
+        self.profile_table = np.stack(tables)
+
+    @staticmethod
+    def _listed(dataset: Dataset):
+        """(enfermedad, síntoma, P) de cada síntoma listado, desde la caché
+        compilada si la hay o desde symptom_likelihood."""
+        compiled = getattr(dataset, 'compiled', None)
+        if compiled is not None:
+            indptr = np.asarray(compiled.indptr, dtype=np.intp)
+            rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+            return (rows, np.asarray(compiled.indices, dtype=np.intp),
+                    np.asarray(compiled.values, dtype=np.float64))
+        index = {s: j for j, s in enumerate(dataset.symptoms)}
+        rows, cols, weights = [], [], []
+        for i, d in enumerate(dataset.diseases):
+            for s, p in d.symptom_likelihood.items():
+                rows.append(i)
+                cols.append(index[s])
+                weights.append(float(p))
+        return (np.array(rows, dtype=np.intp), np.array(cols, dtype=np.intp),
+                np.array(weights, dtype=np.float64))
+
+    def generate(self, n: int, rng: Optional[np.random.Generator] = None,
+                 priors: Optional[np.ndarray] = None, profile_priors: bool = True) -> PatientBatch:
+        """Sortea n pacientes de una vez: primero el perfil y luego la enfermedad según
+        las priors de ese perfil (como GameEngine). priors (opcional) reemplaza las
+        priors del catálogo; con profile_priors=False se ignora el perfil."""
+        rng = rng if rng is not None else np.random.default_rng()
+        profile = (rng.random((n, len(self.n_options))) * self.n_options).astype(np.intp)
+        if priors is not None or not profile_priors:
+            p = self.priors if priors is None else priors / priors.sum()
+            disease = rng.choice(len(p), size=n, p=p)
+        else:
+            row = self.profile_row[np.ravel_multi_index(profile.T, self.n_options)]
+            disease = np.empty(n, dtype=np.intp)
+            for r in np.unique(row).tolist():
+                sel = row == r
+                disease[sel] = rng.choice(len(self.priors), size=int(sel.sum()), p=self.profile_table[r])
+        # cuántos síntomas sortear por paciente (k)
+        n_listed = self.n_listed[disease]
+        k_max = np.minimum(MAX_TRUE_SYMPTOMS, n_listed)
+        single = rng.random(n) < P_SINGLE_SYMPTOM
+        k = np.where(single, 1, 1 + (rng.random(n) * k_max).astype(np.intp))
+        k = np.where(n_listed == 0, 0, k)
+        # k muestreos con reemplazo por CDF inversa sobre la fila de la enfermedad
+        u = rng.random((n, MAX_TRUE_SYMPTOMS))
+        true_symptoms = np.full((n, MAX_TRUE_SYMPTOMS), -1, dtype=np.intp)
+        lo, hi = self.indptr[disease], self.indptr[disease + 1] - 1
+        for t in range(MAX_TRUE_SYMPTOMS):
+            active = t < k
+            d = disease[active]
+            pos = np.searchsorted(self.cdf, d + u[active, t], side='right')
+            # d + u puede redondear a d + 1: se queda en el último síntoma de su fila
+            pos = np.clip(pos, lo[active], hi[active])
+            true_symptoms[active, t] = self.indices[pos]
+        confidence = np.round(rng.uniform(0.6, 0.95, size=n), 2)
+        return PatientBatch(self.dataset, disease, profile, true_symptoms, confidence)
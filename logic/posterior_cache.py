@@ -0,0 +1,68 @@
+"""posterior_cache.py
+Caché LRU de posteriors compartido por varios GameEngine del mismo Dataset
+(p.ej. todas las sesiones de server/service.py).
+
+Muchos casos recorren los mismos primeros caminos ("tos: sí, fiebre: no") desde
+las mismas priors; la posterior depende sólo de las priors y del conjunto de
+evidencia, no del orden de las respuestas. La clave es
+
+    (backend, Dataset.priors_key(perfil), frozenset{(síntoma, presente)}, frozenset{descartadas})
+
+y el valor, la creencia (dict o vector NumPy según el backend) junto con su
+ranking (logic/ranking.py) cuando alguien lo calculó. Las entradas se
+comparten entre motores y no se modifican: GameEngine copia antes de escribir.
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional
+
+DEFAULT_MAXSIZE = 4096
+
+
+class PosteriorCache:
+    def __init__(self, maxsize: int = DEFAULT_MAXSIZE):
+        if maxsize <= 0:
+            raise ValueError(f"maxsize must be positive, got {maxsize!r}")
+        self.maxsize = maxsize
+        self._data: 'OrderedDict[Hashable, List[Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Optional[List[Any]]:
+        """Entrada [creencia, ranking] de `key` (la marca como recién usada) o None."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: Hashable, belief: Any) -> List[Any]:
+        """Guarda la creencia (sin ranking todavía) y devuelve la entrada."""
+        entry = [belief, None]
+        with self._lock:
+            self._data[key] = entry
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'size': len(self._data), 'maxsize': self.maxsize, 'hits': self.hits,
+                    'misses': self.misses, 'evictions': self.evictions,
+                    'hit_rate': self.hits / lookups if lookups else 0.0}
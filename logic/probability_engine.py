@@ -2,7 +2,9 @@
 Módulo con todos los cálculos probabilísticos. Cada función incluye un comentario
 indicando qué concepto estadístico implementa.
 """
-from typing import Dict, List
+from typing import Dict, List, Mapping
+
+from .dataset import DEFAULT_LIKELIHOOD
 
 # -----------------------------
 # Conceptos básicos / Teorema de Laplace
@@ -75,7 +77,7 @@ def update_with_symptom(priors: Dict[str, float],
     # Construimos P(E | H) para cada hipótesis H (enfermedad)
     p_e_given_h = {}
     for h in priors:
-        p = disease_symptom_map.get(h, {}).get(symptom, 0.01)
+        p = disease_symptom_map.get(h, {}).get(symptom, DEFAULT_LIKELIHOOD)
         # si el paciente NO tiene el síntoma, usamos 1 - P(symptom|h)
         p_e_given_h[h] = p if has_symptom else (1 - p)
 
@@ -83,3 +85,15 @@ def update_with_symptom(priors: Dict[str, float],
     new_post = bayes_update(priors, p_e_given_h)
 
     return new_post
+
+def update_with_likelihoods(priors: Dict[str, float],
+                            symptom_likelihoods: Mapping[str, float],
+                            has_symptom: bool) -> Dict[str, float]:
+    """Igual que update_with_symptom, pero con la columna del síntoma
+    (Dataset.symptom_likelihoods): P(symptom|disease) sólo de las enfermedades
+    que lo listan; el resto usa DEFAULT_LIKELIHOOD."""
+    p_e_given_h = {}
+    for h in priors:
+        p = symptom_likelihoods.get(h, DEFAULT_LIKELIHOOD)
+        p_e_given_h[h] = p if has_symptom else (1 - p)
+    return bayes_update(priors, p_e_given_h)
@@ -0,0 +1,192 @@
+"""pruning.py
+Poda del conjunto activo de hipótesis (GameEngine(..., prune=umbral)).
+
+Después de unas pocas respuestas casi todas las enfermedades tienen una
+posterior despreciable. ActiveSet saca de la creencia las que quedan por
+debajo de `threshold` (fracción de la masa activa) y las guarda en una reserva;
+las actualizaciones, la normalización y el ranking sólo recorren las activas.
+
+El peso de las reservadas se mantiene exacto sin recorrerlas: ante una
+respuesta, todas las enfermedades que no listan el síntoma se multiplican por
+el mismo P(E|H) (DEFAULT_LIKELIHOOD o su complemento), que se acumula en un
+único desplazamiento logarítmico; sólo las que lo listan
+(Dataset.symptom_likelihoods) se corrigen una por una. Un heap con la reservada más
+pesada decide si alguna debe volver al conjunto activo.
+"""
+import heapq
+import math
+from typing import Any, Callable, Dict, List, Mapping, Tuple
+
+from .dataset import DEFAULT_LIKELIHOOD
+from .probability_engine import total_probability
+
+
+def _log(p: float) -> float:
+    return math.log(p) if p > 0 else -math.inf
+
+
+class ActiveSet:
+    """Creencia del backend 'dict' restringida a las enfermedades activas.
+
+    Invariante: el peso sin normalizar de una enfermedad activa h es
+    belief[h] * exp(log_scale) y el de una reservada exp(reserve[h] + shift).
+    """
+    def __init__(self, threshold: float, likelihoods: Callable[[str], Mapping[str, float]]):
+        if not 0.0 < threshold < 1.0:
+            raise ValueError(f"prune threshold must be in (0, 1), got {threshold!r}")
+        self.threshold = threshold
+        # síntoma -> {id: P(symptom | disease)} de las enfermedades que lo listan
+        self.likelihoods = likelihoods
+        self.reserve: Dict[str, float] = {}
+        self.shift = 0.0
+        self.log_scale = 0.0
+        self._heap: List[Tuple[float, str]] = []
+        self._total = 1.0
+
+    # -----------------------------
+    # operaciones sobre la creencia
+    # -----------------------------
+    def start(self, belief: Dict[str, float]) -> Dict[str, float]:
+        """Caso nuevo: `belief` (las priors) pasa a ser la creencia activa."""
+        self.reserve.clear()
+        self._heap.clear()
+        self.shift = self.log_scale = 0.0
+        self._total = sum(belief.values())
+        self._prune(belief)
+        return belief
+
+    def update(self, belief: Dict[str, float], symptom: str, has_symptom: bool) -> Dict[str, float]:
+        """update_with_symptom sobre las activas; la reserva se actualiza aparte."""
+        if self.reserve:
+            self._update_reserve(symptom, has_symptom)
+        column = self.likelihoods(symptom)
+        likelihoods = {}
+        for h in belief:
+            p = column.get(h, DEFAULT_LIKELIHOOD)
+            likelihoods[h] = p if has_symptom else (1 - p)
+        # P(E) restringida a las activas (probabilidad total)
+        p_e = total_probability(likelihoods, belief)
+        if p_e > 0:
+            post = {h: likelihoods[h] * p / p_e for h, p in belief.items()}
+            self.log_scale += math.log(p_e)
+            self._total = 1.0
+        else:
+            post = dict.fromkeys(belief, 0.0)
+            self._total = 0.0
+        self._prune(post)
+        self._reactivate(post)
+        return post
+
+    def discard(self, belief: Dict[str, float], disease_id: str) -> Dict[str, float]:
+        """Descarta la enfermedad (P = 0) y renormaliza las activas."""
+        if disease_id in self.reserve:
+            del self.reserve[disease_id]
+            return belief
+        p = belief.pop(disease_id, 0.0)
+        self._renormalize(belief, self._total - p)
+        self._reactivate(belief)
+        return belief
+
+    def state(self) -> Dict[str, Any]:
+        """Reserva y escalas para un snapshot (logic/event_log.py). Las reservadas
+        con peso 0 no pueden volver y no se guardan."""
+        return {'r': {h: w for h, w in self.reserve.items() if w > -math.inf},
+                'k': self.shift, 'l': self.log_scale}
+
+    def restore(self, belief: Dict[str, float], state: Mapping[str, Any]) -> Dict[str, float]:
+        """Retoma la creencia activa `belief` con la reserva de state()."""
+        self.reserve = {h: float(w) for h, w in state['r'].items()}
+        self.shift = float(state['k'])
+        self.log_scale = float(state['l'])
+        self._total = sum(belief.values())
+        self._heap = [(-w, h) for h, w in self.reserve.items()]
+        heapq.heapify(self._heap)
+        return belief
+
+    def pruned_mass(self) -> float:
+        """Fracción de la posterior completa que está en la reserva."""
+        if not self.reserve:
+            return 0.0
+        log_active = self._log_active()
+        if log_active == -math.inf:
+            return 1.0
+        pruned = sum(math.exp(w + self.shift - log_active) for w in self.reserve.values())
+        return pruned / (1.0 + pruned)
+
+    # -----------------------------
+    # internos
+    # -----------------------------
+    def _log_active(self) -> float:
+        return self.log_scale + _log(self._total)
+
+    def _update_reserve(self, symptom: str, has_symptom: bool):
+        # enfermedades que no listan el síntoma: mismo factor para todas
+        base = _log(DEFAULT_LIKELIHOOD if has_symptom else 1 - DEFAULT_LIKELIHOOD)
+        self.shift += base
+        for h, p in self.likelihoods(symptom).items():
+            w = self.reserve.get(h)
+            if w is None:
+                continue
+            w += _log(p if has_symptom else 1 - p) - base
+            self.reserve[h] = w
+            if w > -math.inf:
+                heapq.heappush(self._heap, (-w, h))
+
+    def _renormalize(self, belief: Dict[str, float], total: float):
+        # la creencia activa vuelve a sumar 1; la escala absorbe el factor
+        if total <= 0:
+            self._total = 0.0
+            return
+        for h in belief:
+            belief[h] /= total
+        self.log_scale += math.log(total)
+        self._total = 1.0
+
+    def _prune(self, belief: Dict[str, float]):
+        if self._total <= 0 or len(belief) < 2:
+            return
+        cut = self.threshold * self._total
+        best = max(belief, key=belief.get)
+        low = [h for h, p in belief.items() if p < cut and h != best]
+        if not low:
+            return
+        offset = self.log_scale - self.shift
+        removed = 0.0
+        for h in low:
+            p = belief.pop(h)
+            removed += p
+            w = _log(p) + offset
+            self.reserve[h] = w
+            if w > -math.inf:
+                heapq.heappush(self._heap, (-w, h))
+        self._renormalize(belief, self._total - removed)
+
+    def _reactivate(self, belief: Dict[str, float]):
+        """Devuelve al conjunto activo las reservadas que, con su peso exacto,
+        tendrían al menos `threshold` de la masa."""
+        reactivated = False
+        while self._heap:
+            neg_w, h = self._heap[0]
+            if self.reserve.get(h) != -neg_w:
+                heapq.heappop(self._heap)  # descartada, reactivada o con peso nuevo
+                continue
+            w = -neg_w + self.shift
+            log_active = self._log_active()
+            if log_active > -math.inf:
+                ratio = math.exp(w - log_active)
+                if ratio / (1.0 + ratio) < self.threshold:
+                    break
+            heapq.heappop(self._heap)
+            del self.reserve[h]
+            if log_active == -math.inf:
+                # ninguna activa explica la evidencia: la reservada pasa a ser la escala
+                self.log_scale = w
+                belief[h] = 1.0
+                self._total = 1.0
+            else:
+                # se renormaliza una sola vez al final
+                belief[h] = math.exp(w - self.log_scale)
+                self._total += belief[h]
+            reactivated = True
+        if reactivated:
+            self._renormalize(belief, self._total)
@@ -0,0 +1,215 @@
+"""question_tree.py
+Árbol de preguntas compilado offline para un catálogo fijo.
+
+Con el catálogo fijo, la mejor pregunta siguiente depende sólo de las priors
+del caso y del camino de respuestas (síntoma, sí/no). compile_tree expande una
+política con anticipación de `lookahead` preguntas (minimiza la entropía
+esperada de la creencia después de esas preguntas, con ganancia de
+información de recommender.py) hasta `depth` niveles, para cada tabla de
+priors de Dataset.profile_priors, y lo guarda junto al catálogo
+(``diseases.json`` -> ``diseases.json.qtree.json``).
+
+En el juego, GameEngine(dataset, question_tree=True) sigue el árbol con un
+puntero al nodo actual: la sugerencia es una búsqueda O(1). Cuando el camino
+sale del árbol (otra pregunta, un descarte, más profundidad que `depth`) se
+vuelve al cálculo en vivo de suggest_symptoms.
+
+Uso (requiere NumPy sólo para compilar):
+    python -m logic.question_tree data/diseases.json --depth 8 --lookahead 2
+"""
+import argparse
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+from .dataset import Dataset, PROFILE_OPTIONS
+from .utils import source_matches, source_stamp
+
+TREE_VERSION = 1
+# nodos que se alcanzan con probabilidad menor no se expanden
+MIN_PATH_PROB = 1e-6
+
+
+def tree_path_for(path: Path) -> Path:
+    return path.with_name(path.name + '.qtree.json')
+
+
+def profile_key(profile: Optional[Mapping[str, Any]]) -> str:
+    """Clave de la raíz: los valores del perfil en el orden de PROFILE_OPTIONS
+    ('' = priors del catálogo, sin perfil)."""
+    if profile is None:
+        return ''
+    return '|'.join(str(profile.get(k)) for k in PROFILE_OPTIONS)
+
+
+class QuestionTree:
+    """Nodos [preguntas, hijo_sí, hijo_no]: las preguntas (índices en `symptoms`)
+    van de mejor a peor y sólo la primera tiene hijos (-1 = fin del árbol)."""
+    def __init__(self, symptoms: Sequence[str], nodes: List[List[Any]], roots: Dict[str, int],
+                 meta: Optional[Dict[str, Any]] = None):
+        self.symptoms = list(symptoms)
+        self.nodes = nodes
+        self.roots = roots
+        self.meta = meta or {}
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def root(self, profile: Optional[Mapping[str, Any]]) -> Optional[int]:
+        return self.roots.get(profile_key(profile))
+
+    def questions(self, node: int) -> List[str]:
+        return [self.symptoms[j] for j in self.nodes[node][0]]
+
+    def child(self, node: int, symptom: str, reported: bool) -> Optional[int]:
+        """Nodo después de responder `symptom`; None si no es la pregunta del árbol."""
+        questions, yes, no = self.nodes[node]
+        if not questions or self.symptoms[questions[0]] != symptom:
+            return None
+        nxt = yes if reported else no
+        return nxt if nxt >= 0 else None
+
+    # -----------------------------
+    # serialización
+    # -----------------------------
+    def save(self, path):
+        path = Path(path)
+        tmp = path.with_name(path.name + '.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'meta': self.meta, 'symptoms': self.symptoms,
+                       'roots': self.roots, 'nodes': self.nodes}, f, separators=(',', ':'))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path) -> 'QuestionTree':
+        with open(path, 'r', encoding='utf-8') as f:
+            raw = json.load(f)
+        return cls(raw['symptoms'], raw['nodes'], raw['roots'], raw.get('meta'))
+
+
+def load_tree(catalog_path) -> Optional[QuestionTree]:
+    """Árbol compilado junto a `catalog_path`, o None si no existe o es de otra
+    versión del catálogo."""
+    catalog_path = Path(catalog_path)
+    try:
+        tree = QuestionTree.load(tree_path_for(catalog_path))
+    except (OSError, ValueError, KeyError):
+        return None
+    if tree.meta.get('version') != TREE_VERSION or not source_matches(catalog_path, tree.meta):
+        return None
+    return tree
+
+
+# -----------------------------
+# compilación
+# -----------------------------
+class _Planner:
+    """Política con anticipación: entropía esperada tras k preguntas, explorando
+    en cada nivel sólo las `beam` de mayor ganancia inmediata."""
+    def __init__(self, matrix, lookahead: int, width: int, beam: int):
+        self.matrix = matrix.matrix
+        self.lookahead = lookahead
+        self.width = width
+        self.beam = beam
+
+    def rank(self, belief, cols, k: int):
+        """(entropías esperadas, columnas) de las mejores preguntas, de mejor a peor."""
+        import numpy as np
+        from .recommender import entropy, expected_information_gain
+        like = self.matrix[:, cols]
+        gains = expected_information_gain(belief, like)
+        if k <= 1 or len(cols) == 1:
+            order = np.argsort(-gains, kind='stable')
+            return entropy(belief) - gains[order], cols[order]
+        candidates = np.argsort(-gains, kind='stable')[:self.beam]
+        values = np.empty(len(candidates))
+        for i, c in enumerate(candidates):
+            rest = np.delete(cols, c)
+            value = 0.0
+            for answer in (like[:, c], 1.0 - like[:, c]):
+                joint = belief * answer
+                p = joint.sum()
+                if p > 0:
+                    value += p * self.rank(joint / p, rest, k - 1)[0][0]
+            values[i] = value
+        order = np.argsort(values, kind='stable')
+        return values[order], cols[candidates[order]]
+
+    def expand(self, nodes: List[List[Any]], belief, cols, depth: int, path_prob: float) -> int:
+        import numpy as np
+        if depth <= 0 or len(cols) == 0 or path_prob < MIN_PATH_PROB:
+            return -1
+        _, ranked = self.rank(belief, cols, min(self.lookahead, len(cols)))
+        q = int(ranked[0])
+        index = len(nodes)
+        node: List[Any] = [[int(c) for c in ranked[:self.width]], -1, -1]
+        nodes.append(node)
+        rest = cols[cols != q]
+        column = self.matrix[:, q]
+        for slot, answer in ((1, column), (2, 1.0 - column)):
+            joint = belief * answer
+            p = float(joint.sum())
+            if p > 0:
+                node[slot] = self.expand(nodes, joint / p, rest, depth - 1, path_prob * p)
+        return index
+
+
+def compile_tree(dataset: Dataset, depth: int = 8, lookahead: int = 2, width: int = 3,
+                 beam: int = 8, profile_priors: bool = True) -> QuestionTree:
+    """Expande la política para cada tabla de priors distinta (las de
+    Dataset.profile_priors y las del catálogo). Requiere NumPy."""
+    import numpy as np
+    matrix = dataset.likelihood_matrix()
+    planner = _Planner(matrix, lookahead, width, beam)
+    cols = np.arange(len(matrix.symptoms))
+    nodes: List[List[Any]] = []
+    roots: Dict[str, int] = {}
+    by_table: Dict[tuple, int] = {}
+    tables = [('', dataset.priors())]
+    if profile_priors:
+        tables += [('|'.join(map(str, values)), table) for values, table in dataset.profile_priors.items()]
+    for key, priors in tables:
+        belief = matrix.from_dict(priors)
+        signature = tuple(belief.tolist())
+        if signature not in by_table:
+            total = belief.sum()
+            by_table[signature] = planner.expand(nodes, belief / total if total > 0 else belief,
+                                                 cols, depth, 1.0)
+        roots[key] = by_table[signature]
+    meta = {'version': TREE_VERSION, 'depth': depth, 'lookahead': lookahead,
+            'width': width, 'beam': beam}
+    return QuestionTree(matrix.symptoms, nodes, roots, meta)
+
+
+def compile_tree_file(path, **kwargs) -> Path:
+    """Compila el árbol del catálogo en `path` y lo guarda a su lado."""
+    path = Path(path)
+    stamp = source_stamp(path)
+    tree = compile_tree(Dataset(str(path)), **kwargs)
+    tree.meta.update(stamp)
+    out = tree_path_for(path)
+    tree.save(out)
+    return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compila el árbol de preguntas de un catálogo")
+    parser.add_argument('catalog', nargs='?',
+                        default=os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'diseases.json'))
+    parser.add_argument('--depth', type=int, default=8, help="preguntas cubiertas por el árbol")
+    parser.add_argument('--lookahead', type=int, default=2, help="preguntas de anticipación por nodo")
+    parser.add_argument('--width', type=int, default=3, help="sugerencias guardadas por nodo")
+    parser.add_argument('--beam', type=int, default=8, help="candidatas exploradas por nivel de anticipación")
+    args = parser.parse_args(argv)
+    t0 = time.perf_counter()
+    out = compile_tree_file(args.catalog, depth=args.depth, lookahead=args.lookahead,
+                            width=args.width, beam=args.beam)
+    tree = QuestionTree.load(out)
+    print(f"{out}: {len(tree)} nodos, {len(set(tree.roots.values()))} raíces "
+          f"en {time.perf_counter() - t0:.1f} s")
+
+
+if __name__ == '__main__':
+    main()
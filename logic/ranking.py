@@ -0,0 +1,111 @@
+"""ranking.py
+Orden de la creencia (de mayor a menor probabilidad) sin ordenar todo el
+catálogo en cada consulta. El orden es el de
+sorted(belief.items(), key=lambda x: -x[1]): los empates quedan en el orden del
+diccionario.
+
+GameEngine.ranking guarda una instancia que se descarta sólo cuando cambia la
+creencia (pregunta, descarte, caso nuevo), así que dibujar el top-10 en cada
+cuadro no vuelve a ordenar nada. Con NumPy las consultas usan selección parcial
+(np.partition, O(D)); sin NumPy, heapq para el top-k y un orden completo
+cacheado para las posiciones arbitrarias.
+"""
+import heapq
+from operator import itemgetter
+from typing import List, Mapping, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # backend 'dict' sin NumPy
+    np = None
+
+# por debajo de este tamaño un sort completo es más barato que seleccionar
+FULL_SORT_BELOW = 64
+
+Ranked = Tuple[str, float]
+
+
+class BeliefRanking:
+    def __init__(self, belief: Mapping[str, float], vector=None):
+        """`vector` (opcional) son los mismos valores de `belief`, en su orden,
+        como arreglo NumPy (p.ej. la creencia del backend 'matrix')."""
+        self.belief = belief
+        self._n = len(belief)
+        self._ids: Optional[List[str]] = None
+        self._vector = vector
+        # prefijo del orden ya calculado; completo cuando len == n
+        self._top: List[Ranked] = []
+
+    def __len__(self) -> int:
+        return self._n
+
+    # -----------------------------
+    # consultas
+    # -----------------------------
+    def top(self, k: Optional[int] = None) -> List[Ranked]:
+        """Las k enfermedades más probables como (id, p); k=None = todas."""
+        k = self._n if k is None else max(0, min(k, self._n))
+        if k > len(self._top):
+            if self._n <= FULL_SORT_BELOW or k == self._n:
+                self._top = sorted(self.belief.items(), key=lambda x: -x[1])
+            elif self._values() is not None:
+                ids = self._id_list()
+                vals = self._values()
+                self._top = [(ids[i], float(vals[i])) for i in self._select(k)]
+            else:
+                self._top = heapq.nlargest(k, self.belief.items(), key=itemgetter(1))
+        return self._top[:k]
+
+    def at(self, r: int) -> Ranked:
+        """Enfermedad en la posición r del orden (0 = la más probable, -1 = la menos)."""
+        if r < 0:
+            r += self._n
+        if not 0 <= r < self._n:
+            raise IndexError(r)
+        if r < len(self._top):
+            return self._top[r]
+        vals = self._values()
+        if vals is None or self._n <= FULL_SORT_BELOW:
+            return self.top()[r]
+        # valor en la posición r y, entre los empatados, el que le toca por orden
+        v = -np.partition(-vals, r)[r]
+        above = int(np.count_nonzero(vals > v))
+        i = int(np.flatnonzero(vals == v)[r - above])
+        return self._id_list()[i], float(vals[i])
+
+    def median(self) -> Ranked:
+        return self.at(self._n // 2)
+
+    def rank(self, disease_id: str) -> int:
+        """Posición de la enfermedad en el orden (0 = la más probable)."""
+        p = self.belief[disease_id]
+        for r, (id_, _) in enumerate(self._top):
+            if id_ == disease_id:
+                return r
+        vals = self._values()
+        if vals is None:
+            return next(r for r, (id_, _) in enumerate(self.top()) if id_ == disease_id)
+        i = self._id_list().index(disease_id)
+        return int(np.count_nonzero(vals > p)) + int(np.count_nonzero(vals[:i] == p))
+
+    # -----------------------------
+    # internos
+    # -----------------------------
+    def _id_list(self) -> List[str]:
+        if self._ids is None:
+            self._ids = list(self.belief)
+        return self._ids
+
+    def _values(self):
+        if self._vector is None and np is not None:
+            self._vector = np.fromiter(self.belief.values(), dtype=np.float64, count=self._n)
+        return self._vector
+
+    def _select(self, k: int):
+        """Índices de las k mayores, en el orden del ranking."""
+        vals = self._values()
+        v = -np.partition(-vals, k - 1)[k - 1]
+        above = np.flatnonzero(vals > v)
+        ties = np.flatnonzero(vals == v)[:k - len(above)]
+        idx = np.sort(np.concatenate([above, ties]))
+        return idx[np.argsort(-vals[idx], kind='stable')].tolist()
@@ -0,0 +1,97 @@
+"""recommender.py
+Recomendación de síntomas por ganancia de información esperada: se pregunta
+primero el síntoma cuya respuesta más reduce, en promedio, la entropía de la
+creencia sobre las enfermedades.
+"""
+from typing import Dict, Iterable, List
+import numpy as np
+from .likelihood_matrix import LikelihoodMatrix
+
+
+def _xlogx(x: np.ndarray) -> np.ndarray:
+    # x*log(x) con 0*log(0) = 0
+    out = np.zeros_like(x)
+    mask = x > 0
+    out[mask] = x[mask] * np.log(x[mask])
+    return out
+
+
+def entropy(belief: np.ndarray) -> float:
+    """H(P) = -Σ p log p (en nats)."""
+    return float(-_xlogx(belief).sum())
+
+
+def expected_information_gain(belief: np.ndarray, likelihoods: np.ndarray) -> np.ndarray:
+    """Ganancia esperada H(P) - E[H(P | respuesta)] para cada columna de likelihoods.
+
+    belief: vector P(H) de tamaño D. likelihoods: matriz D×k con P(s_j | H).
+    Para la respuesta 'sí' se usa P(s|H) y para 'no' 1 - P(s|H); P(sí), P(no)
+    salen por probabilidad total y las posteriors por Bayes, todo a la vez
+    para las k columnas.
+    """
+    h_prior = entropy(belief)
+    gains = np.full(likelihoods.shape[1], h_prior)
+    for like in (likelihoods, 1.0 - likelihoods):
+        joint = belief[:, None] * like            # P(H, respuesta)
+        p_ans = joint.sum(axis=0)                 # P(respuesta)
+        # p_ans * H(P | respuesta) = p_ans log p_ans - Σ joint log joint
+        gains -= _xlogx(p_ans) - _xlogx(joint).sum(axis=0)
+    return gains
+
+
+class InformationGainRecommender:
+    """Puntúa todos los síntomas aún disponibles del paciente por ganancia de
+    información esperada.
+
+    Las enfermedades con probabilidad > 0 y los síntomas aún preguntables se
+    llevan como máscaras sobre matrix.matrix: cada respuesta apaga una columna
+    y cada descarte una fila, sin copiar nada. La submatriz se indexa recién al
+    puntuar y las puntuaciones se guardan hasta que cambia la creencia.
+    """
+    def __init__(self, matrix: LikelihoodMatrix, symptom_bank: Iterable[str]):
+        self.matrix = matrix
+        self._col_mask = np.zeros(len(matrix.symptoms), dtype=bool)
+        self._col_mask[[matrix.symptom_index[s] for s in symptom_bank if s in matrix.symptom_index]] = True
+        self._row_mask = np.ones(len(matrix.ids), dtype=bool)
+        self._cols = np.flatnonzero(self._col_mask)
+        self._scores = None
+
+    def invalidate(self):
+        """La creencia cambió: las puntuaciones guardadas ya no valen."""
+        self._scores = None
+
+    def remove_symptom(self, symptom: str):
+        j = self.matrix.symptom_index.get(symptom)
+        if j is not None:
+            self._col_mask[j] = False
+        self._scores = None
+
+    def remove_disease(self, disease_id: str):
+        i = self.matrix.disease_index.get(disease_id)
+        if i is not None:
+            self._row_mask[i] = False
+        self._scores = None
+
+    def scores(self, belief: np.ndarray) -> Dict[str, float]:
+        """Ganancia de información esperada de cada síntoma disponible."""
+        if self._scores is None:
+            self._cols = np.flatnonzero(self._col_mask)
+            rows = np.flatnonzero(self._row_mask)
+            b = belief[rows]
+            total = b.sum()
+            if total > 0 and len(self._cols):
+                sub = self.matrix.matrix[np.ix_(rows, self._cols)]
+                self._scores = expected_information_gain(b / total, sub)
+            else:
+                self._scores = np.zeros(len(self._cols))
+        symptoms = self.matrix.symptoms
+        return {symptoms[j]: float(g) for j, g in zip(self._cols.tolist(), self._scores.tolist())}
+
+    def top(self, belief: np.ndarray, n: int = 3) -> List[str]:
+        """Los n síntomas con mayor ganancia (empates en orden alfabético)."""
+        self.scores(belief)
+        if not len(self._cols):
+            return []
+        order = np.argsort(-self._scores, kind='stable')[:n]
+        symptoms = self.matrix.symptoms
+        return [symptoms[j] for j in self._cols[order].tolist()]
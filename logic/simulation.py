@@ -0,0 +1,227 @@
+"""simulation.py
+Simulador Monte Carlo sin interfaz: juega muchos casos sintéticos con GameEngine
+y una política de preguntas, repartidos en un pool de procesos, y reporta
+precisión, preguntas promedio, matriz de confusión y casos por segundo.
+
+Uso:
+    python -m logic.simulation --cases 100000 --workers 8 --policy suggest
+"""
+import argparse
+import json
+import os
+import random
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Optional, Tuple, Union
+
+from .dataset import Dataset
+from .game_engine import GameEngine, Patient
+from .posterior_cache import PosteriorCache
+
+DEFAULT_DATA = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'diseases.json')
+
+# -----------------------------
+# Políticas de preguntas: engine -> síntoma a preguntar (None = no preguntar más)
+# -----------------------------
+def suggest_policy(engine: GameEngine) -> Optional[str]:
+    """Pregunta la primera sugerencia de engine.suggest_symptoms."""
+    options = engine.suggest_symptoms(1)
+    return options[0] if options else None
+
+def random_policy(engine: GameEngine) -> Optional[str]:
+    """Pregunta un síntoma al azar del banco del paciente."""
+    bank = engine.patient.symptom_bank
+    return engine.rng.choice(bank) if bank else None
+
+POLICIES: Dict[str, Callable[[GameEngine], Optional[str]]] = {
+    'suggest': suggest_policy,
+    'random': random_policy,
+}
+
+Policy = Union[str, Callable[[GameEngine], Optional[str]]]
+
+
+def play_case(engine: GameEngine, policy: Callable[[GameEngine], Optional[str]],
+              max_questions: int = 10, threshold: float = 0.9,
+              patient: Optional[Patient] = None) -> Tuple[str, str, int]:
+    """Juega un caso: pregunta hasta que la enfermedad más probable supera
+    `threshold` o se llega a `max_questions`, y diagnostica la más probable.
+    Devuelve (enfermedad real, diagnóstico, preguntas hechas)."""
+    engine.reset_case(patient)
+    questions = 0
+    while questions < max_questions and engine.ranking.at(0)[1] < threshold:
+        symptom = policy(engine)
+        if symptom is None:
+            break
+        engine.ask_symptom(symptom)
+        questions += 1
+    guess = engine.ranking.at(0)[0]
+    return engine.patient.true_disease.id, guess, questions
+
+
+def _patients(dataset: Dataset, n_cases: int, seed: str, rng: random.Random, batch_size: int,
+              profile_priors: bool = True):
+    """Pacientes generados por lotes vectorizados (patient_batch)."""
+    import numpy as np
+    from .patient_batch import PatientGenerator
+    generator = PatientGenerator(dataset)
+    np_rng = np.random.default_rng(list(seed.encode()))
+    done = 0
+    while done < n_cases:
+        batch = generator.generate(min(batch_size, n_cases - done), np_rng,
+                                   profile_priors=profile_priors)
+        for i in range(len(batch)):
+            yield batch.patient(i, rng)
+        done += len(batch)
+
+
+def _run_shard(args) -> Tuple[int, int, Counter]:
+    """Trabajo de un proceso: n casos con su propio generador aleatorio."""
+    data_path, n_cases, seed, policy, engine_kwargs, max_questions, threshold, batch_size = args
+    dataset = Dataset(data_path)
+    rng = random.Random(seed)
+    if engine_kwargs.get('posterior_cache'):
+        # un caché por proceso (el tamaño viaja en engine_kwargs)
+        engine_kwargs = dict(engine_kwargs, posterior_cache=PosteriorCache(engine_kwargs['posterior_cache']))
+    engine = GameEngine(dataset, rng=rng, **engine_kwargs)
+    policy_fn = POLICIES[policy] if isinstance(policy, str) else policy
+    if batch_size:
+        patients = _patients(dataset, n_cases, seed, rng, batch_size,
+                             engine_kwargs.get('profile_priors', True))
+    else:
+        patients = (None for _ in range(n_cases))
+    total_questions = 0
+    correct = 0
+    confusion: Counter = Counter()
+    for patient in patients:
+        true_id, guess, questions = play_case(engine, policy_fn, max_questions, threshold, patient)
+        total_questions += questions
+        correct += true_id == guess
+        confusion[(true_id, guess)] += 1
+    return correct, total_questions, confusion
+
+
+class SimulationResult:
+    def __init__(self, cases: int, correct: int, total_questions: int,
+                 confusion: Counter, elapsed: float):
+        self.cases = cases
+        self.correct = correct
+        self.total_questions = total_questions
+        self.elapsed = elapsed
+        # confusion[real][diagnóstico] = casos
+        self.confusion: Dict[str, Dict[str, int]] = {}
+        for (true_id, guess), count in sorted(confusion.items()):
+            self.confusion.setdefault(true_id, {})[guess] = count
+
+    @property
+    def accuracy(self) -> float:
+        return self.correct / self.cases if self.cases else 0.0
+
+    @property
+    def avg_questions(self) -> float:
+        return self.total_questions / self.cases if self.cases else 0.0
+
+    @property
+    def cases_per_second(self) -> float:
+        return self.cases / self.elapsed if self.elapsed > 0 else 0.0
+
+    def to_dict(self) -> Dict:
+        return {
+            'cases': self.cases,
+            'accuracy': self.accuracy,
+            'avg_questions': self.avg_questions,
+            'cases_per_second': self.cases_per_second,
+            'elapsed': self.elapsed,
+            'confusion': self.confusion,
+        }
+
+    def report(self) -> str:
+        lines = [
+            f"Casos: {self.cases}",
+            f"Precisión: {self.accuracy:.4f}",
+            f"Preguntas promedio: {self.avg_questions:.3f}",
+            f"Casos/segundo: {self.cases_per_second:.1f}",
+            "",
+            "Matriz de confusión (filas = real, columnas = diagnóstico):",
+        ]
+        ids = sorted(set(self.confusion) | {g for row in self.confusion.values() for g in row})
+        lines.append("      " + "".join(f"{i:>8}" for i in ids))
+        for true_id in ids:
+            row = self.confusion.get(true_id, {})
+            lines.append(f"{true_id:>6}" + "".join(f"{row.get(g, 0):>8}" for g in ids))
+        return "\n".join(lines)
+
+
+def simulate(n_cases: int, data_path: str = DEFAULT_DATA, policy: Policy = 'suggest',
+             workers: Optional[int] = None, seed: int = 0, shards: int = 64,
+             max_questions: int = 10, threshold: float = 0.9, batch_size: int = 0,
+             **engine_kwargs) -> SimulationResult:
+    """Corre n_cases casos repartidos en `shards` trozos sobre un pool de `workers`
+    procesos. Cada trozo usa su propio random.Random sembrado con (seed, trozo),
+    así los resultados son reproducibles e independientes del número de procesos
+    (dependen sólo de seed y shards).
+    Una política pasada como función debe poder serializarse (nivel de módulo).
+    Con batch_size > 0 los pacientes se generan en lotes vectorizados
+    (patient_batch.PatientGenerator, requiere NumPy).
+    engine_kwargs se pasan a GameEngine (backend, recommender, profile_priors, prune,
+    question_tree); posterior_cache es el tamaño del caché de cada proceso."""
+    workers = workers or os.cpu_count() or 1
+    shards = max(1, min(shards, n_cases))
+    base, extra = divmod(n_cases, shards)
+    jobs = [(data_path, base + (1 if i < extra else 0), f"{seed}:{i}", policy,
+             engine_kwargs, max_questions, threshold, batch_size) for i in range(shards)]
+    start = time.perf_counter()
+    correct, total_questions, confusion = 0, 0, Counter()
+    if workers == 1:
+        results = map(_run_shard, jobs)
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers)
+        results = pool.map(_run_shard, jobs)
+    try:
+        for c, q, conf in results:
+            correct += c
+            total_questions += q
+            confusion.update(conf)
+    finally:
+        if workers != 1:
+            pool.shutdown()
+    elapsed = time.perf_counter() - start
+    return SimulationResult(n_cases, correct, total_questions, confusion, elapsed)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulación Monte Carlo de casos de Health Fair")
+    parser.add_argument('--cases', type=int, default=10000)
+    parser.add_argument('--data', default=DEFAULT_DATA)
+    parser.add_argument('--policy', choices=sorted(POLICIES), default='suggest')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-questions', type=int, default=10)
+    parser.add_argument('--threshold', type=float, default=0.9)
+    parser.add_argument('--backend', default='dict')
+    parser.add_argument('--recommender', default='heuristic')
+    parser.add_argument('--no-profile-priors', action='store_true',
+                        help="empezar cada caso desde las priors del catálogo, sin el perfil")
+    parser.add_argument('--prune', type=float, default=None,
+                        help="podar enfermedades con posterior menor a esta fracción (backend dict)")
+    parser.add_argument('--question-tree', action='store_true',
+                        help="seguir el árbol compilado con python -m logic.question_tree")
+    parser.add_argument('--posterior-cache', type=int, default=None, metavar='SIZE',
+                        help="caché LRU de posteriors de este tamaño por proceso")
+    parser.add_argument('--batch-size', type=int, default=0,
+                        help="generar pacientes en lotes vectorizados de este tamaño")
+    parser.add_argument('--json', action='store_true', help="imprimir el resultado como JSON")
+    args = parser.parse_args(argv)
+    result = simulate(args.cases, args.data, args.policy, workers=args.workers, seed=args.seed,
+                      max_questions=args.max_questions, threshold=args.threshold,
+                      batch_size=args.batch_size,
+                      backend=args.backend, recommender=args.recommender,
+                      profile_priors=not args.no_profile_priors, prune=args.prune,
+                      question_tree=args.question_tree or None,
+                      posterior_cache=args.posterior_cache)
+    print(json.dumps(result.to_dict(), ensure_ascii=False) if args.json else result.report())
+
+
+if __name__ == '__main__':
+    main()
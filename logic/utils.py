@@ -1,6 +1,68 @@
-import os, platform
-def clear_console():
-    if platform.system() == 'Windows':
-        os.system('cls')
-    else:
-        os.system('clear')
+import hashlib, os, sys, time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+def source_hash(path) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+def source_stamp(path) -> Dict[str, Any]:
+    """Identifica el archivo del que se compiló un artefacto (caché, árbol de preguntas)."""
+    stat = os.stat(path)
+    return {'source_sha256': source_hash(path), 'source_size': stat.st_size,
+            'source_mtime_ns': stat.st_mtime_ns}
+
+def source_matches(path, meta: Dict[str, Any]) -> bool:
+    """¿El artefacto con estos metadatos corresponde al archivo actual?"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return False
+    # mismo tamaño y fecha: se confía en el artefacto; si no, se compara el hash
+    if meta.get('source_size') == stat.st_size and meta.get('source_mtime_ns') == stat.st_mtime_ns:
+        return True
+    return meta.get('source_sha256') == source_hash(path)
+
+class StartupTimer:
+    """Mide las fases del arranque y las reporta en stderr (sólo si está habilitado)."""
+    def __init__(self, enabled: bool = True, start: Optional[float] = None):
+        self.enabled = enabled
+        self.start = start if start is not None else time.perf_counter()
+        self._last = self.start
+        self._reported = False
+        self.phases: List[Tuple[str, float]] = []
+
+    def mark(self, label: str):
+        """Cierra una fase secuencial: el tiempo desde la marca anterior."""
+        now = time.perf_counter()
+        self._record(label, now - self._last)
+        self._last = now
+
+    @contextmanager
+    def measure(self, label: str):
+        """Mide sólo lo que dura el bloque (p.ej. una carga diferida)."""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._record(label, time.perf_counter() - t0)
+
+    def _record(self, label: str, seconds: float):
+        if not self.enabled:
+            return
+        self.phases.append((label, seconds))
+        # lo que ocurre después del reporte (cargas diferidas) se informa al momento
+        if self._reported:
+            print(f"[arranque] {label}: {seconds * 1e3:.1f} ms", file=sys.stderr)
+
+    def report(self, stream=None):
+        if not self.enabled:
+            return
+        stream = stream or sys.stderr
+        for label, seconds in self.phases:
+            print(f"[arranque] {label}: {seconds * 1e3:.1f} ms", file=stream)
+        print(f"[arranque] total: {(self._last - self.start) * 1e3:.1f} ms", file=stream)
+        self._reported = True
@@ -1,9 +1,21 @@
-import pygame, sys
+"""main.py - interfaz pygame de Health Fair.
+
+Importar este módulo no abre ventana ni carga datos: la ventana se abre en
+run() / init_display() y el dataset se carga la primera vez que se usa.
+El punto de entrada es app.py (``python main.py`` también funciona).
+"""
+import os
+import random
+import sys
+import time
+from functools import lru_cache
+import pygame
 from button import Button
-from typing import List
-from logic.dataset import Dataset
-from logic.game_engine import GameEngine
-import os, json
+from logic.metrics import METRICS
+from logic.utils import StartupTimer
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_PATH = os.path.join(BASE_DIR, 'data', 'diseases.json')
 
 
 class DropdownButton:
@@ -18,6 +30,8 @@ class DropdownButton:
         self.height = height
         self.open = False
         self.selected = None
+        # superficies de texto ya renderizadas por (texto, color)
+        self._surfaces = {}
 
         # Rect principal
         self.rect = pygame.Rect(self.x - self.width//2, self.y - self.height//2, self.width, self.height)
@@ -26,7 +40,7 @@ class DropdownButton:
         # Dibujar botón principal
         color = self.hovering_color if self.rect.collidepoint(mouse_pos) else self.base_color
         pygame.draw.rect(screen, (80, 80, 80), self.rect, border_radius=6)
-        text_surface = self.font.render(self.text, True, color)
+        text_surface = self._render(self.text, color)
         screen.blit(text_surface, text_surface.get_rect(center=self.rect.center))
 
         # Si está abierto, mostrar opciones
@@ -37,9 +51,33 @@ class DropdownButton:
                 )
                 hover = opt_rect.collidepoint(mouse_pos)
                 pygame.draw.rect(screen, (60, 60, 60) if not hover else (100, 100, 100), opt_rect, border_radius=6)
-                opt_text = self.font.render(option, True, self.hovering_color if hover else self.base_color)
+                opt_text = self._render(option, self.hovering_color if hover else self.base_color)
                 screen.blit(opt_text, opt_text.get_rect(center=opt_rect.center))
 
+    def bounds(self):
+        """Área que ocupa el botón, incluidas las opciones si está abierto."""
+        if not self.open or not self.options:
+            return self.rect.copy()
+        return self.rect.union(pygame.Rect(self.rect.x, self.rect.bottom,
+                                           self.width, len(self.options) * self.height))
+
+    def hover_state(self, mouse_pos):
+        """(sobre el botón, índice de la opción bajo el mouse o None)."""
+        option = None
+        if self.open:
+            for i in range(len(self.options)):
+                if pygame.Rect(self.rect.x, self.rect.bottom + i * self.height,
+                               self.width, self.height).collidepoint(mouse_pos):
+                    option = i
+                    break
+        return self.rect.collidepoint(mouse_pos), option
+
+    def _render(self, text, color):
+        surface = self._surfaces.get((text, color))
+        if surface is None:
+            surface = self._surfaces[(text, color)] = self.font.render(text, True, color)
+        return surface
+
     def handle_event(self, event, mouse_pos):
         if event.type == pygame.MOUSEBUTTONDOWN:
             # Clic en el botón principal
@@ -63,23 +101,145 @@ class DropdownButton:
 
 
 # ============================
-# Inicialización
+# Inicialización (diferida)
 # ============================
 
-dataset = Dataset(os.path.join(os.path.dirname(__file__), 'data', 'diseases.json'))
-engine = GameEngine(dataset)
-
-pygame.init()
-SCREEN = pygame.display.set_mode((1280, 720))
-pygame.display.set_caption("Menu")
-
-BG = pygame.image.load("assets/Background.jpeg")
-
+SCREEN_SIZE = (1280, 720)
+SCREEN = None
+dataset = None
+engine = None
+# semilla del generador del motor (None = random global); la fija la grabación
+SEED = None
+# medición del arranque (activa con --startup-time)
+STARTUP = StartupTimer(enabled=False)
+
+
+def init_display():
+    """pygame.init() y la ventana; se llama una vez desde main() (o un benchmark)."""
+    global SCREEN
+    if SCREEN is None:
+        pygame.init()
+        SCREEN = pygame.display.set_mode(SCREEN_SIZE)
+        pygame.display.set_caption("Menu")
+        STARTUP.mark('pygame.init + ventana')
+    return SCREEN
+
+
+def get_engine():
+    """Dataset y GameEngine, cargados la primera vez que se piden."""
+    global dataset, engine
+    if engine is None:
+        with STARTUP.measure('dataset + motor'):
+            from logic.dataset import Dataset
+            from logic.game_engine import GameEngine
+            dataset = Dataset(DATA_PATH)
+            engine = GameEngine(dataset, rng=random.Random(SEED) if SEED is not None else None)
+    return engine
+
+
+def asset(name):
+    return os.path.join(BASE_DIR, 'assets', name)
+
+
+@lru_cache(maxsize=None)
+def get_image(name, size=None, alpha=True):
+    """Imagen de assets/ cargada (y convertida al formato de la pantalla) una sola vez."""
+    image = pygame.image.load(asset(name))
+    image = image.convert_alpha() if alpha else image.convert()
+    return pygame.transform.scale(image, size) if size else image
+
+
+# redibujado por eventos: sólo se pinta cuando algo cambia, a lo sumo FPS veces por segundo
+CLOCK = pygame.time.Clock()
+FPS = 30
+FULL_SCREEN = pygame.Rect((0, 0), SCREEN_SIZE)
+# regiones de la pantalla de juego que se actualizan por separado
+PROBS_REGION = pygame.Rect(0, 75, 1280, 410)
+HISTORY_REGION = pygame.Rect(0, 440, 720, 280)
+PROFILE_REGION = pygame.Rect(640, 315, 640, 90)
+DIAGNOSIS_REGION = pygame.Rect(450, 435, 830, 65)
+# eventos que obligan a repintar toda la ventana
+EXPOSE_EVENTS = {pygame.VIDEOEXPOSE, getattr(pygame, 'WINDOWEXPOSED', pygame.VIDEOEXPOSE)}
+# overlay de rendimiento (logic/metrics.py): F3 lo muestra/oculta
+OVERLAY_KEY = pygame.K_F3
+OVERLAY_REGION = pygame.Rect(0, 0, 640, 170)
+OVERLAY_OPS = ['frame_events', 'frame_render', 'ask_symptom', 'suggest_symptoms',
+               'discard_disease', 'reset_case', 'dataset_load']
+OVERLAY = False
+
+
+def toggle_overlay():
+    """Muestra/oculta el overlay; mostrarlo activa la instrumentación."""
+    global OVERLAY
+    OVERLAY = not OVERLAY
+    if OVERLAY:
+        METRICS.enabled = True
+
+
+class LiveInput:
+    """Eventos y posición del mouse en vivo; ui/input_record.py lo reemplaza
+    (INPUT) para grabar o reproducir una sesión."""
+    def get(self, dirty):
+        # si no hay nada pendiente de dibujar, espera (sin consumir CPU) al próximo evento
+        return pygame.event.get() if dirty else [pygame.event.wait()] + pygame.event.get()
+
+    def mouse_pos(self):
+        return pygame.mouse.get_pos()
+
+
+INPUT = LiveInput()
+
+
+def next_events(dirty):
+    """Eventos de este cuadro (de INPUT); F3 muestra/oculta el overlay."""
+    events = INPUT.get(dirty)
+    for event in events:
+        if event.type == pygame.KEYDOWN and event.key == OVERLAY_KEY:
+            toggle_overlay()
+            dirty.append(FULL_SCREEN)
+    return events
+
+
+def draw_overlay():
+    panel = pygame.Surface(OVERLAY_REGION.size, pygame.SRCALPHA)
+    panel.fill((0, 0, 0, 200))
+    font = get_font(10)
+    # texto que cambia en cada cuadro: se renderiza sin pasar por la caché de render_text
+    for i, line in enumerate(["F3: ocultar"] + METRICS.summary_lines(OVERLAY_OPS)):
+        panel.blit(font.render(line, True, "#00FF88"), (8, 6 + i * 16))
+    SCREEN.blit(panel, OVERLAY_REGION)
+
+
+def present(dirty, draw):
+    """Dibuja sólo dentro de las regiones sucias y actualiza sólo esos rectángulos."""
+    if not dirty:
+        return
+    t0 = time.perf_counter()
+    if OVERLAY:
+        dirty.append(OVERLAY_REGION)
+    SCREEN.set_clip(dirty[0].unionall(dirty[1:]))
+    draw()
+    if OVERLAY:
+        draw_overlay()
+    SCREEN.set_clip(None)
+    pygame.display.update(dirty)
+    METRICS.observe('frame_render', time.perf_counter() - t0)
+    dirty.clear()
+    CLOCK.tick(FPS)
+
+
+@lru_cache(maxsize=None)
 def get_font(size):
-    return pygame.font.Font("assets/font.ttf", size)
+    return pygame.font.Font(asset("font.TTF"), size)
+
+@lru_cache(maxsize=2048)
+def render_text(text, size, color):
+    """Texto ya rasterizado, reutilizado entre cuadros mientras no cambie."""
+    return get_font(size).render(text, True, color)
 
 
 def play():
+    get_engine()
     engine.reset_case()
     patient = engine.patient
     rounds = 0
@@ -111,42 +271,53 @@ def play():
         base_color="White",
         hovering_color="Green"
     )
+    # botones fijos: se crean una sola vez por caso
+    family = Button(
+        image=None, 
+        pos=(760, 300), 
+        text_input="Ver Perfil", 
+        font=get_font(20), 
+        base_color="White", 
+        hovering_color="Green"
+    )
+    PLAY_BACK = Button(
+        image=None, 
+        pos=(840, 650), 
+        text_input="Salir de este Caso", 
+        font=get_font(20), 
+        base_color="White", 
+        hovering_color="Green"
+    )
     preguntas = {
         }
     flag=0;
     enfermedad_diagnosticada=" "
     colorDiagnostico="red"
-    while True:
-        PLAY_MOUSE_POS = pygame.mouse.get_pos()
+    dropdowns = [DescartarEnfermedad, Diagnosticar, ASK_SYMPTOMS]
+    buttons = [family, PLAY_BACK]
+
+    def draw(mouse_pos):
         SCREEN.fill("black")
         
-        PLAY_TEXT = get_font(20).render("Has diagnosticado: ", True, "#007FF3")
+        PLAY_TEXT = render_text("Has diagnosticado: ", 20, "#007FF3")
         PLAY_RECT = PLAY_TEXT.get_rect(center=(850, 450))
         SCREEN.blit(PLAY_TEXT, PLAY_RECT)
-        PLAY_TEXT = get_font(15).render(enfermedad_diagnosticada.ljust(50), True, colorDiagnostico)
+        PLAY_TEXT = render_text(enfermedad_diagnosticada.ljust(50), 15, colorDiagnostico)
         PLAY_RECT = PLAY_TEXT.get_rect(center=(1050, 480))
         SCREEN.blit(PLAY_TEXT, PLAY_RECT)
         
-        family = Button(
-            image=None, 
-            pos=(760, 300), 
-            text_input="Ver Perfil", 
-            font=get_font(20), 
-            base_color="White", 
-            hovering_color="Green"
-        )
-        family.changeColor(PLAY_MOUSE_POS)
+        family.changeColor(mouse_pos)
         family.update(SCREEN)
-        NewPatient = get_font(15).render("Nuevo paciente ha llegado. Reporta inicialmente: ", True, "#007FF3")
+        NewPatient = render_text("Nuevo paciente ha llegado. Reporta inicialmente: ", 15, "#007FF3")
         NewPatient_RECT = NewPatient.get_rect(center=(500, 25))
-        NewPatientReport = get_font(15).render(", ".join(patient.true_symptoms), True, "#7B792F")
+        NewPatientReport = render_text(", ".join(patient.true_symptoms), 15, "#7B792F")
         NewPatientReport_RECT = NewPatientReport.get_rect(center=(1000, 25))
         SCREEN.blit(NewPatient, NewPatient_RECT)
         SCREEN.blit(NewPatientReport, NewPatientReport_RECT)
         
         
         # Título
-        PLAY_TEXT = get_font(20).render("Probabilidades actuales:", True, "#007FF3")
+        PLAY_TEXT = render_text("Probabilidades actuales:", 20, "#007FF3")
         PLAY_RECT = PLAY_TEXT.get_rect(center=(290, 50))
         SCREEN.blit(PLAY_TEXT, PLAY_RECT)
         
@@ -157,72 +328,75 @@ def play():
             p = engine.patient.profile
             tra=330;
             for k, v in p.items():
-                text=f" - {k.capitalize()}: {v}"
-                PLAY_TEXT2 = get_font(15).render(f"{k.capitalize()}: ".ljust(30), True, "#9EB4FB")
+                PLAY_TEXT2 = render_text(f"{k.capitalize()}: ".ljust(30), 15, "#9EB4FB")
                 PLAY_RECT2 = PLAY_TEXT2.get_rect(center=(920, tra))
                 SCREEN.blit(PLAY_TEXT2, PLAY_RECT2)
-                PLAY_TEXT2 = get_font(15).render(v, True, "#6D663F")
+                PLAY_TEXT2 = render_text(v, 15, "#6D663F")
                 PLAY_RECT2 = PLAY_TEXT2.get_rect(center=(930, tra))
                 SCREEN.blit(PLAY_TEXT2, PLAY_RECT2)
                 tra+=20
 
         # Mostrar las 10 probabilidades más altas
         y = 100
-        for k, v in sorted(engine.belief.items(), key=lambda x: -x[1])[:10]:
+        for k, v in engine.ranking.top(10):
             d = dataset.get_by_id(k)
             texto = f"({d.id}) {d.name}: ".ljust(50)
-            PLAY_TEXT1 = get_font(15).render(texto, True, "white")
+            PLAY_TEXT1 = render_text(texto, 15, "white")
             PLAY_RECT1 = PLAY_TEXT1.get_rect(center=(420, y))
             probabilidad = f"{v:.3f}".ljust(50)
-            PLAY_TEXT2 = get_font(15).render(probabilidad, True, "#9AAFF2")
+            PLAY_TEXT2 = render_text(probabilidad, 15, "#9AAFF2")
             PLAY_RECT2 = PLAY_TEXT2.get_rect(center=(820, y))
             SCREEN.blit(PLAY_TEXT1, PLAY_RECT1)
             SCREEN.blit(PLAY_TEXT2, PLAY_RECT2)
             y += 40
 
-        ACTIONS_TEXT = get_font(20).render("Acciones disponibles:", True, "#F5F5F6")
+        ACTIONS_TEXT = render_text("Acciones disponibles:", 20, "#F5F5F6")
         ACTIONS_RECT = ACTIONS_TEXT.get_rect(center=(900, 50))
         SCREEN.blit(ACTIONS_TEXT, ACTIONS_RECT)
 
         # Dibujar botón desplegable
-        DescartarEnfermedad.draw(SCREEN, PLAY_MOUSE_POS)
-        Diagnosticar.draw(SCREEN, PLAY_MOUSE_POS)
-        ASK_SYMPTOMS.draw(SCREEN, PLAY_MOUSE_POS)
+        DescartarEnfermedad.draw(SCREEN, mouse_pos)
+        Diagnosticar.draw(SCREEN, mouse_pos)
+        ASK_SYMPTOMS.draw(SCREEN, mouse_pos)
         
         
         
 
         # Botón "BACK"
-        PLAY_BACK = Button(
-            image=None, 
-            pos=(840, 650), 
-            text_input="Salir de este Caso", 
-            font=get_font(20), 
-            base_color="White", 
-            hovering_color="Green"
-        )
-        PLAY_BACK.changeColor(PLAY_MOUSE_POS)
+        PLAY_BACK.changeColor(mouse_pos)
         PLAY_BACK.update(SCREEN)
         
         
 
         y = 450
         for pregunta, respuesta in preguntas.items():
-            ASK_TEXT = get_font(15).render(pregunta, True, "#7E7EBC")
+            ASK_TEXT = render_text(pregunta, 15, "#7E7EBC")
             ASK_TEXT_RECT = ASK_TEXT.get_rect(topleft=(40, y))
-            ASW_TEXT = get_font(15).render(respuesta, True, "#0C692D" if respuesta=="sí" else "#873A3A")
+            ASW_TEXT = render_text(respuesta, 15, "#0C692D" if respuesta=="sí" else "#873A3A")
             ASW_TEXT_RECT = ASW_TEXT.get_rect(topleft=(480, y))
             SCREEN.blit(ASK_TEXT, ASK_TEXT_RECT)
             SCREEN.blit(ASW_TEXT, ASW_TEXT_RECT)
             y += 20
 
-
-        
+    # la primera vez se pinta toda la pantalla
+    dirty = [FULL_SCREEN]
+    PLAY_MOUSE_POS = INPUT.mouse_pos()
+    hover = [d.hover_state(PLAY_MOUSE_POS) for d in dropdowns] + \
+            [b.rect.collidepoint(PLAY_MOUSE_POS) for b in buttons]
+    while True:
         # Eventos
-        for event in pygame.event.get():
+        events = next_events(dirty)
+        t0 = time.perf_counter()
+        for event in events:
+            PLAY_MOUSE_POS = INPUT.mouse_pos()
             if event.type == pygame.QUIT:
                 pygame.quit()
                 sys.exit()
+            if event.type in EXPOSE_EVENTS:
+                dirty.append(FULL_SCREEN)
+
+            # lo que ocupan los desplegables antes del evento (pueden cerrarse)
+            before = [d.bounds() for d in dropdowns]
 
             # Manejar dropdown
             result = ASK_SYMPTOMS.handle_event(event, PLAY_MOUSE_POS)
@@ -236,6 +410,7 @@ def play():
                 preguntas[ask] = f"{respuesta}"
                 ASK_SYMPTOMS.options = engine.suggest_symptoms(3)
                 rounds += 1
+                dirty.extend([PROBS_REGION, HISTORY_REGION])
                 
             result = Diagnosticar.handle_event(event, PLAY_MOUSE_POS)
             if result:
@@ -251,6 +426,7 @@ def play():
                         print("Diagnóstico incorrecto")
                         enfermedad_diagnosticada=result+" (INCORRECTO)"
                         colorDiagnostico="red"
+                    dirty.append(DIAGNOSIS_REGION)
 
             result = DescartarEnfermedad.handle_event(event, PLAY_MOUSE_POS)
             if result:
@@ -262,52 +438,95 @@ def play():
                     print(f"Enfermedad {to_remove} descartada")
                     DescartarEnfermedad.options = [f"({d.id}) {d.name}" for d in dataset.diseases if engine.belief.get(d.id, 0) > 0]
                     #Diagnosticar.options = [f"({d.id}) {d.name}" for d in dataset.diseases if engine.belief.get(d.id, 0) > 0]
+                    dirty.append(PROBS_REGION)
             
             if event.type == pygame.MOUSEBUTTONDOWN:
                 if PLAY_BACK.checkForInput(PLAY_MOUSE_POS):
                     main_menu()
                 if family.checkForInput(PLAY_MOUSE_POS):
                     flag=1 if flag==0 else 0
+                    dirty.append(PROFILE_REGION)
+
+            # desplegables que se abrieron/cerraron o cambiaron de opciones
+            for d, old in zip(dropdowns, before):
+                new = d.bounds()
+                if new != old:
+                    dirty.extend([old, new])
+            # cambios de resaltado bajo el mouse
+            now = [d.hover_state(PLAY_MOUSE_POS) for d in dropdowns] + \
+                  [b.rect.collidepoint(PLAY_MOUSE_POS) for b in buttons]
+            for widget, old_state, new_state in zip(dropdowns + buttons, hover, now):
+                if old_state != new_state:
+                    dirty.append(widget.bounds() if widget in dropdowns else widget.rect)
+            hover = now
+        METRICS.observe('frame_events', time.perf_counter() - t0)
+
+        present(dirty, lambda: draw(PLAY_MOUSE_POS))
+
+
+def main_menu(on_first_frame=None):
+    PLAY_BUTTON = Button(
+        image=get_image("Blue Rect.png", (320, 100)),
+        pos=(640, 250), 
+        text_input="PLAY", font=get_font(75), base_color="#FFFFFF", hovering_color="Blue"
+    )
+    QUIT_BUTTON = Button(
+        image=get_image("Quit Rect.png"),
+        pos=(640, 550), 
+        text_input="QUIT", font=get_font(75), base_color="#2b2951", hovering_color="White"
+    )
+    buttons = [PLAY_BUTTON, QUIT_BUTTON]
 
-        pygame.display.update()
-
-
-def main_menu():
-    while True:
-        SCREEN.blit(BG, (0, 0))
-        MENU_MOUSE_POS = pygame.mouse.get_pos()
+    def draw(mouse_pos):
+        SCREEN.blit(get_image("Background.jpeg", alpha=False), (0, 0))
 
-        MENU_TEXT = get_font(100).render("HEALTH \nFAIR", True, "#0051e9")
+        MENU_TEXT = render_text("HEALTH \nFAIR", 100, "#0051e9")
         MENU_RECT = MENU_TEXT.get_rect(center=(640, 100))
-
-        PLAY_BUTTON = Button(
-            image=pygame.transform.scale(pygame.image.load("assets/Blue Rect.png"), (320, 100)),
-            pos=(640, 250), 
-            text_input="PLAY", font=get_font(75), base_color="#FFFFFF", hovering_color="Blue"
-        )
-        QUIT_BUTTON = Button(
-            image=pygame.image.load("assets/Quit Rect.png"),
-            pos=(640, 550), 
-            text_input="QUIT", font=get_font(75), base_color="#2b2951", hovering_color="White"
-        )
         SCREEN.blit(MENU_TEXT, MENU_RECT)
 
-        for button in [PLAY_BUTTON, QUIT_BUTTON]:
-            button.changeColor(MENU_MOUSE_POS)
+        for button in buttons:
+            button.changeColor(mouse_pos)
             button.update(SCREEN)
-        
-        for event in pygame.event.get():
+
+    dirty = [FULL_SCREEN]
+    MENU_MOUSE_POS = INPUT.mouse_pos()
+    hover = [b.rect.collidepoint(MENU_MOUSE_POS) for b in buttons]
+    while True:
+        for event in next_events(dirty):
+            MENU_MOUSE_POS = INPUT.mouse_pos()
             if event.type == pygame.QUIT:
                 pygame.quit()
                 sys.exit()
+            if event.type in EXPOSE_EVENTS:
+                dirty.append(FULL_SCREEN)
             if event.type == pygame.MOUSEBUTTONDOWN:
                 if PLAY_BUTTON.checkForInput(MENU_MOUSE_POS):
                     play()
                 if QUIT_BUTTON.checkForInput(MENU_MOUSE_POS):
                     pygame.quit()
                     sys.exit()
-
-        pygame.display.update()
-
-
-main_menu()
+            now = [b.rect.collidepoint(MENU_MOUSE_POS) for b in buttons]
+            for button, old_state, new_state in zip(buttons, hover, now):
+                if old_state != new_state:
+                    dirty.append(button.rect)
+            hover = now
+
+        present(dirty, lambda: draw(MENU_MOUSE_POS))
+        if on_first_frame is not None:
+            on_first_frame()
+            on_first_frame = None
+
+
+def run(startup=None):
+    """Abre la ventana y muestra el menú principal."""
+    global STARTUP
+    if startup is not None:
+        STARTUP = startup
+    init_display()
+    # el dataset se carga al empezar el primer caso, no antes del menú
+    main_menu(on_first_frame=lambda: (STARTUP.mark('primer cuadro'), STARTUP.report()))
+
+
+if __name__ == '__main__':
+    from app import main
+    main(sys.argv[1:])
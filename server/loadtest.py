@@ -0,0 +1,154 @@
+"""loadtest.py
+Cliente de carga para server/service.py: N sesiones concurrentes, cada una con
+su conexión keep-alive, que juegan casos completos (crear, sugerir+preguntar,
+diagnosticar) y reporta peticiones/seg y latencias.
+
+Uso:
+    python -m server.loadtest --sessions 200 --cases 5 --spawn
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class Client:
+    """Conexión HTTP/1.1 keep-alive mínima que mide la latencia de cada petición."""
+    def __init__(self, host: str, port: int, latencies: List[float]):
+        self.host = host
+        self.port = port
+        self.latencies = latencies
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+
+    async def connect(self):
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            await self._writer.wait_closed()
+
+    async def request(self, method: str, path: str, body: Optional[Dict[str, Any]] = None) -> Tuple[int, Any]:
+        data = json.dumps(body).encode() if body is not None else b''
+        t0 = time.perf_counter()
+        self._writer.write(f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\n"
+                           f"Content-Length: {len(data)}\r\n\r\n".encode() + data)
+        await self._writer.drain()
+        head = await self._reader.readuntil(b'\r\n\r\n')
+        lines = head.decode('latin-1').split('\r\n')
+        status = int(lines[0].split(' ')[1])
+        length = 0
+        for line in lines[1:]:
+            if line.lower().startswith('content-length:'):
+                length = int(line.split(':', 1)[1])
+        payload = await self._reader.readexactly(length)
+        self.latencies.append(time.perf_counter() - t0)
+        return status, json.loads(payload) if payload else None
+
+
+async def play_session(client: Client, cases: int, max_questions: int, threshold: float,
+                       rng: random.Random) -> Dict[str, int]:
+    stats = {'cases': 0, 'correct': 0, 'errors': 0}
+    status, state = await client.request('POST', '/sessions')
+    if status != 201:
+        stats['errors'] += 1
+        return stats
+    sid = state['session']
+    for case in range(cases):
+        if case:
+            status, state = await client.request('POST', f'/sessions/{sid}/reset')
+        belief = state['belief']
+        for _ in range(max_questions):
+            if max(belief.values()) >= threshold:
+                break
+            status, res = await client.request('GET', f'/sessions/{sid}/suggest?n=3')
+            if status != 200 or not res['symptoms']:
+                break
+            status, res = await client.request('POST', f'/sessions/{sid}/ask',
+                                               {'symptom': rng.choice(res['symptoms'])})
+            if status != 200:
+                stats['errors'] += 1
+                break
+            belief = res['belief']
+        guess = max(belief, key=belief.get)
+        status, res = await client.request('POST', f'/sessions/{sid}/diagnose', {'disease': guess})
+        if status != 200:
+            stats['errors'] += 1
+            continue
+        stats['cases'] += 1
+        stats['correct'] += int(res['correct'])
+    await client.request('DELETE', f'/sessions/{sid}')
+    return stats
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+async def run(host: str, port: int, sessions: int, cases: int, max_questions: int = 10,
+              threshold: float = 0.8, seed: int = 0) -> Dict[str, Any]:
+    latencies: List[float] = []
+    clients = [Client(host, port, latencies) for _ in range(sessions)]
+    await asyncio.gather(*(c.connect() for c in clients))
+    t0 = time.perf_counter()
+    results = await asyncio.gather(*(
+        play_session(c, cases, max_questions, threshold, random.Random(seed + i))
+        for i, c in enumerate(clients)))
+    elapsed = time.perf_counter() - t0
+    await asyncio.gather(*(c.close() for c in clients))
+    latencies.sort()
+    totals = {k: sum(r[k] for r in results) for k in ('cases', 'correct', 'errors')}
+    return {
+        'sessions': sessions,
+        **totals,
+        'requests': len(latencies),
+        'seconds': elapsed,
+        'requests_per_sec': len(latencies) / elapsed if elapsed else 0.0,
+        'p50_ms': _percentile(latencies, 0.50) * 1e3,
+        'p95_ms': _percentile(latencies, 0.95) * 1e3,
+        'p99_ms': _percentile(latencies, 0.99) * 1e3,
+    }
+
+
+async def _spawn_and_run(args) -> Dict[str, Any]:
+    from .service import serve
+    ready = asyncio.Event()
+    server = asyncio.create_task(serve(args.host, args.port, args.data,
+                                       max_sessions=max(args.sessions, 1), ready=ready))
+    await ready.wait()
+    try:
+        return await run(args.host, args.port, args.sessions, args.cases,
+                         args.max_questions, args.threshold, args.seed)
+    finally:
+        server.cancel()
+
+
+def main(argv=None):
+    from .service import DEFAULT_DATA
+    parser = argparse.ArgumentParser(description="Prueba de carga del servidor de Health Fair")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--sessions', type=int, default=100)
+    parser.add_argument('--cases', type=int, default=3, help="casos por sesión")
+    parser.add_argument('--max-questions', type=int, default=10)
+    parser.add_argument('--threshold', type=float, default=0.8)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--spawn', action='store_true', help="levanta el servidor en este proceso")
+    parser.add_argument('--data', default=DEFAULT_DATA)
+    args = parser.parse_args(argv)
+    if args.spawn:
+        report = asyncio.run(_spawn_and_run(args))
+    else:
+        report = asyncio.run(run(args.host, args.port, args.sessions, args.cases,
+                                 args.max_questions, args.threshold, args.seed))
+    for k, v in report.items():
+        print(f"{k:>18}: {v:.2f}" if isinstance(v, float) else f"{k:>18}: {v}")
+
+
+if __name__ == '__main__':
+    main()
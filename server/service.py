@@ -0,0 +1,433 @@
+"""service.py
+Servidor asyncio (HTTP + WebSocket, sólo biblioteca estándar) que aloja muchos
+casos simultáneos de GameEngine. Todas las sesiones comparten un único Dataset
+inmutable; cada sesión sólo guarda su paciente y su creencia.
+
+Uso:
+    python -m server.service --port 8765 --max-sessions 5000 --idle-timeout 600 [--log-dir sesiones/]
+
+HTTP (JSON):
+    POST   /sessions                      crea una sesión (reset_case)
+    POST   /sessions/<id>/reset           reset_case
+    GET    /sessions/<id>/suggest?n=3     suggest_symptoms
+    POST   /sessions/<id>/ask             {"symptom": ...}  -> ask_symptom
+    POST   /sessions/<id>/discard         {"disease": ...}  -> discard_disease
+    POST   /sessions/<id>/diagnose        {"disease": ...}  -> make_diagnosis
+    DELETE /sessions/<id>
+    GET    /stats                         contadores (latencias con --metrics, caché de posteriors)
+WebSocket en /ws: una sesión por conexión; mensajes {"action": "reset" |
+"suggest" | "ask" | "discard" | "diagnose", ...} con los mismos campos.
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import secrets
+import struct
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit, parse_qs
+
+from logic.dataset import Dataset
+from logic.event_log import EventLog, replay
+from logic.game_engine import BACKENDS, RECOMMENDERS, GameEngine
+from logic.metrics import METRICS
+from logic.posterior_cache import PosteriorCache
+
+DEFAULT_DATA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'diseases.json')
+WS_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+MAX_BODY = 1 << 20
+# sugerencias máximas por pedido de /suggest
+MAX_SUGGEST = 100
+
+
+class ServiceError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class Session:
+    __slots__ = ('id', 'engine', 'last_used')
+
+    def __init__(self, id_: str, engine: GameEngine):
+        self.id = id_
+        self.engine = engine
+        self.last_used = time.monotonic()
+
+
+class SessionTable:
+    """Sesiones en orden de uso (LRU), con tope y expiración por inactividad.
+    Con `log_dir` cada sesión escribe <id>.log (logic/event_log.py); al cerrarse
+    se renombra a <id>.log.done y `restore()` retoma las que quedaron abiertas."""
+    def __init__(self, dataset: Dataset, max_sessions: int = 1000, idle_timeout: float = 600.0,
+                 log_dir: Optional[str] = None, **engine_kwargs):
+        self.dataset = dataset
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.log_dir = log_dir
+        self.engine_kwargs = engine_kwargs
+        self._sessions: 'OrderedDict[str, Session]' = OrderedDict()
+        self.created = 0
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def create(self) -> Session:
+        if len(self._sessions) >= self.max_sessions:
+            self.evict_idle()
+        if len(self._sessions) >= self.max_sessions:
+            raise ServiceError(503, "session table full")
+        id_ = secrets.token_hex(8)
+        log = EventLog(self._log_path(id_)) if self.log_dir is not None else None
+        session = Session(id_, GameEngine(self.dataset, log=log, **self.engine_kwargs))
+        self._sessions[session.id] = session
+        self.created += 1
+        return session
+
+    def get(self, id_: str) -> Session:
+        session = self._sessions.get(id_)
+        if session is None:
+            raise ServiceError(404, f"unknown session {id_}")
+        session.last_used = time.monotonic()
+        self._sessions.move_to_end(id_)
+        return session
+
+    def remove(self, id_: str):
+        session = self._sessions.pop(id_, None)
+        if session is None:
+            raise ServiceError(404, f"unknown session {id_}")
+        self._close(session)
+
+    def _log_path(self, id_: str) -> str:
+        return os.path.join(self.log_dir, f'{id_}.log')
+
+    def _close(self, session: Session):
+        log = session.engine.log
+        if log is not None:
+            log.close()
+            os.replace(log.path, log.path + '.done')
+
+    def restore(self) -> int:
+        """Retoma las sesiones con log abierto en log_dir (snapshot + cola de eventos)."""
+        if self.log_dir is None:
+            return 0
+        os.makedirs(self.log_dir, exist_ok=True)
+        paths = sorted((os.path.join(self.log_dir, f) for f in os.listdir(self.log_dir)
+                        if f.endswith('.log')), key=os.path.getmtime)
+        n = 0
+        for path in paths[-self.max_sessions:]:
+            id_ = os.path.basename(path)[:-len('.log')]
+            log = EventLog(path)
+            engine = replay(path, self.dataset, log=log, **self.engine_kwargs)
+            if engine is None:
+                log.close()
+                continue
+            self._sessions[id_] = Session(id_, engine)
+            n += 1
+        return n
+
+    def evict_idle(self) -> int:
+        """Elimina las sesiones inactivas por más de idle_timeout (las más viejas están al principio)."""
+        limit = time.monotonic() - self.idle_timeout
+        n = 0
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if oldest.last_used > limit:
+                break
+            self._close(self._sessions.popitem(last=False)[1])
+            n += 1
+        self.evicted += n
+        return n
+
+
+# -----------------------------
+# Acciones (comunes a HTTP y WebSocket)
+# -----------------------------
+def _case_state(session: Session) -> Dict[str, Any]:
+    patient = session.engine.patient
+    return {'session': session.id, 'initial_symptoms': list(patient.true_symptoms),
+            'belief': session.engine.belief}
+
+
+def _json_object(data: bytes, what: str) -> Dict[str, Any]:
+    """Objeto JSON de un cuerpo o mensaje (vacío = {})."""
+    if not data:
+        return {}
+    try:
+        value = json.loads(data)
+    except ValueError:
+        raise ServiceError(400, f"{what} is not valid JSON") from None
+    if not isinstance(value, dict):
+        raise ServiceError(400, f"{what} must be a JSON object")
+    return value
+
+
+def _require(payload: Dict[str, Any], key: str) -> str:
+    value = payload.get(key)
+    if not isinstance(value, str):
+        raise ServiceError(400, f"missing '{key}'")
+    return value
+
+
+def _count(payload: Dict[str, Any], key: str, default: int) -> int:
+    """Entero entre 1 y MAX_SUGGEST (número JSON o texto de la query string)."""
+    value = payload.get(key, default)
+    if isinstance(value, str) and value.strip().isdigit():
+        value = int(value)
+    if not isinstance(value, int) or isinstance(value, bool) or not 1 <= value <= MAX_SUGGEST:
+        raise ServiceError(400, f"'{key}' must be an integer between 1 and {MAX_SUGGEST}")
+    return value
+
+
+def perform(session: Session, action: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    engine = session.engine
+    if action == 'reset':
+        engine.reset_case()
+        return _case_state(session)
+    if action == 'suggest':
+        return {'symptoms': engine.suggest_symptoms(_count(payload, 'n', 3))}
+    if action == 'ask':
+        symptom = _require(payload, 'symptom')
+        if not engine.patient.can_ask(symptom):
+            raise ServiceError(409, f"symptom {symptom!r} cannot be asked")
+        res = engine.ask_symptom(symptom)
+        return {'question': res['question'], 'answer': res['answer'],
+                'reported_bool': res['reported_bool'], 'belief': dict(res['belief'])}
+    if action == 'discard':
+        engine.discard_disease(_require(payload, 'disease'))
+        return {'belief': engine.belief}
+    if action == 'diagnose':
+        correct = engine.make_diagnosis(_require(payload, 'disease'))
+        return {'correct': correct, 'true_disease': engine.patient.true_disease.id}
+    raise ServiceError(400, f"unknown action {action!r}")
+
+
+# -----------------------------
+# HTTP
+# -----------------------------
+_REASONS = {200: 'OK', 201: 'Created', 400: 'Bad Request', 404: 'Not Found',
+            405: 'Method Not Allowed', 409: 'Conflict', 413: 'Payload Too Large',
+            500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+
+class Service:
+    def __init__(self, table: SessionTable):
+        self.table = table
+        self.requests = 0
+
+    def route(self, method: str, target: str, body: bytes) -> Tuple[int, Any]:
+        try:
+            url = urlsplit(target)
+        except ValueError:
+            raise ServiceError(400, "malformed request target") from None
+        parts = [p for p in url.path.split('/') if p]
+        payload = _json_object(body, "body")
+        payload.update({k: v[-1] for k, v in parse_qs(url.query).items()})
+        if parts == ['stats'] and method == 'GET':
+            stats = {'sessions': len(self.table), 'created': self.table.created,
+                     'evicted': self.table.evicted, 'requests': self.requests}
+            cache = self.table.engine_kwargs.get('posterior_cache')
+            if cache is not None:
+                stats['posterior_cache'] = cache.stats()
+            if METRICS.enabled:
+                stats['metrics'] = METRICS.snapshot()
+            return 200, stats
+        if parts == ['sessions'] and method == 'POST':
+            session = self.table.create()
+            return 201, _case_state(session)
+        if len(parts) == 2 and parts[0] == 'sessions' and method == 'DELETE':
+            self.table.remove(parts[1])
+            return 200, {'deleted': parts[1]}
+        if len(parts) == 3 and parts[0] == 'sessions':
+            expected = 'GET' if parts[2] == 'suggest' else 'POST'
+            if method != expected:
+                raise ServiceError(405, f"use {expected} for {parts[2]}")
+            return 200, perform(self.table.get(parts[1]), parts[2], payload)
+        raise ServiceError(404, f"no route for {method} {url.path}")
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    return
+                version, headers = 'HTTP/1.0', {}
+                # ¿se leyó la petición completa? si no, no se sabe dónde empieza la siguiente
+                framed = False
+                try:
+                    lines = head.decode('latin-1').split('\r\n')
+                    try:
+                        method, target, version = lines[0].split(' ', 2)
+                    except ValueError:
+                        raise ServiceError(400, "malformed request line") from None
+                    for line in lines[1:]:
+                        if ':' in line:
+                            k, v = line.split(':', 1)
+                            headers[k.strip().lower()] = v.strip()
+                    if headers.get('upgrade', '').lower() == 'websocket':
+                        await self.websocket(reader, writer, headers)
+                        return
+                    try:
+                        length = int(headers.get('content-length', 0))
+                    except ValueError:
+                        raise ServiceError(400, "invalid Content-Length") from None
+                    self.requests += 1
+                    if length > MAX_BODY:
+                        raise ServiceError(413, "body too large")
+                    body = await reader.readexactly(length) if length else b''
+                    framed = True
+                    status, result = self.route(method, target, body)
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    return
+                except ServiceError as e:
+                    status, result = e.status, {'error': str(e)}
+                except Exception as e:
+                    status, result = 500, {'error': f"{type(e).__name__}: {e}"}
+                data = json.dumps(result, ensure_ascii=False).encode('utf-8')
+                keep_alive = (framed and headers.get('connection', '').lower() != 'close'
+                              and version == 'HTTP/1.1')
+                writer.write(
+                    f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+                    f"Content-Type: application/json; charset=utf-8\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1')
+                    + data)
+                await writer.drain()
+                if not keep_alive:
+                    return
+        finally:
+            writer.close()
+
+    # -----------------------------
+    # WebSocket (RFC 6455, sólo mensajes de texto sin fragmentar)
+    # -----------------------------
+    async def websocket(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                        headers: Dict[str, str]):
+        accept = base64.b64encode(hashlib.sha1(
+            (headers.get('sec-websocket-key', '') + WS_GUID).encode()).digest()).decode()
+        writer.write(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\n"
+                      f"Connection: Upgrade\r\nSec-WebSocket-Accept: {accept}\r\n\r\n").encode())
+        session: Optional[Session] = None
+        try:
+            session = self.table.create()
+            await self._ws_send(writer, 1, json.dumps(_case_state(session)).encode())
+            while True:
+                opcode, payload = await self._ws_recv(reader)
+                if opcode == 8:
+                    await self._ws_send(writer, 8, payload[:2])
+                    return
+                if opcode == 9:
+                    await self._ws_send(writer, 10, payload)
+                    continue
+                if opcode != 1:
+                    continue
+                self.requests += 1
+                try:
+                    message = _json_object(payload, "message")
+                    session = self.table.get(session.id)
+                    result = perform(session, str(message.get('action')), message)
+                except ServiceError as e:
+                    result = {'error': str(e), 'status': e.status}
+                except Exception as e:
+                    result = {'error': f"{type(e).__name__}: {e}", 'status': 500}
+                await self._ws_send(writer, 1, json.dumps(result, ensure_ascii=False).encode('utf-8'))
+        except ServiceError as e:
+            await self._ws_send(writer, 1, json.dumps({'error': str(e), 'status': e.status}).encode())
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            if session is not None:
+                try:
+                    self.table.remove(session.id)
+                except ServiceError:
+                    pass
+
+    @staticmethod
+    async def _ws_recv(reader: asyncio.StreamReader) -> Tuple[int, bytes]:
+        b1, b2 = await reader.readexactly(2)
+        length = b2 & 0x7F
+        if length == 126:
+            length = struct.unpack('!H', await reader.readexactly(2))[0]
+        elif length == 127:
+            length = struct.unpack('!Q', await reader.readexactly(8))[0]
+        if length > MAX_BODY:
+            raise ConnectionError("frame too large")
+        mask = await reader.readexactly(4) if b2 & 0x80 else None
+        data = await reader.readexactly(length)
+        if mask:
+            data = bytes(b ^ mask[i % 4] for i, b in enumerate(data))
+        return b1 & 0x0F, data
+
+    @staticmethod
+    async def _ws_send(writer: asyncio.StreamWriter, opcode: int, data: bytes):
+        n = len(data)
+        if n < 126:
+            header = struct.pack('!BB', 0x80 | opcode, n)
+        elif n < 1 << 16:
+            header = struct.pack('!BBH', 0x80 | opcode, 126, n)
+        else:
+            header = struct.pack('!BBQ', 0x80 | opcode, 127, n)
+        writer.write(header + data)
+        await writer.drain()
+
+
+async def _sweeper(table: SessionTable):
+    while True:
+        await asyncio.sleep(max(1.0, table.idle_timeout / 2))
+        table.evict_idle()
+
+
+async def serve(host: str = '127.0.0.1', port: int = 8765, data_path: str = DEFAULT_DATA,
+                max_sessions: int = 1000, idle_timeout: float = 600.0, log_dir: Optional[str] = None,
+                ready: Optional[asyncio.Event] = None, **engine_kwargs):
+    table = SessionTable(Dataset(data_path), max_sessions, idle_timeout, log_dir, **engine_kwargs)
+    restored = table.restore()
+    if restored:
+        print(f"{restored} sesiones retomadas de {log_dir}")
+    service = Service(table)
+    server = await asyncio.start_server(service.handle, host, port)
+    sweeper = asyncio.create_task(_sweeper(table))
+    if ready is not None:
+        ready.set()
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        sweeper.cancel()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servidor multi-sesión de Health Fair")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--data', default=DEFAULT_DATA)
+    parser.add_argument('--max-sessions', type=int, default=1000)
+    parser.add_argument('--idle-timeout', type=float, default=600.0, help="segundos")
+    parser.add_argument('--backend', choices=BACKENDS, default='dict')
+    parser.add_argument('--recommender', choices=RECOMMENDERS, default='heuristic')
+    parser.add_argument('--log-dir', default=None, help="registro de eventos por sesión (se retoma al reiniciar)")
+    parser.add_argument('--metrics', action='store_true', help="latencias por operación en GET /stats")
+    parser.add_argument('--posterior-cache', type=int, default=0, metavar='SIZE',
+                        help="posteriors compartidas entre sesiones (LRU de este tamaño; 0 = sin caché)")
+    args = parser.parse_args(argv)
+    if args.posterior_cache < 0:
+        parser.error("--posterior-cache must be 0 or a positive size")
+    if args.posterior_cache and args.backend not in ('dict', 'matrix'):
+        parser.error(f"--posterior-cache requires --backend dict or matrix, got {args.backend!r}")
+    METRICS.enabled = args.metrics
+    cache = PosteriorCache(args.posterior_cache) if args.posterior_cache else None
+    try:
+        asyncio.run(serve(args.host, args.port, args.data, args.max_sessions, args.idle_timeout, args.log_dir,
+                          backend=args.backend, recommender=args.recommender, posterior_cache=cache))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
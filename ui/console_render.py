@@ -0,0 +1,117 @@
+"""console_render.py
+Cuadros de la interfaz de consola compuestos en un buffer y escritos con una
+sola llamada a write, sin lanzar `clear` en un proceso aparte.
+
+En una terminal el primer cuadro limpia la pantalla con secuencias ANSI y los
+siguientes reescriben sólo las líneas que cambiaron (posicionar el cursor +
+borrar hasta el fin de línea); lo que quedó debajo del cuadro (el prompt y la
+respuesta de input) se borra en el mismo write. Si el cuadro no entra en la
+terminal (más filas, o líneas más anchas que se partirían) se repinta completo.
+Si la salida no es una terminal (tubería, archivo) no se escribe ningún código
+de control: cada cuadro sale completo, una vez, como texto.
+"""
+import re
+import shutil
+import sys
+from typing import Iterable, List, Optional, TextIO
+
+from logic.metrics import METRICS
+
+CSI = '\x1b['
+HOME_CLEAR = CSI + 'H' + CSI + '2J'
+ERASE_LINE = CSI + 'K'
+ERASE_BELOW = CSI + 'J'
+
+_ANSI = re.compile(r'\x1b\[[0-9;]*[A-Za-z]')
+
+
+def visible_len(text: str) -> int:
+    """Largo en pantalla (sin códigos de color)."""
+    return len(_ANSI.sub('', text))
+
+
+def _goto(row: int) -> str:
+    return f'{CSI}{row};1H'
+
+
+class ConsoleRenderer:
+    def __init__(self, stream: Optional[TextIO] = None, tty: Optional[bool] = None):
+        """`stream` por defecto es sys.stdout al momento de escribir (colorama lo
+        envuelve en init); `tty=None` lo detecta con isatty()."""
+        self._stream = stream
+        self._tty = tty
+        self._frame: List[str] = []
+        # último cuadro pintado; None = el próximo se pinta completo
+        self._shown: Optional[List[str]] = None
+        self.bytes_written = 0
+
+    @property
+    def stream(self) -> TextIO:
+        return self._stream if self._stream is not None else sys.stdout
+
+    @property
+    def tty(self) -> bool:
+        if self._tty is None:
+            isatty = getattr(self.stream, 'isatty', None)
+            self._tty = bool(isatty and isatty())
+        return self._tty
+
+    # -----------------------------
+    # composición del cuadro
+    # -----------------------------
+    def line(self, text: str = ''):
+        self._frame.extend(text.split('\n'))
+
+    def lines(self, texts: Iterable[str]):
+        for text in texts:
+            self.line(text)
+
+    def invalidate(self):
+        """El próximo cuadro se repinta completo (p.ej. alguien más escribió en pantalla)."""
+        self._shown = None
+
+    # -----------------------------
+    # escritura
+    # -----------------------------
+    @METRICS.timed('console_frame')
+    def present(self):
+        """Escribe el cuadro compuesto y empieza uno nuevo; el cursor queda en la
+        línea siguiente al cuadro (donde input() muestra su prompt)."""
+        frame, self._frame = self._frame, []
+        if not self.tty:
+            out = '\n'.join(frame) + '\n'
+        elif self._shown is None or not self._fits(frame):
+            out = HOME_CLEAR + '\n'.join(frame) + '\n'
+        else:
+            out = self._diff(self._shown, frame)
+        # un cuadro que no entra hace scroll: las filas ya no son las de la lista
+        self._shown = frame if self.tty and self._fits(frame) else None
+        self._write(out)
+
+    def clear(self):
+        """Pantalla limpia (sin cuadro); en una tubería no escribe nada."""
+        self._frame = []
+        self._shown = None
+        if self.tty:
+            self._write(HOME_CLEAR)
+
+    def _fits(self, frame: List[str]) -> bool:
+        columns, rows = shutil.get_terminal_size()
+        # una fila libre para el prompt
+        return len(frame) < rows and all(visible_len(text) < columns for text in frame)
+
+    @staticmethod
+    def _diff(old: List[str], new: List[str]) -> str:
+        parts = []
+        for row, text in enumerate(new, 1):
+            if row > len(old) or old[row - 1] != text:
+                parts.append(_goto(row) + text + ERASE_LINE)
+        # debajo del cuadro: filas viejas sobrantes, el prompt y lo que se tecleó
+        parts.append(_goto(len(new) + 1) + ERASE_BELOW)
+        return ''.join(parts)
+
+    def _write(self, out: str):
+        stream = self.stream
+        stream.write(out)
+        stream.flush()
+        self.bytes_written += len(out)
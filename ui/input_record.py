@@ -0,0 +1,244 @@
+"""input_record.py
+Grabación y reproducción determinista de sesiones de la interfaz (pygame o
+consola) para medir regresiones de rendimiento de punta a punta.
+
+La grabación guarda la semilla del generador del motor (GameEngine(rng=...)),
+los eventos de pygame de cada lectura de main.INPUT junto con la posición del
+mouse que ve la interfaz, o cada línea que ConsoleUI lee con input(). La
+reproducción corre sin ventana (driver de video "dummy" de SDL) y sin esperar
+al reloj (FPS = 0, salvo `realtime`), con la misma semilla y la misma entrada,
+así que recorre exactamente los mismos casos y cuadros. Reporta las métricas
+de logic/metrics.py: frame_events / frame_render / replay_frame por cuadro en
+pygame, replay_action por acción en consola y las operaciones del motor.
+
+Formato (JSONL):
+    {"t":"session","v":1,"ui":"pygame"|"console","seed":N,"data":ruta,"source_sha256":...}
+    {"t":"pos","pos":[x,y]}                         # mouse leído antes del primer evento
+    {"t":"frame","pos":[x,y],"ev":[[tipo,{atributos}],...]}
+    {"t":"line","s":texto}
+
+    python app.py --record sesion.jsonl             # juega normalmente y graba
+    python app.py --replay sesion.jsonl --metrics m.json
+"""
+import contextlib
+import json
+import os
+import random
+import sys
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from logic.metrics import METRICS
+from logic.utils import source_matches, source_stamp
+
+RECORD_VERSION = 1
+
+_SCALARS = (bool, int, float, str, type(None))
+
+
+class ReplayFinished(Exception):
+    """Se acabó la entrada grabada."""
+
+
+def _plain(value):
+    """Valor serializable de un atributo de evento (None si no lo es)."""
+    if isinstance(value, _SCALARS):
+        return value
+    if isinstance(value, (tuple, list)) and all(isinstance(v, _SCALARS) for v in value):
+        return list(value)
+    return None
+
+
+class InputRecorder:
+    def __init__(self, path: str, ui: str, data_path: str, seed: Optional[int] = None):
+        """`seed` por defecto se sortea; la interfaz debe crear su motor con ella."""
+        self.path = path
+        self.seed = seed if seed is not None else random.SystemRandom().randrange(1 << 32)
+        self._file = open(path, 'w', encoding='utf-8')
+        header = {'t': 'session', 'v': RECORD_VERSION, 'ui': ui, 'seed': self.seed,
+                  'data': os.path.abspath(data_path)}
+        header.update(source_stamp(data_path))
+        self._write(header)
+
+    def close(self):
+        self._file.close()
+
+    def _write(self, item: Dict[str, Any]):
+        # cada línea se vacía al disco: una sesión que se cuelga queda grabada
+        self._file.write(json.dumps(item, ensure_ascii=False, separators=(',', ':')) + '\n')
+        self._file.flush()
+
+    def pos(self, pos):
+        self._write({'t': 'pos', 'pos': list(pos)})
+
+    def frame(self, events: Iterable[Any], pos):
+        ev = []
+        for event in events:
+            attrs = {k: v for k, v in ((k, _plain(v)) for k, v in event.dict.items()) if v is not None}
+            ev.append([event.type, attrs])
+        self._write({'t': 'frame', 'pos': list(pos), 'ev': ev})
+
+    def line(self, text: str):
+        self._write({'t': 'line', 's': text})
+
+    def wrap_input(self, input_fn: Callable[[str], str] = input) -> Callable[[str], str]:
+        """input() de ConsoleUI que graba cada línea leída."""
+        def recorded(prompt: str = '') -> str:
+            text = input_fn(prompt)
+            self.line(text)
+            return text
+        return recorded
+
+
+def load_recording(path: str) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """(encabezado, ítems) de una grabación; se ignora una última línea cortada."""
+    items = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                items.append(json.loads(line))
+            except ValueError:
+                continue
+    if not items or items[0].get('t') != 'session':
+        raise ValueError(f"{path}: not an input recording")
+    header = items.pop(0)
+    if header.get('v') != RECORD_VERSION:
+        raise ValueError(f"{path}: unsupported recording version {header.get('v')!r}")
+    return header, items
+
+
+# -----------------------------
+# pygame
+# -----------------------------
+class RecordingInput:
+    """Envuelve main.INPUT: la interfaz ve la posición del mouse tomada al leer
+    los eventos, la misma que queda grabada."""
+    def __init__(self, source, recorder: InputRecorder):
+        self.source = source
+        self.recorder = recorder
+        self._pos = None
+
+    def get(self, dirty):
+        events = self.source.get(dirty)
+        self._pos = self.source.mouse_pos()
+        self.recorder.frame(events, self._pos)
+        return events
+
+    def mouse_pos(self):
+        if self._pos is None:
+            self._pos = self.source.mouse_pos()
+            self.recorder.pos(self._pos)
+        return self._pos
+
+
+class ReplayInput:
+    """Entrega los eventos grabados en lugar de main.LiveInput."""
+    def __init__(self, items: List[Dict[str, Any]]):
+        import pygame
+        self._event = pygame.event.Event
+        self._items = iter(items)
+        self._pos = None
+        self._last = None
+        self.frames = 0
+
+    def _next(self, kind: str) -> Dict[str, Any]:
+        for item in self._items:
+            if item['t'] == kind:
+                return item
+        raise ReplayFinished()
+
+    def get(self, dirty):
+        now = time.perf_counter()
+        if self._last is not None:
+            # cuadro completo: eventos + dibujo desde la lectura anterior
+            METRICS.observe('replay_frame', now - self._last)
+        item = self._next('frame')
+        self._last = time.perf_counter()
+        self.frames += 1
+        self._pos = tuple(item['pos'])
+        return [self._event(type_, {k: tuple(v) if isinstance(v, list) else v for k, v in attrs.items()})
+                for type_, attrs in item['ev']]
+
+    def mouse_pos(self):
+        if self._pos is None:
+            self._pos = tuple(self._next('pos')['pos'])
+        return self._pos
+
+
+def _replay_pygame(data_path: str, seed: int, items: List[Dict[str, Any]], realtime: bool) -> int:
+    # sin ventana: SDL lee estas variables en pygame.init()
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    import main as gui
+    gui.SEED = seed
+    gui.DATA_PATH = data_path
+    gui.INPUT = source = ReplayInput(items)
+    if not realtime:
+        gui.FPS = 0
+    gui.init_display()
+    try:
+        gui.main_menu()
+    except (ReplayFinished, SystemExit):
+        pass
+    return source.frames
+
+
+# -----------------------------
+# consola
+# -----------------------------
+class ConsoleReplayInput:
+    """input() de ConsoleUI que devuelve las líneas grabadas."""
+    def __init__(self, items: List[Dict[str, Any]]):
+        self._lines = iter(item['s'] for item in items if item['t'] == 'line')
+        self._last = None
+        self.actions = 0
+
+    def __call__(self, prompt: str = '') -> str:
+        if self._last is not None:
+            # lo que tardó la interfaz en atender la línea anterior y redibujar
+            METRICS.observe('replay_action', time.perf_counter() - self._last)
+        try:
+            text = next(self._lines)
+        except StopIteration:
+            raise ReplayFinished() from None
+        self.actions += 1
+        self._last = time.perf_counter()
+        return text
+
+
+def _replay_console(data_path: str, seed: int, items: List[Dict[str, Any]], symptom_map_path: str) -> int:
+    from ui.console_render import ConsoleRenderer
+    from ui.console_ui import ConsoleUI
+    source = ConsoleReplayInput(items)
+    with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+        # como en el kiosco: salida de terminal (ANSI, sólo las líneas que cambian)
+        ui = ConsoleUI(data_path, symptom_map_path, seed=seed, input_fn=source,
+                       renderer=ConsoleRenderer(tty=True))
+        try:
+            ui.run()
+        except ReplayFinished:
+            pass
+    return source.actions
+
+
+def replay(path: str, data_path: str, symptom_map_path: str, realtime: bool = False) -> Dict[str, Any]:
+    """Reproduce la grabación sin interfaz visible y devuelve las métricas
+    (METRICS.snapshot()) con un resumen en 'replay'. Se usa el catálogo grabado
+    si existe en esta máquina y si no `data_path`."""
+    header, items = load_recording(path)
+    if os.path.exists(header['data']):
+        data_path = header['data']
+    if not source_matches(data_path, header):
+        print(f"[replay] {data_path} no es el catálogo de la grabación: la sesión puede divergir",
+              file=sys.stderr)
+    METRICS.reset()
+    METRICS.enabled = True
+    t0 = time.perf_counter()
+    if header['ui'] == 'pygame':
+        steps = _replay_pygame(data_path, header['seed'], items, realtime)
+    else:
+        steps = _replay_console(data_path, header['seed'], items, symptom_map_path)
+    snapshot = METRICS.snapshot()
+    snapshot['replay'] = {'ui': header['ui'], 'seed': header['seed'], 'steps': steps,
+                          'seconds': time.perf_counter() - t0}
+    return snapshot